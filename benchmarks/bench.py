@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+End-to-end performance benchmarks on a synthetic library.
+
+Generates (or reuses) a library of N sparse video files, starts the local
+TMDB/Sonarr/Radarr stand-in, points a fresh index.db at both and times
+the real code paths in the order they run in production:
+
+  connector_stats        run_connector_stats (Sonarr + Radarr status/queue/disk)
+  connector_sync_cold    run_connector_media_sync into an empty connector_media
+  scan_cold              run_all: index every file, update_counts, enrichment
+  scan_warm              run_all again: nothing changed on disk
+  update_counts          aggregates alone
+  get_stats              stats page payload
+  catalog_json           /api/v3/catalog
+  poster_cache           run_poster_cache (downloads from the stand-in)
+  connector_sync_delta   run_connector_media_sync with nothing changed
+
+Each benchmark reports wall/CPU seconds, upstream requests made and the
+process's max RSS. The JSON report is comparable across commits:
+
+  python benchmarks/bench.py --files 10k -o before.json
+  git checkout my-branch
+  python benchmarks/bench.py --files 10k -o after.json --compare before.json
+
+Scales: 10k runs in seconds, 100k in minutes, 1m is an overnight run.
+The stand-in takes the same fault options as mock_upstream.py, e.g.
+--latency tmdb/=80:20 --rate-limit tmdb/=40/10 --errors sonarr=0.05.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import platform
+import subprocess
+import contextlib
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synth_library import generate_library, parse_scale  # noqa: E402
+from mock_upstream import MockUpstream, API_KEY, add_fault_arguments, faults_from_args  # noqa: E402
+
+BENCHMARKS = [
+    "connector_stats", "connector_sync_cold", "scan_cold", "scan_warm", "update_counts",
+    "get_stats", "catalog_json", "poster_cache", "connector_sync_delta",
+]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "-C", ROOT_DIR, "describe", "--always", "--dirty"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def prepare_workspace(workdir, files, seed, zero_byte):
+    """Library + config.yaml + connector.yaml + empty index.db in workdir."""
+    catalogue = generate_library(workdir, files, seed, zero_byte)
+    for name in ("index.db", "index.db-wal", "index.db-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(workdir, name))
+    shutil.rmtree(os.path.join(workdir, "static"), ignore_errors=True)
+
+    library = os.path.join(workdir, "library")
+    with open(os.path.join(workdir, "config.yaml"), "w") as f:
+        json.dump({"parent_paths": [{"path": os.path.join(library, "Movies")},
+                                    {"path": os.path.join(library, "TV")}]}, f)  # JSON is valid YAML
+    return catalogue
+
+
+def write_connectors(workdir, upstream):
+    path = os.path.join(workdir, "connector.yaml")
+    with open(path, "w") as f:
+        json.dump({
+            "radarr": {"base_url": f"{upstream.base_url}/radarr", "api_key": API_KEY},
+            "sonarr": {"base_url": f"{upstream.base_url}/sonarr", "api_key": API_KEY},
+        }, f)
+    return path
+
+
+def max_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_benchmarks(selected, upstream, quiet=True):
+    # The services read DB_FILE/config.yaml relative to the working directory
+    # and their settings from the environment at import time.
+    from services import indexer, tasks, stats
+    from services.indexer import DB_FILE, run_all, update_counts, create_schema
+    from services.fingerprint import ensure_fingerprint_schema
+    from services.checksum import ensure_checksum_schema
+    from services.probe import ensure_probe_schema
+
+    import sqlite3
+    # same schema setup as main.py / worker.py, so stats and the health
+    # section see the fingerprint, checksum and probe tables
+    with sqlite3.connect(DB_FILE) as conn:
+        create_schema(conn)
+        tasks.ensure_connector_schema(conn)
+        tasks.ensure_media_schema(conn)
+        ensure_fingerprint_schema(conn)
+        ensure_checksum_schema(conn)
+        ensure_probe_schema(conn)
+    conn.close()
+
+    def _update_counts():
+        conn = sqlite3.connect(DB_FILE)
+        update_counts(conn)
+        conn.close()
+
+    def _catalog_json():
+        from flask import Flask
+        from routes.catalog import catalog_bp, catalog_json
+        app = Flask(__name__)
+        app.register_blueprint(catalog_bp)
+        with app.test_request_context("/api/v3/catalog"):
+            resp = catalog_json.__wrapped__()  # skip require_api_key
+            return {"bytes": len(resp.get_data())}
+
+    def _counts():
+        with sqlite3.connect(DB_FILE) as conn:
+            row = conn.execute("""
+                SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM media),
+                       (SELECT COUNT(*) FROM metadata), (SELECT COUNT(*) FROM connector_media)
+            """).fetchone()
+        conn.close()
+        return dict(zip(("files", "media", "metadata", "connector_media"), row))
+
+    funcs = {
+        "connector_stats": tasks.run_connector_stats,
+        "connector_sync_cold": tasks.run_connector_media_sync,
+        "scan_cold": run_all,
+        "scan_warm": run_all,
+        "update_counts": _update_counts,
+        "get_stats": lambda: {"keys": len(stats.get_stats())},
+        "catalog_json": _catalog_json,
+        "poster_cache": tasks.run_poster_cache,
+        "connector_sync_delta": tasks.run_connector_media_sync,
+    }
+
+    devnull = open(os.devnull, "w")
+    if quiet:
+        indexer.logger.stream = devnull
+
+    results = []
+    for name in BENCHMARKS:
+        if name not in selected:
+            continue
+        upstream.reset_counts()
+        wall, cpu = time.perf_counter(), time.process_time()
+        error = None
+        with contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+            try:
+                outcome = funcs[name]()
+            except Exception as e:
+                outcome, error = None, f"{type(e).__name__}: {e}"
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        requests_made, injected = upstream.reset_counts()
+        result = {
+            "name": name,
+            "seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "upstream_requests": sum(requests_made.values()),
+            "upstream_by_route": requests_made,
+            "upstream_faults": injected,
+            "max_rss_mb": max_rss_mb(),
+            "rows": _counts(),
+            "result": outcome if isinstance(outcome, (dict, list, int, float, str)) else None,
+            "error": error,
+        }
+        results.append(result)
+        flag = "❌" if error else "⏱"
+        print(f"{flag} {name:<22} {wall:>9.3f}s  cpu {cpu:>8.3f}s  "
+              f"{result['upstream_requests']:>7} req  rss {result['max_rss_mb']:>7} MB"
+              + (f"  {error}" if error else ""))
+
+    devnull.close()
+    return results
+
+
+def compare(report, baseline):
+    base = {b["name"]: b for b in baseline["benchmarks"]}
+    print(f"\n{'benchmark':<22} {'before':>10} {'after':>10} {'change':>8}")
+    for b in report["benchmarks"]:
+        old = base.get(b["name"])
+        if not old or not old["seconds"]:
+            continue
+        ratio = b["seconds"] / old["seconds"]
+        print(f"{b['name']:<22} {old['seconds']:>9.3f}s {b['seconds']:>9.3f}s {ratio:>7.2f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", default="10k", help="library size: 10k, 100k, 1m, ...")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--zero-byte", action="store_true", help="empty files instead of sparse ones")
+    ap.add_argument("--workdir", help="where the library and index.db live (default /tmp/catalogerr-bench-<files>)")
+    ap.add_argument("--only", help=f"comma separated subset of: {', '.join(BENCHMARKS)}")
+    ap.add_argument("-o", "--output", help="write the JSON report here")
+    ap.add_argument("--compare", help="previous JSON report to compare against")
+    ap.add_argument("--verbose", action="store_true", help="show the app's own logging")
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    files = parse_scale(args.files)
+    workdir = os.path.abspath(args.workdir or f"/tmp/catalogerr-bench-{files}")
+    selected = set(args.only.split(",")) if args.only else set(BENCHMARKS)
+    unknown = selected - set(BENCHMARKS)
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    try:
+        faults = faults_from_args(args)
+    except ValueError as e:
+        ap.error(str(e))
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    print(f"🧪 {files} files in {workdir}")
+    catalogue = prepare_workspace(workdir, files, args.seed, args.zero_byte)
+    upstream = MockUpstream(catalogue, faults=faults, fault_seed=args.fault_seed).start()
+    os.environ.update(upstream.env())
+    os.environ["CONNECTOR_CONFIG"] = write_connectors(workdir, upstream)
+    os.chdir(workdir)
+
+    try:
+        results = run_benchmarks(selected, upstream, quiet=not args.verbose)
+    finally:
+        upstream.stop()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "files": files,
+            "seed": args.seed,
+            "zero_byte": args.zero_byte,
+            "python": platform.python_version(),
+            "sqlite": __import__("sqlite3").sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "db_bytes": os.path.getsize(os.path.join(workdir, "index.db")),
+            "faults": faults,
+        },
+        "benchmarks": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {output}")
+    if baseline:
+        with open(baseline) as f:
+            compare(report, json.load(f))
+
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
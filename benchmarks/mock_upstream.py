@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for TMDB, Sonarr and Radarr, serving a synth_library
+catalogue so benchmarks never hit the real services.
+
+One HTTP server, one path prefix per upstream:
+  /tmdb/3/...           search/movie, search/tv, movie/<id>, tv/<id>, find/<imdb id>
+  /tmdb-images/t/p/...  tiny placeholder JPEGs
+  /sonarr/api/v3/...    series, series/lookup, system/status, queue, diskspace
+  /radarr/api/v3/...    movie, movie/lookup, system/status, queue, diskspace
+
+Point the app at it with the env vars it prints (MockUpstream.env()).
+
+Faults are injected per route prefix ("tmdb", "tmdb/search", "sonarr/series",
+...; the longest matching prefix wins; "tmdb" also covers "tmdb-images",
+use "tmdb/" for the API alone) to load-test concurrency, timeouts and retries:
+  --latency tmdb=120:40       120 ms ± 40 ms added to every response
+  --errors sonarr=0.05:503    5% of requests fail with 503
+  --rate-limit tmdb=40/10     at most 40 requests per 10 s, then 429 + Retry-After
+  --hang radarr=0.01:30       1% of requests stall 30 s (client timeouts)
+or as a JSON list of rules with --faults rules.json. While running,
+GET /_mock/stats shows per-route counts and injected faults, and
+POST /_mock/faults replaces the rules (same JSON).
+
+Usage:
+  python benchmarks/mock_upstream.py --files 10k --port 8900 --latency tmdb=80:20 --rate-limit tmdb=40/10
+  python benchmarks/mock_upstream.py --catalogue /tmp/lib/catalogue.json --errors sonarr=0.1
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+API_KEY = "bench"
+
+# smallest valid JPEG (1x1 px)
+PLACEHOLDER_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f"
+    "141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b08000100010101"
+    "1100ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303020403050504"
+    "040000017d01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a25"
+    "262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475767778797a838485868788"
+    "898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3"
+    "e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+
+class Fixtures:
+    """TMDB and *arr payloads derived from a synth_library catalogue."""
+
+    def __init__(self, catalogue, image_base=""):
+        self.image_base = image_base
+        self.movies = {m["tmdb_id"]: m for m in catalogue["movies"]}
+        self.shows = {s["tmdb_id"]: s for s in catalogue["shows"]}
+        self.by_title = {("movie", m["title"].lower()): m for m in catalogue["movies"]}
+        self.by_title.update({("tv", s["title"].lower()): s for s in catalogue["shows"]})
+        self.by_imdb = {m["imdb_id"]: ("movie", m) for m in catalogue["movies"]}
+        self.by_imdb.update({s["imdb_id"]: ("tv", s) for s in catalogue["shows"]})
+
+    @staticmethod
+    def in_arr(item):
+        # 80% of the archive is also managed by Radarr/Sonarr
+        return item["id"] % 5 != 0
+
+    @staticmethod
+    def slug(title):
+        return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+    def _images(self, kind, item):
+        path = f"/{kind}{item['tmdb_id']}.jpg"
+        return [
+            {"coverType": "poster", "url": f"/MediaCover/{item['id']}/poster.jpg",
+             "remoteUrl": f"{self.image_base}/t/p/original{path}"},
+            {"coverType": "fanart", "url": f"/MediaCover/{item['id']}/fanart.jpg",
+             "remoteUrl": f"{self.image_base}/t/p/original/b{item['tmdb_id']}.jpg"},
+        ]
+
+    # ---- TMDB ----
+    def tmdb_movie(self, m):
+        return {
+            "id": m["tmdb_id"], "imdb_id": m["imdb_id"], "title": m["title"],
+            "original_title": m["title"], "release_date": f"{m['year']}-06-01",
+            "overview": f"Synthetic overview of {m['title']}.",
+            "genres": [{"id": 18, "name": "Drama"}], "vote_average": 7.1,
+            "poster_path": f"/p{m['tmdb_id']}.jpg", "backdrop_path": f"/b{m['tmdb_id']}.jpg",
+        }
+
+    def tmdb_tv(self, s):
+        return {
+            "id": s["tmdb_id"], "name": s["title"], "original_name": s["title"],
+            "first_air_date": f"{s['year']}-01-15", "number_of_seasons": len(s["seasons"]),
+            "overview": f"Synthetic overview of {s['title']}.",
+            "genres": [{"id": 10765, "name": "Sci-Fi & Fantasy"}], "vote_average": 7.8,
+            "poster_path": f"/p{s['tmdb_id']}.jpg", "backdrop_path": f"/b{s['tmdb_id']}.jpg",
+        }
+
+    # ---- Radarr / Sonarr ----
+    def radarr_movie(self, m):
+        return {
+            "id": m["id"], "title": m["title"], "titleSlug": self.slug(m["title"]), "year": m["year"],
+            "tmdbId": m["tmdb_id"], "imdbId": m["imdb_id"], "monitored": True,
+            "added": "2024-01-01T00:00:00Z", "path": f"/movies/{m['title']} ({m['year']})",
+            "status": "released", "hasFile": True, "sizeOnDisk": m["size"],
+            "overview": f"Synthetic overview of {m['title']}.",
+            "genres": ["Drama"], "ratings": {"tmdb": {"value": 7.1}},
+            "images": self._images("p", m),
+        }
+
+    def sonarr_series(self, s):
+        episodes = sum(s["seasons"])
+        return {
+            "id": s["id"], "title": s["title"], "titleSlug": self.slug(s["title"]), "year": s["year"],
+            "tmdbId": s["tmdb_id"], "imdbId": s["imdb_id"], "tvdbId": s["tvdb_id"], "monitored": True,
+            "added": "2024-01-01T00:00:00Z", "path": f"/tv/{s['title']}", "status": "continuing",
+            "overview": f"Synthetic overview of {s['title']}.", "genres": ["Drama"],
+            "statistics": {"seasonCount": len(s["seasons"]), "episodeFileCount": episodes,
+                           "episodeCount": episodes, "sizeOnDisk": episodes * s["episode_size"]},
+            "images": self._images("p", s),
+        }
+
+    def queue(self, app, size):
+        """Queue records for the first `size` items, as if downloading."""
+        items = list(self.movies.values() if app == "radarr" else self.shows.values())[:size]
+        key = "movieId" if app == "radarr" else "seriesId"
+        return [{
+            "id": n + 1, key: item["id"], "title": f"{item['title']} ({item['year']}) 1080p",
+            "status": "downloading", "trackedDownloadStatus": "ok", "protocol": "torrent",
+            "size": 4 * 1024 ** 3, "sizeleft": (n % 10 + 1) * 400 * 1024 ** 2, "timeleft": "00:12:00",
+        } for n, item in enumerate(items)]
+
+    def search(self, kind, query):
+        item = self.by_title.get((kind, (query or "").strip().lower()))
+        return [item] if item else []
+
+
+# ---------------- Fault injection ---------------- #
+
+RULE_DEFAULTS = {
+    "match": "",          # route prefix, "" matches everything
+    "latency_ms": 0,
+    "jitter_ms": 0,
+    "error_rate": 0.0,
+    "error_status": 500,
+    "rate_limit": 0,      # requests per rate_window seconds, 0 = unlimited
+    "rate_window": 10,
+    "hang_rate": 0.0,
+    "hang_seconds": 30,
+}
+
+
+class Faults:
+    """Latency / error / rate-limit / hang rules, matched by route prefix."""
+
+    def __init__(self, rules=(), seed=None):
+        self._lock = threading.Lock()
+        self._rnd = random.Random(seed)
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        parsed = []
+        for rule in rules:
+            unknown = set(rule) - set(RULE_DEFAULTS)
+            if unknown:
+                raise ValueError(f"unknown fault option(s): {', '.join(sorted(unknown))}")
+            parsed.append({**RULE_DEFAULTS, **rule})
+        with self._lock:
+            self.rules = sorted(parsed, key=lambda r: len(r["match"]), reverse=True)
+            self._windows = {id(r): deque() for r in self.rules}
+
+    def rule_for(self, route):
+        return next((r for r in self.rules if route.startswith(r["match"])), None)
+
+    def decide(self, route):
+        """
+        Roll the dice for one request: (delay seconds, fault, detail). fault is
+        None, "rate_limit" (detail: Retry-After), "error" (detail: status) or "hang".
+        """
+        rule = self.rule_for(route)
+        if rule is None:
+            return 0, None, None
+        with self._lock:
+            delay = max(0.0, rule["latency_ms"] + self._rnd.uniform(-1, 1) * rule["jitter_ms"]) / 1000
+            if rule["rate_limit"]:
+                window, now = self._windows[id(rule)], time.monotonic()
+                while window and now - window[0] >= rule["rate_window"]:
+                    window.popleft()
+                if len(window) >= rule["rate_limit"]:
+                    retry_after = max(1, int(rule["rate_window"] - (now - window[0])) + 1)
+                    return delay, "rate_limit", retry_after
+                window.append(now)
+            roll = self._rnd.random()
+        if roll < rule["hang_rate"]:
+            return delay + rule["hang_seconds"], "hang", None
+        if roll < rule["hang_rate"] + rule["error_rate"]:
+            return delay, "error", rule["error_status"]
+        return delay, None, None
+
+
+def parse_fault_args(latency=(), errors=(), rate_limit=(), hang=()):
+    """CLI specs (route=value) -> list of rules, merged per route."""
+    rules = {}
+
+    def rule(spec):
+        match, _, value = spec.partition("=")
+        if not value:
+            raise ValueError(f"expected route=value, got {spec!r}")
+        return rules.setdefault(match, {"match": match}), value
+
+    for spec in latency:
+        r, value = rule(spec)
+        ms, _, jitter = value.partition(":")
+        r.update(latency_ms=float(ms), jitter_ms=float(jitter or 0))
+    for spec in errors:
+        r, value = rule(spec)
+        rate, _, status = value.partition(":")
+        r.update(error_rate=float(rate), error_status=int(status or 500))
+    for spec in rate_limit:
+        r, value = rule(spec)
+        count, _, window = value.partition("/")
+        r.update(rate_limit=int(count), rate_window=float(window or 10))
+    for spec in hang:
+        r, value = rule(spec)
+        rate, _, seconds = value.partition(":")
+        r.update(hang_rate=float(rate), hang_seconds=float(seconds or 30))
+    return list(rules.values())
+
+
+def rate_limited_body(route, rule_limit):
+    if route.startswith("tmdb"):
+        return {"success": False, "status_code": 25,
+                "status_message": f"Your request count is over the allowed limit of ({rule_limit})."}
+    return {"message": "Too Many Requests"}
+
+
+class MockUpstream:
+    """Threaded stand-in server. start() returns self; env() gives the app's env vars."""
+
+    def __init__(self, catalogue, host="127.0.0.1", port=0, faults=(), fault_seed=None, queue_size=0):
+        self.requests = Counter()
+        self.injected = Counter()
+        self.faults = Faults(faults, fault_seed)
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self.fixtures = Fixtures(catalogue, image_base=f"{self.base_url}/tmdb-images")
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def env(self):
+        return {
+            "TMDB_API_KEY": API_KEY,
+            "TMDB_API_URL": f"{self.base_url}/tmdb/3",
+            "TMDB_IMAGE_URL": f"{self.base_url}/tmdb-images/t/p",
+            "SONARR_URL": f"{self.base_url}/sonarr",
+            "SONARR_API_KEY": API_KEY,
+            "RADARR_URL": f"{self.base_url}/radarr",
+            "RADARR_API_KEY": API_KEY,
+        }
+
+    def count(self, route, fault=None):
+        with self._lock:
+            self.requests[route] += 1
+            if fault:
+                self.injected[f"{route}:{fault}"] += 1
+
+    def reset_counts(self):
+        """(requests per route, injected faults) since the last call."""
+        with self._lock:
+            counts, injected = dict(self.requests), dict(self.injected)
+            self.requests.clear()
+            self.injected.clear()
+        return counts, injected
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "injected": dict(self.injected),
+                    "rules": self.faults.rules}
+
+    # ---------------- Routing ---------------- #
+
+    def route(self, path, query):
+        """Return (route name, status, body) for a GET."""
+        fx = self.fixtures
+        parts = path.strip("/").split("/")
+        q = lambda k: (query.get(k) or [None])[0]  # noqa: E731
+
+        if parts[:2] == ["tmdb", "3"]:
+            rest = parts[2:]
+            if rest[:1] == ["search"] and len(rest) == 2:
+                kind = "tv" if rest[1] == "tv" else "movie"
+                items = fx.search(kind, q("query"))
+                render = fx.tmdb_tv if kind == "tv" else fx.tmdb_movie
+                return f"tmdb/search/{kind}", 200, {"page": 1, "results": [render(i) for i in items],
+                                                     "total_results": len(items)}
+            if len(rest) == 2 and rest[0] in ("movie", "tv") and rest[1].isdigit():
+                table, render = (fx.shows, fx.tmdb_tv) if rest[0] == "tv" else (fx.movies, fx.tmdb_movie)
+                item = table.get(int(rest[1]))
+                if item is None:
+                    return f"tmdb/{rest[0]}", 404, {"status_code": 34, "status_message": "Not found"}
+                return f"tmdb/{rest[0]}", 200, render(item)
+            if len(rest) == 2 and rest[0] == "find":
+                kind, item = fx.by_imdb.get(rest[1], (None, None))
+                return "tmdb/find", 200, {
+                    "movie_results": [fx.tmdb_movie(item)] if kind == "movie" else [],
+                    "tv_results": [fx.tmdb_tv(item)] if kind == "tv" else [],
+                }
+
+        if parts[:1] == ["tmdb-images"]:
+            return "tmdb-images", 200, PLACEHOLDER_JPEG
+
+        if parts[:1] in (["sonarr"], ["radarr"]) and parts[1:3] == ["api", "v3"]:
+            app, rest = parts[0], parts[3:]
+            if rest == ["system", "status"]:
+                return f"{app}/system/status", 200, {"appName": app.capitalize(), "version": "4.0.0.0"}
+            if rest == ["queue"]:
+                records = fx.queue(app, self.queue_size)
+                return f"{app}/queue", 200, {"page": 1, "pageSize": max(10, len(records)),
+                                             "totalRecords": len(records), "records": records}
+            if rest == ["diskspace"]:
+                return f"{app}/diskspace", 200, [
+                    {"path": "/data", "label": "data", "freeSpace": 4 * 1024 ** 4, "totalSpace": 16 * 1024 ** 4},
+                ]
+            if app == "radarr" and rest[:1] == ["movie"]:
+                if rest[1:] == ["lookup"]:
+                    return "radarr/movie/lookup", 200, [fx.radarr_movie(m) for m in fx.search("movie", q("term"))]
+                return "radarr/movie", 200, [fx.radarr_movie(m) for m in fx.movies.values() if fx.in_arr(m)]
+            if app == "sonarr" and rest[:1] == ["series"]:
+                if rest[1:] == ["lookup"]:
+                    return "sonarr/series/lookup", 200, [fx.sonarr_series(s) for s in fx.search("tv", q("term"))]
+                return "sonarr/series", 200, [fx.sonarr_series(s) for s in fx.shows.values() if fx.in_arr(s)]
+
+        return "unknown", 404, {"error": f"no fixture for {path}"}
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, body, headers=()):
+                if isinstance(body, bytes):
+                    payload, ctype = body, "image/jpeg"
+                else:
+                    payload, ctype = json.dumps(body).encode(), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/_mock/stats":
+                    return self._send(200, upstream.stats())
+
+                name, status, body = upstream.route(parsed.path, parse_qs(parsed.query))
+                delay, fault, detail = upstream.faults.decide(name)
+                upstream.count(name, fault)
+                if delay:
+                    time.sleep(delay)
+                if fault == "rate_limit":
+                    limit = upstream.faults.rule_for(name)["rate_limit"]
+                    return self._send(429, rate_limited_body(name, limit), [("Retry-After", str(detail))])
+                if fault == "error":
+                    return self._send(detail, {"message": f"Injected {detail} error"})
+                self._send(status, body)
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/_mock/faults":
+                    return self._send(404, {"error": "not found"})
+                try:
+                    rules = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"[]")
+                    upstream.faults.set_rules(rules)
+                except (ValueError, TypeError) as e:
+                    return self._send(400, {"error": str(e)})
+                self._send(200, {"rules": upstream.faults.rules})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def add_fault_arguments(ap):
+    g = ap.add_argument_group("fault injection (route=value, repeatable)")
+    g.add_argument("--latency", action="append", default=[], metavar="ROUTE=MS[:JITTER]")
+    g.add_argument("--errors", action="append", default=[], metavar="ROUTE=RATE[:STATUS]")
+    g.add_argument("--rate-limit", action="append", default=[], metavar="ROUTE=COUNT[/SECONDS]")
+    g.add_argument("--hang", action="append", default=[], metavar="ROUTE=RATE[:SECONDS]")
+    g.add_argument("--faults", help="JSON file with a list of fault rules")
+    g.add_argument("--fault-seed", type=int, help="seed for reproducible fault rolls")
+
+
+def faults_from_args(args):
+    rules = parse_fault_args(args.latency, args.errors, args.rate_limit, args.hang)
+    if args.faults:
+        with open(args.faults) as f:
+            rules.extend(json.load(f))
+    return rules
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--catalogue", help="catalogue.json written by synth_library.py")
+    src.add_argument("--files", default="10k", help="size of a generated catalogue (no files written)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--queue", type=int, default=5, help="records in each *arr queue")
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    if args.catalogue:
+        with open(args.catalogue) as f:
+            catalogue = json.load(f)
+    else:
+        from synth_library import build_catalogue, parse_scale
+        catalogue = build_catalogue(parse_scale(args.files), args.seed)
+
+    try:
+        faults = faults_from_args(args)
+        upstream = MockUpstream(catalogue, args.host, args.port, faults, args.fault_seed, args.queue)
+    except ValueError as e:
+        ap.error(str(e))
+    for key, value in upstream.env().items():
+        print(f"{key}={value}")
+    for rule in upstream.faults.rules:
+        print(f"⚡ {rule['match'] or '*'}: " + ", ".join(
+            f"{k}={v}" for k, v in rule.items() if k != "match" and v != RULE_DEFAULTS[k]))
+    print(f"🧪 Serving {len(catalogue['movies'])} movies / {len(catalogue['shows'])} shows "
+          f"on {upstream.base_url} (stats at /_mock/stats, Ctrl+C to stop)")
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Check that the mount-health probe (services/mounts.py) keeps its timeout
+when a drive hangs in the kernel.
+
+The "dead" drive's probe opens a FIFO nobody writes to, so the open()
+blocks in the kernel like stat() on a hung NFS mount. probe_drives has to
+answer within its timeout, report the drive offline and the healthy drive
+online, and not start a second probe while the first still hangs:
+
+  python benchmarks/mount_probe.py
+"""
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, ROOT_DIR)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--timeout", type=float, default=1.0)
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="catalogerr-mounts-")
+    with open(os.path.join(workdir, "config.yaml"), "w") as f:
+        json.dump({"parent_paths": []}, f)
+    os.chdir(workdir)  # services.indexer reads config.yaml from the working directory
+
+    from services import mounts
+
+    healthy = os.path.join(workdir, "healthy")
+    dead = os.path.join(workdir, "dead")
+    os.makedirs(healthy)
+    os.makedirs(dead)
+    with open(os.path.join(healthy, "movie.mkv"), "w") as f:
+        f.write("x")
+    fifo = os.path.join(workdir, "hang")
+    os.mkfifo(fifo)
+
+    real_available = mounts.drive_available
+
+    def drive_available(path):
+        if path == dead:
+            os.open(fifo, os.O_RDONLY)  # blocks until a writer shows up
+        return real_available(path)
+
+    mounts.drive_available = drive_available
+
+    def hung(*_):
+        print(f"❌ probe_drives still blocked after {args.timeout * 10:g}s")
+        os._exit(1)
+    signal.signal(signal.SIGALRM, hung)
+    signal.alarm(max(1, int(args.timeout * 10)))
+
+    failures = []
+    try:
+        t = time.monotonic()
+        results = mounts.probe_drives([healthy, dead], max_age=0, timeout=args.timeout)
+        elapsed = time.monotonic() - t
+        print(f"⏱ probe_drives: {elapsed:.2f}s (timeout {args.timeout:g}s)")
+        for path, result in results.items():
+            print(f"   {os.path.basename(path):<8} {result['state']:<8} {result['error'] or ''}")
+
+        if elapsed > args.timeout + 0.5:
+            failures.append(f"took {elapsed:.2f}s, timeout is {args.timeout:g}s")
+        if results[healthy]["state"] not in ("online", "slow"):
+            failures.append(f"healthy drive reported {results[healthy]['state']}")
+        if results[dead]["state"] != "offline":
+            failures.append(f"hung drive reported {results[dead]['state']}")
+
+        again = mounts.probe_drives([dead], max_age=0, timeout=args.timeout)[dead]
+        print(f"   re-probe {again['state']:<8} {again['error'] or ''}")
+        if again["error"] != "previous probe still hanging":
+            failures.append("a second probe was started for a path whose probe still hangs")
+    finally:
+        signal.alarm(0)
+        # unblock the stuck probe thread so the process can exit cleanly
+        try:
+            os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+        except OSError:
+            pass
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ mount probe kept its timeout")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
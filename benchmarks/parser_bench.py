@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Filename parser benchmark + golden-output check.
+
+Runs services.parser over a corpus of release names (movie + TV, scene and
+Sonarr/Radarr naming, multi-episode, 1x02, 3-digit episodes, bracketed
+years) and reports throughput in names/sec, alongside the pre-compiled
+legacy parser for comparison.
+
+Usage:
+  python benchmarks/parser_bench.py              # check golden + benchmark
+  python benchmarks/parser_bench.py --regenerate # rewrite golden output
+  python benchmarks/parser_bench.py --rounds 10
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from services.parser import parse_filename, clean_title  # noqa: E402
+
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), "data", "filenames_golden.jsonl")
+
+# ---------------- Corpus ---------------- #
+
+SHOWS = [
+    "Breaking Bad", "The Office (US)", "Game of Thrones", "Doctor Who (2005)", "The Simpsons",
+    "Grey's Anatomy", "Law & Order: SVU", "Star Trek: The Next Generation", "One Piece",
+    "The Mandalorian", "Stranger Things", "Mr. Robot", "S.W.A.T. (2017)", "9-1-1",
+    "Marvel's Agents of S.H.I.E.L.D.", "Naruto Shippuden", "Top Gear", "It's Always Sunny in Philadelphia",
+    "The Daily Show", "Planet Earth II", "Rick and Morty", "Sherlock", "Succession", "The Wire",
+    "Brooklyn Nine-Nine", "Better Call Saul", "Dark", "Fargo", "House of the Dragon", "Severance",
+]
+MOVIES = [
+    ("The Matrix", 1999), ("Blade Runner 2049", 2017), ("1917", 2019), ("2012", 2009),
+    ("Spider-Man: No Way Home", 2021), ("Amélie", 2001), ("Se7en", 1995), ("WALL·E", 2008),
+    ("Mission: Impossible - Fallout", 2018), ("The Lord of the Rings: The Return of the King", 2003),
+    ("Crouching Tiger, Hidden Dragon", 2000), ("Dr. Strangelove", 1964), ("Alien", 1979),
+    ("Oppenheimer", 2023), ("Parasite", 2019), ("Back to the Future", 1985), ("Up", 2009),
+    ("Star Wars: Episode IV - A New Hope", 1977), ("The Good, the Bad and the Ugly", 1966),
+    ("Everything Everywhere All at Once", 2022), ("Léon: The Professional", 1994), ("Heat", 1995),
+]
+EP_TITLES = ["Pilot", "The One Where It Begins", "Part 1", "Ozymandias", "Winter Is Coming",
+             "Chapter One - The Vanishing of Will Byers", "", "", "Finale (1)"]
+QUALITIES = ["1080p", "720p", "2160p", "480p", "Bluray-1080p", "WEBDL-1080p", "HDTV-720p"]
+SOURCES = ["BluRay", "WEB-DL", "WEBRip", "HDTV", "BDRip", "WEB"]
+CODECS = ["x264", "x265", "H.264", "HEVC", "h264"]
+AUDIO = ["DDP5.1", "AAC2.0", "DTS-HD.MA.5.1", "AC3", "Atmos"]
+GROUPS = ["NTb", "SPARKS", "RARBG", "YTS", "FGT", "EDGE2020", "playWEB", "GalaxyTV"]
+EXTS = [".mkv", ".mp4", ".avi", ".m4v"]
+
+# Titles ending in a number: the number is not a release year without tags after it
+FIXED_CASES = [
+    "/mnt/movies/Blade Runner 2049/Blade Runner 2049.mkv",
+    "/mnt/movies/Blade Runner 2049 (2017)/Blade Runner 2049 (2017).mkv",
+    "/mnt/movies/Blade Runner 2049/Blade.Runner.2049.2017.1080p.BluRay.x264-SPARKS.mkv",
+    "/mnt/movies/Blade Runner 2049/Blade Runner 2049 1080p.mkv",
+    "/mnt/movies/Space 1999/Space 1999.mkv",
+    "/data/Space 1999/Space.1999.mkv",
+    "/mnt/archive/2001 A Space Odyssey/2001.A.Space.Odyssey.1968.720p.BluRay.mkv",
+]
+
+
+def _dotted(s):
+    return re.sub(r"[^\w]+", ".", s).strip(".")
+
+
+def build_corpus(seed=1337):
+    rnd = random.Random(seed)
+    paths = []
+
+    for show in SHOWS:
+        for _ in range(60):
+            season = rnd.randint(1, 25)
+            ep = rnd.choice([rnd.randint(1, 24), rnd.randint(100, 999)]) if show in ("One Piece", "Naruto Shippuden") else rnd.randint(1, 24)
+            ep_title = rnd.choice(EP_TITLES)
+            ext = rnd.choice(EXTS)
+            style = rnd.randrange(7)
+            if style == 0:    # Sonarr standard
+                name = f"{show} - S{season:02}E{ep:02} - {ep_title} [{rnd.choice(QUALITIES)}]" if ep_title else f"{show} - S{season:02}E{ep:02}"
+            elif style == 1:  # scene
+                name = f"{_dotted(show)}.S{season:02}E{ep:02}.{rnd.choice(QUALITIES[:4])}.{rnd.choice(SOURCES)}.{rnd.choice(CODECS)}-{rnd.choice(GROUPS)}"
+            elif style == 2:  # multi-episode
+                name = f"{_dotted(show)}.S{season:02}E{ep:02}{rnd.choice(['E', '-E', '-'])}{ep + 1:02}.{rnd.choice(QUALITIES[:4])}.{rnd.choice(SOURCES)}"
+            elif style == 3:  # 1x02
+                name = f"{show} - {season}x{ep:02} - {ep_title}" if ep_title else f"{show} {season}x{ep:02}"
+            elif style == 4:  # lowercase scene
+                name = f"{_dotted(show).lower()}.s{season:02}e{ep:02}.{rnd.choice(QUALITIES[:4])}.{rnd.choice(CODECS).lower()}"
+            elif style == 5:  # spaced, 3-digit
+                name = f"{show} S{season:02}E{ep:03} {ep_title}".strip()
+            else:             # no episode marker at all
+                name = f"{show} Special {rnd.randint(1, 9)}"
+            folder = rnd.choice([f"/mnt/tv/{show}/Season {season}", f"/data/tvshows/{show}", f"/mnt/media/{show}/S{season:02}"])
+            paths.append(f"{folder}/{name}{ext}")
+
+    for title, year in MOVIES:
+        for _ in range(50):
+            ext = rnd.choice(EXTS)
+            style = rnd.randrange(5)
+            if style == 0:    # Radarr standard
+                name = f"{title} ({year}) {rnd.choice(QUALITIES)}"
+            elif style == 1:
+                name = f"{title} ({year})"
+            elif style == 2:  # scene
+                name = f"{_dotted(title)}.{year}.{rnd.choice(QUALITIES[:4])}.{rnd.choice(SOURCES)}.{rnd.choice(AUDIO)}.{rnd.choice(CODECS)}-{rnd.choice(GROUPS)}"
+            elif style == 3:  # bracketed year
+                name = f"{title} [{year}] {rnd.choice(QUALITIES[:4])} {rnd.choice(SOURCES)}"
+            else:             # bare
+                name = f"{title}"
+            folder = rnd.choice([f"/mnt/movies/{title} ({year})", f"/data/Movies/{title}", f"/mnt/archive/{title}"])
+            paths.append(f"{folder}/{name}{ext}")
+
+    return paths + FIXED_CASES
+
+# ---------------- Legacy parser (baseline) ---------------- #
+
+_legacy_tv = re.compile(
+    r"^(?P<title>.+?)[ ._-]+S(?P<season>\d{1,2})E(?P<episode>\d{1,2})(?:[ ._-]+(?P<ep_title>.*?))?(?:\.\w+)?$",
+    re.IGNORECASE
+)
+_legacy_movie = re.compile(r"^(?P<title>.+?) \((?P<year>\d{4})\)(?: (?P<quality>.+))?$", re.IGNORECASE)
+_legacy_tv_alt = re.compile(
+    r"^(?P<title>.+?)\.S(?P<season>\d{2})E(?P<episode>\d{2})(?:\.(?P<ep_title>.+?))?\.", re.IGNORECASE
+)
+
+
+def legacy_parse_filename(filename, fullpath):
+    full_lower = fullpath.lower()
+    name, _ = os.path.splitext(filename)
+    if "/tvshows/" in full_lower or re.search(r"/season\s*\d+", full_lower):
+        m = _legacy_tv.match(filename) or _legacy_tv_alt.match(filename)
+        if m:
+            return {"type": "tv", "title": m.group("title").replace('.', ' ').strip()}
+        return {"type": "tv", "title": name}
+    if "/movies/" in full_lower:
+        mm = _legacy_movie.match(name)
+        if mm:
+            return {"type": "movie", "title": mm.group("title").strip()}
+        return {"type": "movie", "title": name}
+    m = _legacy_tv.match(filename) or _legacy_tv_alt.match(filename)
+    if m:
+        return {"type": "tv", "title": m.group("title").replace('.', ' ').strip()}
+    mm = _legacy_movie.match(name)
+    if mm:
+        return {"type": "movie", "title": mm.group("title").strip()}
+    return {"type": "movie", "title": name}
+
+
+def legacy_clean_title(raw):
+    junk_patterns = [
+        r"\b\d{3,4}p\b", r"\bbluray\b", r"\bwebrip\b", r"\bweb[- ]dl\b", r"\bx265\b", r"\bx264\b",
+        r"\bddp\d+\.\d+\b", r"\bac3\b", r"\bdd\b", r"\byts\b", r"\bedge\d+\b", r"\bswaxon\b", r"\bethel\b"
+    ]
+    title = raw
+    for pat in junk_patterns:
+        title = re.sub(pat, "", title, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", title).strip()
+
+# ---------------- Runner ---------------- #
+
+
+def parse_all(paths, parse, clean):
+    out = []
+    for p in paths:
+        parsed = parse(os.path.basename(p), p)
+        clean(parsed["title"])
+        out.append(parsed)
+    return out
+
+
+def bench(label, paths, parse, clean, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        parse_all(paths, parse, clean)
+        best = min(best, time.perf_counter() - t0)
+    rate = len(paths) / best if best else 0
+    print(f"{label:<28} {len(paths):>7} names  {best * 1000:>9.1f} ms  {rate:>12,.0f} names/s")
+    return rate
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--regenerate", action="store_true", help="rewrite the golden output file")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--scale", type=int, default=20, help="corpus repetitions for the throughput run")
+    args = ap.parse_args()
+
+    paths = build_corpus()
+    results = [{"path": p, "parsed": parse_filename(os.path.basename(p), p)} for p in paths]
+
+    if args.regenerate:
+        with open(GOLDEN_FILE, "w") as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False, sort_keys=True) + "\n")
+        print(f"✅ Wrote {len(results)} golden entries to {GOLDEN_FILE}")
+        return 0
+
+    # --- Golden check
+    with open(GOLDEN_FILE) as f:
+        golden = [json.loads(line) for line in f]
+    mismatches = [
+        (g["path"], g["parsed"], parse_filename(os.path.basename(g["path"]), g["path"]))
+        for g in golden
+        if parse_filename(os.path.basename(g["path"]), g["path"]) != g["parsed"]
+    ]
+    for path, want, got in mismatches[:20]:
+        print(f"❌ {path}\n   want {want}\n   got  {got}")
+    print(f"{'✅' if not mismatches else '❌'} Golden: {len(golden) - len(mismatches)}/{len(golden)} match")
+
+    # --- Titles the legacy parser already handled must not change (media ids).
+    # Names it misclassified (e.g. "Show (2005) S01E011" parsed as a movie) are exempt.
+    legacy_changed = 0
+    for p in paths:
+        old = legacy_parse_filename(os.path.basename(p), p)
+        new = parse_filename(os.path.basename(p), p)
+        recognised = old["title"] != os.path.splitext(os.path.basename(p))[0] and old["type"] == new["type"]
+        if recognised and old["title"] != new["title"]:
+            legacy_changed += 1
+    print(f"{'✅' if not legacy_changed else '❌'} Legacy-compatible titles: {legacy_changed} changed")
+
+    # --- Throughput
+    corpus = paths * args.scale
+    clean_title.cache_clear()
+    print()
+    legacy = bench("legacy parse + clean", corpus, legacy_parse_filename, legacy_clean_title, args.rounds)
+    new = bench("services.parser", corpus, parse_filename, clean_title, args.rounds)
+    print(f"{'speedup':<28} {new / legacy if legacy else 0:>.2f}x")
+
+    return 1 if mismatches or legacy_changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+DB size and join latency before/after the integer surrogate key migration.
+
+Builds a catalogue DB with the legacy layout (SHA1 TEXT primary and foreign
+keys, full paths on every row) straight from the synthetic catalogue (no
+files on disk), times the joins the app runs, migrates it with create_schema
+(_migrate_surrogate_keys, then _migrate_directories) and times the same
+joins on the integer keys, then checks that get_stats() works on the
+migrated DB:
+
+  python benchmarks/surrogate_keys.py --files 500k -o keys.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synth_library import build_catalogue, library_paths, parse_scale  # noqa: E402
+
+LEGACY_SCHEMA = """
+CREATE TABLE drives (id TEXT PRIMARY KEY, path TEXT, device TEXT, brand TEXT, model TEXT, serial TEXT, total_size INTEGER);
+CREATE TABLE media (id TEXT PRIMARY KEY, type TEXT, title TEXT, folder_path TEXT, drive_id TEXT, release_year INTEGER,
+    quality TEXT, tmdb_id INTEGER, sonarr_id INTEGER, radarr_id INTEGER, season_count INTEGER DEFAULT 0,
+    episode_count INTEGER DEFAULT 0, total_size INTEGER DEFAULT 0);
+CREATE TABLE seasons (id TEXT PRIMARY KEY, media_id TEXT, season_number INTEGER, folder_path TEXT,
+    episode_count INTEGER DEFAULT 0, total_size INTEGER DEFAULT 0);
+CREATE TABLE episodes (id TEXT PRIMARY KEY, season_id TEXT, episode_number INTEGER, title TEXT, size INTEGER DEFAULT 0);
+CREATE TABLE files (id TEXT PRIMARY KEY, media_id TEXT, season_id TEXT, episode_id TEXT, filename TEXT,
+    fullpath TEXT, drive_id TEXT, size INTEGER DEFAULT 0, mtime INTEGER DEFAULT 0,
+    fingerprint TEXT, fingerprint_size INTEGER, fingerprint_mtime INTEGER);
+"""
+
+# (name, legacy SQL, integer-key SQL); "?" is a media SHA1 where used
+QUERIES = [
+    ("detail_seasons",
+     "SELECT id, season_number, episode_count, total_size FROM seasons WHERE media_id=? ORDER BY season_number",
+     """SELECT s.id, s.season_number, s.episode_count, s.total_size FROM seasons s
+        JOIN media m ON m.pk = s.media_pk WHERE m.id=? ORDER BY s.season_number"""),
+    ("detail_episodes",
+     """SELECT e.id, e.season_id, s.season_number, e.episode_number, e.title, e.size FROM episodes e
+        JOIN seasons s ON e.season_id = s.id WHERE s.media_id=? ORDER BY s.season_number, e.episode_number""",
+     """SELECT e.id, s.id, s.season_number, e.episode_number, e.title, e.size FROM episodes e
+        JOIN seasons s ON e.season_pk = s.pk JOIN media m ON m.pk = s.media_pk WHERE m.id=?
+        ORDER BY s.season_number, e.episode_number"""),
+    ("detail_files",
+     "SELECT id, media_id, season_id, episode_id, filename, fullpath, size FROM files WHERE media_id=? ORDER BY filename",
+     """SELECT f.id, m.id, s.id, e.id, f.filename, d.path || '/' || f.filename, f.size FROM files f
+        JOIN media m ON m.pk = f.media_pk LEFT JOIN directories d ON d.pk = f.dir_pk
+        LEFT JOIN seasons s ON s.pk = f.season_pk
+        LEFT JOIN episodes e ON e.pk = f.episode_pk WHERE m.id=? ORDER BY f.filename"""),
+]
+
+# whole-table joins, run once each
+AGGREGATES = [
+    ("files_per_media",
+     "SELECT m.id, COUNT(*), SUM(f.size) FROM files f JOIN media m ON m.id = f.media_id GROUP BY m.id",
+     "SELECT m.id, COUNT(*), SUM(f.size) FROM files f JOIN media m ON m.pk = f.media_pk GROUP BY m.pk"),
+    ("episodes_per_media",
+     """SELECT s.media_id, COUNT(*) FROM episodes e JOIN seasons s ON s.id = e.season_id GROUP BY s.media_id""",
+     """SELECT s.media_pk, COUNT(*) FROM episodes e JOIN seasons s ON s.pk = e.season_pk GROUP BY s.media_pk"""),
+]
+
+
+def sha1_str(s):
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def build_legacy_db(path, files, seed):
+    """Legacy-layout DB with ids derived the way index_file derives them."""
+    catalogue = build_catalogue(files, seed)
+    rnd = random.Random(seed + 1)
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    drive_id = sha1_str("/mnt/archive")
+    conn.execute("INSERT INTO drives (id, path, total_size) VALUES (?, ?, ?)", (drive_id, "/mnt/archive", "16 TB"))
+    media, seasons, episodes, rows = {}, set(), [], []
+    for rel, size in library_paths(catalogue, rnd):
+        if not rel.endswith((".mkv", ".mp4", ".avi", ".m4v")):
+            continue
+        fullpath = f"/mnt/archive/{rel}"
+        parts = rel.split("/")
+        file_id = sha1_str(fullpath)
+        if parts[0] == "TV":
+            title, season_no = parts[1], int(parts[2].split()[-1])
+            episode_no = int(parts[3].split(" - ")[1].split("E")[-1])
+            media_id = sha1_str(title.lower())
+            season_id = sha1_str(f"{media_id}-S{season_no}")
+            episode_id = sha1_str(f"{season_id}-E{episode_no}")
+            media.setdefault(media_id, (media_id, "tv", title, f"/mnt/archive/TV/{title}", drive_id, None))
+            if season_id not in seasons:
+                seasons.add(season_id)
+                conn.execute("INSERT INTO seasons (id, media_id, season_number) VALUES (?, ?, ?)",
+                             (season_id, media_id, season_no))
+            episodes.append((episode_id, season_id, episode_no, f"Episode {episode_no}", size))
+        else:
+            title = parts[1]
+            media_id = sha1_str(title.lower())
+            season_id = episode_id = None
+            media.setdefault(media_id, (media_id, "movie", title, f"/mnt/archive/Movies/{title}", drive_id,
+                                        int(title[-5:-1]) if title.endswith(")") else None))
+        rows.append((file_id, media_id, season_id, episode_id, parts[-1], fullpath, drive_id, size,
+                     1_700_000_000 + rnd.randint(0, 10**7), sha1_str(file_id)[:32], size, 0))
+    conn.executemany("INSERT INTO media (id, type, title, folder_path, drive_id, release_year) VALUES (?,?,?,?,?,?)",
+                     media.values())
+    conn.executemany("INSERT OR IGNORE INTO episodes (id, season_id, episode_number, title, size) VALUES (?,?,?,?,?)",
+                     episodes)
+    conn.executemany("INSERT INTO files VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return len(rows), list(media)
+
+
+def db_size(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def table_sizes(conn):
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC").fetchall()
+    except sqlite3.OperationalError:
+        return None  # SQLite built without dbstat
+    return {name: size for name, size in rows}
+
+
+def time_queries(conn, media_ids, which, samples, rnd, skip_unindexed_update=False):
+    out = {}
+    legacy = which != "keyed"
+    picks = [rnd.choice(media_ids) for _ in range(samples)]
+    for name, legacy_sql, keyed_sql in QUERIES:
+        sql = legacy_sql if legacy else keyed_sql
+        timings = []
+        for media_id in picks:
+            t = time.perf_counter()
+            conn.execute(sql, (media_id,)).fetchall()
+            timings.append((time.perf_counter() - t) * 1000)
+        out[name] = {"median_ms": round(statistics.median(timings), 3),
+                     "p95_ms": round(sorted(timings)[int(len(timings) * .95)], 3)}
+    for name, legacy_sql, keyed_sql in AGGREGATES:
+        t = time.perf_counter()
+        conn.execute(legacy_sql if legacy else keyed_sql).fetchall()
+        out[name] = {"ms": round((time.perf_counter() - t) * 1000, 1)}
+    if skip_unindexed_update:
+        out["update_counts_movies"] = {"ms": None}  # a full files scan per movie: hours at this size
+        return out
+    t = time.perf_counter()
+    conn.execute(f"""UPDATE media SET total_size = (SELECT COALESCE(SUM(size),0) FROM files f
+                     WHERE {"f.media_id = media.id" if legacy else "f.media_pk = media.pk"}) WHERE type = 'movie'""")
+    out["update_counts_movies"] = {"ms": round((time.perf_counter() - t) * 1000, 1)}
+    conn.rollback()
+    return out
+
+
+# the shipped legacy schema had no foreign key indexes at all; this variant
+# adds the same indexes the migration creates, to separate index and key width
+LEGACY_INDEXES = [
+    "CREATE INDEX ix_legacy_seasons ON seasons(media_id, season_number)",
+    "CREATE INDEX ix_legacy_episodes ON episodes(season_id, episode_number)",
+    "CREATE INDEX ix_legacy_files ON files(media_id)",
+]
+
+
+def measure(conn, db, media_ids, which, args, **kwargs):
+    return {"db_bytes": db_size(db), "tables": table_sizes(conn),
+            "timings": time_queries(conn, media_ids, which, args.samples, random.Random(args.seed), **kwargs)}
+
+
+def check_stats(conn):
+    """The app's stats page has to work on the migrated DB, not just the timed joins."""
+    from services.tasks import ensure_connector_schema, ensure_media_schema
+    from services.fingerprint import ensure_fingerprint_schema
+    from services.checksum import ensure_checksum_schema
+    from services.probe import ensure_probe_schema
+    from services.stats import get_stats
+
+    for ensure in (ensure_connector_schema, ensure_media_schema, ensure_fingerprint_schema,
+                   ensure_checksum_schema, ensure_probe_schema):
+        ensure(conn)
+    top5 = get_stats()["archive"]["distribution"]["top5_largest"]
+    if len(top5) != 5:
+        raise SystemExit(f"❌ get_stats() on the migrated DB returned {len(top5)} of the top 5 titles")
+    print(f"✅ get_stats() on the migrated DB (largest: {top5[0]['title']})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", default="500k")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--samples", type=int, default=200, help="detail lookups per query")
+    ap.add_argument("--workdir", help="default /tmp/catalogerr-keys-<files>")
+    ap.add_argument("-o", "--output", help="write the JSON report here")
+    args = ap.parse_args()
+
+    files = parse_scale(args.files)
+    workdir = os.path.abspath(args.workdir or f"/tmp/catalogerr-keys-{files}")
+    output = os.path.abspath(args.output) if args.output else None
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    with open(os.path.join(workdir, "config.yaml"), "w") as f:
+        json.dump({"parent_paths": []}, f)
+    os.chdir(workdir)  # services.indexer reads config.yaml from the working directory
+
+    db = os.path.join(workdir, "index.db")
+    print(f"🧪 Building legacy DB with {files} files in {workdir}")
+    count, media_ids = build_legacy_db(db, files, args.seed)
+
+    conn = sqlite3.connect(db)
+    print("⏱ legacy (as shipped)")
+    before = measure(conn, db, media_ids, "legacy", args, skip_unindexed_update=count > 100_000)
+    print("⏱ legacy + foreign key indexes")
+    for sql in LEGACY_INDEXES:
+        conn.execute(sql)
+    conn.commit()
+    indexed = measure(conn, db, media_ids, "legacy", args)
+    for sql in LEGACY_INDEXES:
+        conn.execute(f"DROP INDEX {sql.split()[2]}")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    from services.indexer import create_schema
+    conn = sqlite3.connect(db)
+    print("🔑 migrating")
+    t = time.perf_counter()
+    create_schema(conn)
+    migrate_seconds = round(time.perf_counter() - t, 2)
+    print("⏱ integer keys")
+    after = measure(conn, db, media_ids, "keyed", args)
+    check_stats(conn)
+    conn.close()
+
+    report = {"files": count, "media": len(media_ids), "migrate_seconds": migrate_seconds,
+              "before": before, "legacy_indexed": indexed, "after": after}
+    print(f"\n{'':<28} {'before':>10} {'+indexes':>10} {'after':>10}")
+    print(f"{'db size (MB)':<28} {before['db_bytes'] / 2**20:>10.1f} "
+          f"{indexed['db_bytes'] / 2**20:>10.1f} {after['db_bytes'] / 2**20:>10.1f}")
+    for name, old in before["timings"].items():
+        key = "median_ms" if "median_ms" in old else "ms"
+        print(f"{name + ' (' + key + ')':<28} {str(old[key]):>10} "
+              f"{indexed['timings'][name][key]:>10} {after['timings'][name][key]:>10}")
+    print(f"migration: {migrate_seconds}s")
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
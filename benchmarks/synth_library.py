@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Synthetic media library generator for the benchmarks.
+
+Builds a deterministic (seeded) catalogue of movies and shows, writes it
+as a directory tree of sparse (or zero-byte) video files laid out the way
+Radarr/Sonarr name them, and saves the catalogue as catalogue.json so the
+stand-in TMDB/Sonarr/Radarr server (mock_upstream.py) answers with
+matching titles and ids.
+
+Usage:
+  python benchmarks/synth_library.py /tmp/lib --files 100000
+  python benchmarks/synth_library.py /tmp/lib --files 10k --zero-byte
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+CATALOGUE_FILE = "catalogue.json"
+MANIFEST_FILE = "manifest.json"
+
+MOVIE_SHARE = 0.3        # fraction of files that are movies, the rest are episodes
+EXTRAS_SHARE = 0.03      # .nfo/.srt/.jpg files next to the videos (indexer ignores them)
+
+ADJECTIVES = [
+    "Silent", "Crimson", "Last", "Broken", "Hidden", "Golden", "Dark", "Frozen", "Wild", "Lost",
+    "Electric", "Hollow", "Iron", "Midnight", "Savage", "Quiet", "Burning", "Endless", "Velvet", "Northern",
+]
+NOUNS = [
+    "Harbor", "Empire", "Signal", "Garden", "Protocol", "Frontier", "Witness", "Kingdom", "Horizon", "Machine",
+    "River", "Station", "Covenant", "Orchard", "Legacy", "Circuit", "Island", "Archive", "Summit", "Crossing",
+]
+SUFFIXES = ["", "", "", " Returns", " Rising", ": Origins", " II", " of the North", " Chronicles", " Unbound"]
+QUALITIES = ["1080p", "2160p", "720p", "Bluray-1080p", "WEBDL-1080p", "HDTV-720p"]
+EXTS = [".mkv", ".mkv", ".mkv", ".mp4", ".avi", ".m4v"]
+EXTRAS = [".nfo", ".srt", ".jpg"]
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+
+def parse_scale(value):
+    """'10k' / '100k' / '1m' / '25000' -> int."""
+    value = str(value).strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if mult > 1 else value) * mult)
+
+
+SYLLABLES = ["ka", "ro", "mi", "ta", "ve", "lo", "sa", "nu", "de", "ri", "po", "za", "be", "ly", "ko",
+             "ma", "te", "gu", "ni", "fa", "so", "ha", "le", "du", "vi", "ne", "ba", "to", "ru", "me"]
+
+
+def _word(n):
+    """n -> a pronounceable made-up word (no digits: the parser would read them as years)."""
+    out = ""
+    while True:
+        n, r = divmod(n, len(SYLLABLES))
+        out += SYLLABLES[r]
+        if not n:
+            return out.capitalize()
+
+
+def _title(rnd, n):
+    base = f"The {rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)}{rnd.choice(SUFFIXES)}"
+    # titles must stay unique at 1M files: add a made-up word once the word space runs out
+    return base if n < 1500 else f"{base} of {_word(n)}"
+
+
+def build_catalogue(files, seed=42):
+    """Deterministic list of movies and shows totalling roughly `files` video files."""
+    rnd = random.Random(seed)
+    movies, shows = [], []
+    seen = set()
+
+    def unique_title():
+        n = len(seen)
+        while True:
+            t = _title(rnd, n)
+            if t.lower() not in seen:
+                seen.add(t.lower())
+                return t
+            n += 1
+
+    movie_files = int(files * MOVIE_SHARE)
+    for i in range(movie_files):
+        movies.append({
+            "id": i + 1,
+            "tmdb_id": 100_000 + i,
+            "imdb_id": f"tt{2_000_000 + i}",
+            "title": unique_title(),
+            "year": rnd.randint(1950, 2024),
+            "quality": rnd.choice(QUALITIES),
+            "size": rnd.randint(1 * GB, 8 * GB),
+        })
+
+    episode_files = files - movie_files
+    i = 0
+    while episode_files > 0:
+        seasons = [rnd.randint(6, 24) for _ in range(rnd.choice([1, 2, 3, 5, 8, 12, 20]))]
+        total = sum(seasons)
+        if total > episode_files:
+            seasons, total = [episode_files], episode_files
+        shows.append({
+            "id": i + 1,
+            "tmdb_id": 500_000 + i,
+            "tvdb_id": 300_000 + i,
+            "imdb_id": f"tt{5_000_000 + i}",
+            "title": unique_title(),
+            "year": rnd.randint(1980, 2024),
+            "seasons": seasons,
+            "episode_size": rnd.randint(300 * MB, 2 * GB),
+        })
+        episode_files -= total
+        i += 1
+
+    return {"seed": seed, "files": files, "movies": movies, "shows": shows}
+
+
+def _clean(name):
+    return name.replace(":", "").replace("/", "-")
+
+
+def library_paths(catalogue, rnd):
+    """Yield (relative path, size) for every file of the catalogue."""
+    for m in catalogue["movies"]:
+        folder = f"Movies/{_clean(m['title'])} ({m['year']})"
+        yield f"{folder}/{_clean(m['title'])} ({m['year']}) {m['quality']}{rnd.choice(EXTS)}", m["size"]
+        if rnd.random() < EXTRAS_SHARE:
+            yield f"{folder}/{_clean(m['title'])} ({m['year']}){rnd.choice(EXTRAS)}", 4096
+
+    for s in catalogue["shows"]:
+        show = _clean(s["title"])
+        for season, episodes in enumerate(s["seasons"], start=1):
+            for ep in range(1, episodes + 1):
+                yield (f"TV/{show}/Season {season:02}/{show} - S{season:02}E{ep:02} - Episode {ep} [HDTV-720p].mkv",
+                       s["episode_size"])
+            if rnd.random() < EXTRAS_SHARE:
+                yield f"TV/{show}/Season {season:02}/season.nfo", 2048
+
+
+def generate_library(root, files, seed=42, zero_byte=False):
+    """
+    Create the tree under root (skipped when an identical one already exists).
+    Returns the catalogue.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+    wanted = {"files": files, "seed": seed, "zero_byte": zero_byte}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) == wanted:
+                with open(os.path.join(root, CATALOGUE_FILE)) as c:
+                    return json.load(c)
+
+    catalogue = build_catalogue(files, seed)
+    rnd = random.Random(seed + 1)
+    made_dirs = set()
+    count = 0
+    for rel, size in library_paths(catalogue, rnd):
+        path = os.path.join(root, "library", rel)
+        folder = os.path.dirname(path)
+        if folder not in made_dirs:
+            os.makedirs(folder, exist_ok=True)
+            made_dirs.add(folder)
+        with open(path, "wb") as f:
+            if not zero_byte:
+                f.truncate(size)  # sparse: reports the size without using the disk
+        count += 1
+        if count % 100_000 == 0:
+            print(f"   … {count} files written")
+
+    with open(os.path.join(root, CATALOGUE_FILE), "w") as f:
+        json.dump(catalogue, f)
+    with open(manifest_path, "w") as f:
+        json.dump(wanted, f)
+    print(f"✅ Generated {count} files ({len(catalogue['movies'])} movies, {len(catalogue['shows'])} shows) in {root}")
+    return catalogue
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("root")
+    ap.add_argument("--files", default="10k", help="number of video files: 10k, 100k, 1m, ...")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--zero-byte", action="store_true", help="empty files instead of sparse ones")
+    args = ap.parse_args()
+    generate_library(args.root, parse_scale(args.files), args.seed, args.zero_byte)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,12 +5,14 @@ RELEASE_URL="https://github.com/CipherWorkZ/Catalogerr_live/releases/download/v1
 TMP_DIR="/tmp/catalogerr_install"
 INSTALL_DIR="/etc/Catalogerr_live"
 SERVICE_PATH="/etc/systemd/system/catalogerr-api.service"
+WORKER_SERVICE_PATH="/etc/systemd/system/catalogerr-worker.service"
 
 # Detect install user (prioritize sudo user, fallback to current)
 INSTALL_USER="${SUDO_USER:-$USER}"
 INSTALL_GROUP=$(id -gn "$INSTALL_USER")
 
-# Detect gunicorn binary for the install user
+# Detect python + gunicorn binaries for the install user
+PYTHON_BIN=$(sudo -u "$INSTALL_USER" which python3 2>/dev/null || which python3)
 GUNICORN_BIN=$(sudo -u "$INSTALL_USER" which gunicorn 2>/dev/null || which gunicorn)
 
 echo "📦 Catalogerr Installer v1.1.3"
@@ -111,7 +113,7 @@ After=network.target
 User=$INSTALL_USER
 Group=$INSTALL_GROUP
 WorkingDirectory=$INSTALL_DIR
-ExecStart=$GUNICORN_BIN main:app --workers 1 --threads 8 --worker-class gthread --timeout 180 --bind 0.0.0.0:8008
+ExecStart=$GUNICORN_BIN main:app --workers 1 --threads 64 --worker-class gthread --timeout 180 --bind 0.0.0.0:8008
 Restart=always
 RestartSec=5
 Environment="FLASK_ENV=production"
@@ -121,9 +123,31 @@ EnvironmentFile=-$INSTALL_DIR/.env
 WantedBy=multi-user.target
 EOL
 
-# 8. Enable service (don’t start it yet)
+echo "➡️ Creating worker service at $WORKER_SERVICE_PATH ..."
+cat > "$WORKER_SERVICE_PATH" <<EOL
+[Unit]
+Description=Catalogerr background job worker
+After=network.target catalogerr-api.service
+
+[Service]
+User=$INSTALL_USER
+Group=$INSTALL_GROUP
+WorkingDirectory=$INSTALL_DIR
+ExecStart=$PYTHON_BIN worker.py
+Restart=always
+RestartSec=5
+KillSignal=SIGTERM
+TimeoutStopSec=300
+EnvironmentFile=-$INSTALL_DIR/.env
+
+[Install]
+WantedBy=multi-user.target
+EOL
+
+# 8. Enable services (don’t start them yet)
 sudo systemctl daemon-reload
 sudo systemctl enable catalogerr-api.service
+sudo systemctl enable catalogerr-worker.service
 
 # 9. Cleanup
 echo "➡️ Cleaning up temp files..."
@@ -135,7 +159,7 @@ echo "⚡ Next steps:"
 echo "1. Create your first admin user:"
 echo "   cd $INSTALL_DIR && sudo -u $INSTALL_USER python3 admin.py"
 echo
-echo "2. Once admin is created, start the service:"
-echo "   sudo systemctl start catalogerr-api.service"
+echo "2. Once admin is created, start the services:"
+echo "   sudo systemctl start catalogerr-api.service catalogerr-worker.service"
 echo
 echo "3. Then access Catalogerr at: http://<your-server-ip>:8008"
@@ -1,20 +1,29 @@
 import os
 import atexit
 import sqlite3
-import queue
 import logging
 import json
 import platform
 import subprocess
-from flask import Flask
+import time
+from flask import Flask, request, g
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_SUBMITTED
 from dotenv import load_dotenv
 
 from services.indexer import create_schema, DB_FILE
-from services.tasks import TASK_DEFINITIONS, register_task, TASKS, TASK_EVENTS, push_task_event
-from services.jobs import job_submitted, job_executed, job_error
+from services.tasks import TASK_DEFINITIONS, register_task, TASKS, push_task_event, ensure_connector_schema
+from services.jobs import job_submitted, job_executed, job_error, job_queue_changed, restore_task_state
+from services.task_runs import ensure_task_runs_schema
+from services.metrics import HTTP_LATENCY, ensure_metrics_schema, install_http_metrics
+from services import profiler
+from services.auth import has_valid_api_key
+from services.job_queue import TASK_DISPATCH, ensure_job_queue_schema, watch_job_queue
+from services.scan_jobs import ensure_scan_schema
+from services.fingerprint import ensure_fingerprint_schema
+from services.checksum import ensure_checksum_schema
+from services.probe import ensure_probe_schema
 from routes.tasks import init_tasks
 
 # --- Load environment ---
@@ -102,9 +111,62 @@ app.secret_key = os.getenv("APP_SECRET", "changeme")
 def inject_now():
     return {'now': datetime.now()}
 
+# --- Metrics: route latency + outbound HTTP (see /metrics) ---
+install_http_metrics()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        HTTP_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            endpoint=request.endpoint or "unmatched",
+            status=str(response.status_code),
+        )
+    return response
+
+# --- Profiling: PROFILE_REQUESTS=1, or X-Profile: 1 / ?profile=1 with a valid API key (see /api/v3/system/profile) ---
+profiler.install()
+
+@app.before_request
+def start_profile():
+    if request.path.startswith("/api/v3/system/profile"):
+        return
+    if not profiler.wants_profile(request.headers, request.args):
+        return
+    # per-request opt-in needs an API key, like the endpoints that read the profiles back
+    if profiler.PROFILE_REQUESTS or has_valid_api_key():
+        profiler.start(request.method, profiler.request_path(request.path, request.args), request.endpoint)
+
+@app.after_request
+def finish_profile(response):
+    profile = profiler.stop(response.status_code)
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile["id"]
+        response.headers["Server-Timing"] = profiler.server_timing(profile)
+    return response
+
+@app.teardown_request
+def discard_profile(exc):
+    if exc is not None:
+        profiler.stop(500)
+
 # --- Database init ---
 with sqlite3.connect(DB_FILE) as conn:
     create_schema(conn)
+    ensure_connector_schema(conn)
+    ensure_scan_schema(conn)
+    ensure_fingerprint_schema(conn)
+    ensure_checksum_schema(conn)
+    ensure_probe_schema(conn)
+    ensure_job_queue_schema(conn)
+    ensure_task_runs_schema(conn)
+    ensure_metrics_schema(conn)
 
 # --- Scheduler ---
 scheduler = BackgroundScheduler()
@@ -113,10 +175,15 @@ atexit.register(lambda: scheduler.shutdown(wait=False))
 
 for task in TASK_DEFINITIONS:
     register_task(task, scheduler, TASKS)
+restore_task_state()
 
-scheduler.add_listener(job_submitted, EVENT_JOB_SUBMITTED)
-scheduler.add_listener(job_executed, EVENT_JOB_EXECUTED)
-scheduler.add_listener(job_error, EVENT_JOB_ERROR)
+if TASK_DISPATCH == "worker":
+    # Jobs run in worker.py; follow their state through the job queue
+    watch_job_queue(job_queue_changed)
+else:
+    scheduler.add_listener(job_submitted, EVENT_JOB_SUBMITTED)
+    scheduler.add_listener(job_executed, EVENT_JOB_EXECUTED)
+    scheduler.add_listener(job_error, EVENT_JOB_ERROR)
 
 # --- Register routes ---
 from routes.auth import auth_bp
@@ -124,14 +191,15 @@ from routes.catalog import catalog_bp
 from routes.drives import drives_bp
 from routes.system import system_bp
 from routes.scan import scan_bp
+from routes.events import events_bp
 from routes.tasks import tasks_bp
 from routes.connectors import connectors_bp
 from routes.backup import backup_bp
 from routes.list import list_bp
 from routes.stats import stats_bp
+from routes.metrics import metrics_bp
 
-# init tasks with shared queue + scheduler
-TASK_EVENTS = queue.Queue()
+# init tasks with scheduler (task events go through services.events.BUS)
 init_tasks(scheduler)
 
 # blueprints
@@ -140,11 +208,13 @@ app.register_blueprint(catalog_bp)
 app.register_blueprint(drives_bp)
 app.register_blueprint(system_bp)
 app.register_blueprint(scan_bp)
+app.register_blueprint(events_bp)
 app.register_blueprint(stats_bp)
 app.register_blueprint(tasks_bp)
 app.register_blueprint(connectors_bp)
 app.register_blueprint(backup_bp)
 app.register_blueprint(list_bp)
+app.register_blueprint(metrics_bp)
 
 # --- Entry point ---
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ from datetime import datetime
 from services.indexer import DB_FILE  # your DB file path
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CONFIG_FILE = os.path.join(ROOT_DIR, "connector.yaml")
+CONFIG_FILE = os.getenv("CONNECTOR_CONFIG", os.path.join(ROOT_DIR, "connector.yaml"))
 
 
 def load_connectors():
@@ -23,8 +23,10 @@ def save_connectors(cfg):
 
 def fetch_connector_stats(base_url, api_key, app_type="radarr", connector_id=None):
     """
-    Fetch connector stats: system status, queue, diskspace, media count.
-    Also syncs local DB by removing media no longer present in Radarr/Sonarr.
+    Fetch live connector stats: system status, queue, diskspace.
+    Used to validate/test a connector on demand. Pruning of connector_media
+    is done by the connector_media_sync job, never here; media_count comes
+    from its cached connector_summary.
     """
     base_url = base_url.rstrip("/")
     headers = {"X-Api-Key": api_key}
@@ -58,6 +60,7 @@ def fetch_connector_stats(base_url, api_key, app_type="radarr", connector_id=Non
         stats["version"] = sysdata.get("version")
     elif isinstance(sysdata, dict) and "error" in sysdata:
         stats["error"] = sysdata["error"]
+        return stats  # unreachable, don't wait on the other endpoints too
 
     # --- Queue
     queue = safe_get("/api/v3/queue")
@@ -77,39 +80,15 @@ def fetch_connector_stats(base_url, api_key, app_type="radarr", connector_id=Non
             f"{round(free/1e12, 2)}TB free"
         )
 
-    # --- Media sync with connector_media ---
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
+    # --- Media count (cached by the sync job)
     if connector_id:
-        if app_type.lower() == "radarr":
-            movies = safe_get("/api/v3/movie")
-            if isinstance(movies, list):
-                stats["media_count"] = len(movies)
-                remote_ids = {str(m["id"]) for m in movies}
-
-                cur.execute("SELECT id, external_id FROM connector_media WHERE connector_id=?", (connector_id,))
-                local = cur.fetchall()
-                for row in local:
-                    if str(row["external_id"]) not in remote_ids:
-                        print(f"🗑 Removing missing Radarr media: {row['external_id']}")
-                        cur.execute("DELETE FROM connector_media WHERE id=?", (row["id"],))
-                conn.commit()
-
-        elif app_type.lower() == "sonarr":
-            series = safe_get("/api/v3/series")
-            if isinstance(series, list):
-                stats["media_count"] = len(series)
-                remote_ids = {str(s["id"]) for s in series}
-
-                cur.execute("SELECT id, external_id FROM connector_media WHERE connector_id=?", (connector_id,))
-                local = cur.fetchall()
-                for row in local:
-                    if str(row["external_id"]) not in remote_ids:
-                        print(f"🗑 Removing missing Sonarr series: {row['external_id']}")
-                        cur.execute("DELETE FROM connector_media WHERE id=?", (row["id"],))
-                conn.commit()
+        try:
+            with sqlite3.connect(DB_FILE) as conn:
+                row = conn.execute(
+                    "SELECT media_count FROM connector_summary WHERE connector_id=?", (connector_id,)
+                ).fetchone()
+            stats["media_count"] = row[0] if row else 0
+        except sqlite3.OperationalError:
+            pass
 
-    conn.close()
     return stats
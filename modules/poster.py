@@ -2,6 +2,7 @@ import os
 import sqlite3
 import requests
 from dotenv import load_dotenv
+from services.utils import TMDB_API_URL, TMDB_IMAGE_URL
 
 DB_FILE = "index.db"
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "static", "posters")
@@ -16,7 +17,7 @@ os.makedirs(STATIC_DIR, exist_ok=True)
 
 def fetch_tmdb_poster(tmdb_id, mtype="movie"):
     """Query TMDB for poster path using TMDB ID."""
-    url = f"https://api.themoviedb.org/3/{mtype}/{tmdb_id}"
+    url = f"{TMDB_API_URL}/{mtype}/{tmdb_id}"
     try:
         r = requests.get(url, params={"api_key": TMDB_API_KEY}, timeout=15)
         r.raise_for_status()
@@ -31,7 +32,7 @@ def download_and_store(media_id, poster_path):
     if not poster_path or not poster_path.startswith("/"):
         return None
 
-    tmdb_url = f"https://image.tmdb.org/t/p/original{poster_path}"
+    tmdb_url = f"{TMDB_IMAGE_URL}/original{poster_path}"
 
     # Create per-media folder
     folder = os.path.join(STATIC_DIR, media_id)
@@ -116,12 +117,12 @@ def normalize_poster(media_id, poster_url, tmdb_id=None, media_type="movie", con
     # Fetch from TMDB if we have an id
     if tmdb_id:
         try:
-            url = f"https://api.themoviedb.org/3/{'tv' if media_type=='tv' else 'movie'}/{tmdb_id}"
+            url = f"{TMDB_API_URL}/{'tv' if media_type=='tv' else 'movie'}/{tmdb_id}"
             r = requests.get(url, params={"api_key": TMDB_API_KEY}, timeout=10)
             r.raise_for_status()
             data = r.json()
             if data.get("poster_path"):
-                tmdb_poster_url = f"https://image.tmdb.org/t/p/w500{data['poster_path']}"
+                tmdb_poster_url = f"{TMDB_IMAGE_URL}/w500{data['poster_path']}"
 
                 # Download and save locally
                 img = requests.get(tmdb_poster_url, timeout=10)
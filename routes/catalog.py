@@ -1,8 +1,9 @@
 import os
 import sqlite3
 from flask import Blueprint, jsonify, render_template, request, send_from_directory, abort
-from services.indexer import DB_FILE
+from services.indexer import DB_FILE, drive_for_directory
 from services.auth import require_api_key
+from services.compress import LazyJSON
 
 catalog_bp = Blueprint("catalog", __name__, url_prefix="/")
 
@@ -61,9 +62,11 @@ def catalog_json():
     cur = conn.cursor()
     cur.execute("""
         SELECT m.id, m.type, m.title, m.season_count, m.episode_count,
-               m.total_size, m.tmdb_id, m.folder_path, md.poster_url
+               m.total_size, m.tmdb_id, fd.path AS folder_path, md.poster_url
         FROM media m
+        LEFT JOIN directories fd ON fd.pk = m.folder_pk
         LEFT JOIN metadata md ON m.id = md.media_id
+        WHERE m.deleted_at IS NULL
         ORDER BY m.title COLLATE NOCASE
     """)
     rows = cur.fetchall()
@@ -98,10 +101,12 @@ def api_active_catalog():
 def api_active_media_detail(media_id):
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
-    row = conn.execute("""
+    # raw_json is compressed; only fetch + inflate it when asked for (?raw=1)
+    include_raw = request.args.get("raw") in ("1", "true")
+    row = conn.execute(f"""
         SELECT m.id, m.connector_id, m.title, m.media_type, m.tmdb_id, m.imdb_id,
                m.poster_url, m.year, m.remote_id, m.title_slug,
-               c.base_url, c.app_type
+               c.base_url, c.app_type{", m.raw_json" if include_raw else ""}
         FROM connector_media m
         JOIN connectors c ON m.connector_id = c.id
         WHERE m.id=?
@@ -111,6 +116,8 @@ def api_active_media_detail(media_id):
         return jsonify({"error": "Not found"}), 404
     data = dict(row)
     data["poster_url"] = normalize_poster(data["poster_url"])
+    if include_raw:
+        data["raw"] = LazyJSON(data.pop("raw_json"), {}).value
 
     if data["app_type"].lower() == "sonarr":
         slug_or_id = data.get("title_slug") or data.get("remote_id")
@@ -132,14 +139,19 @@ def search_page():
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         cur.execute("""
-            SELECT m.id, m.title, m.type, m.folder_path,
-                   d.path AS drive_path, d.device, d.brand, d.model, d.serial
+            SELECT m.id, m.title, m.type, m.folder_pk, fd.path AS folder_path
             FROM media m
-            LEFT JOIN drives d ON m.folder_path LIKE d.path || '%'
-            WHERE m.title LIKE ?
+            LEFT JOIN directories fd ON fd.pk = m.folder_pk
+            WHERE m.title LIKE ? AND m.deleted_at IS NULL
             ORDER BY m.title ASC
         """, (f"%{query}%",))
-        results = [dict(r) for r in cur.fetchall()]
+        for r in cur.fetchall():
+            result = dict(r)
+            drive = drive_for_directory(conn, result.pop("folder_pk"))
+            for key in ("device", "brand", "model", "serial"):
+                result[key] = drive[key] if drive else None
+            result["drive_path"] = drive["path"] if drive else None
+            results.append(result)
         conn.close()
 
     return render_template("search.html", query=query, results=results)
@@ -150,7 +162,15 @@ def search_page():
 def list_media():
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT * FROM media").fetchall()
+    # the public shape from before the surrogate keys: no pk/folder_pk/deleted_at
+    rows = conn.execute("""
+        SELECT m.id, m.type, m.title, fd.path AS folder_path, m.drive_id, m.release_year,
+               m.quality, m.tmdb_id, m.sonarr_id, m.radarr_id,
+               m.season_count, m.episode_count, m.total_size
+        FROM media m
+        LEFT JOIN directories fd ON fd.pk = m.folder_pk
+        WHERE m.deleted_at IS NULL
+    """).fetchall()
     conn.close()
     return jsonify([dict(r) for r in rows])
 
@@ -174,45 +194,49 @@ def api_catalog_detail(media_id):
     # --- Base media info ---
     row = conn.execute("""
         SELECT m.id, m.type, m.title, m.season_count, m.episode_count,
-               m.total_size, m.tmdb_id, m.folder_path, 
-               md.poster_url, md.backdrop_url, md.overview, md.genres, md.rating, md.year,
-               d.id AS drive_id, d.path AS drive_path, d.device, d.brand,
-               d.model, d.serial, d.total_size AS drive_size
+               m.total_size, m.tmdb_id, m.folder_pk, fd.path AS folder_path,
+               md.poster_url, md.backdrop_url, md.overview, md.genres, md.rating, md.year
         FROM media m
+        LEFT JOIN directories fd ON fd.pk = m.folder_pk
         LEFT JOIN metadata md ON m.id = md.media_id
-        LEFT JOIN drives d ON m.folder_path LIKE d.path || '%'
-        WHERE m.id=?
-        ORDER BY LENGTH(d.path) DESC
-        LIMIT 1
+        WHERE m.id=? AND m.deleted_at IS NULL
     """, (media_id,)).fetchone()
 
     if not row:
         conn.close()
         return jsonify({"error": "Not found"}), 404
+    drive = drive_for_directory(conn, row["folder_pk"])
 
     # --- Seasons ---
     seasons = conn.execute("""
-        SELECT id, season_number, episode_count, total_size
-        FROM seasons
-        WHERE media_id=?
-        ORDER BY season_number ASC
+        SELECT s.id, s.season_number, s.episode_count, s.total_size
+        FROM seasons s
+        JOIN media m ON m.pk = s.media_pk
+        WHERE m.id=? AND s.deleted_at IS NULL
+        ORDER BY s.season_number ASC
     """, (media_id,)).fetchall()
 
     # --- Episodes (include season number) ---
     episodes = conn.execute("""
-        SELECT e.id, e.season_id, s.season_number, e.episode_number, e.title, e.size
+        SELECT e.id, s.id AS season_id, s.season_number, e.episode_number, e.title, e.size
         FROM episodes e
-        JOIN seasons s ON e.season_id = s.id
-        WHERE s.media_id=?
+        JOIN seasons s ON e.season_pk = s.pk
+        JOIN media m ON m.pk = s.media_pk
+        WHERE m.id=? AND e.deleted_at IS NULL
         ORDER BY s.season_number ASC, e.episode_number ASC
     """, (media_id,)).fetchall()
 
     # --- Files ---
     files = conn.execute("""
-        SELECT id, media_id, season_id, episode_id, filename, fullpath, size
-        FROM files
-        WHERE media_id=?
-        ORDER BY filename ASC
+        SELECT f.id, m.id AS media_id, s.id AS season_id, e.id AS episode_id,
+               f.filename, d.path || '/' || f.filename AS fullpath, f.size
+        FROM files f
+        JOIN media m ON m.pk = f.media_pk
+        LEFT JOIN directories d ON d.pk = f.dir_pk
+        LEFT JOIN seasons s ON s.pk = f.season_pk
+        LEFT JOIN episodes e ON e.pk = f.episode_pk
+        WHERE m.id=? AND f.deleted_at IS NULL
+        ORDER BY f.filename ASC
     """, (media_id,)).fetchall()
 
     conn.close()
@@ -234,14 +258,15 @@ def api_catalog_detail(media_id):
         "rating": row["rating"],
         "releaseYear": row["year"],
         "drive": {
-            "id": row["drive_id"],
-            "path": row["drive_path"],
-            "device": row["device"],
-            "brand": row["brand"],
-            "model": row["model"],
-            "serial": row["serial"],
-            "size": row["drive_size"]
-        } if row["drive_id"] else None,
+            "id": drive["id"],
+            "path": drive["path"],
+            "device": drive["device"],
+            "brand": drive["brand"],
+            "model": drive["model"],
+            "serial": drive["serial"],
+            "size": drive["total_size"],
+            "online": drive["online"] != 0
+        } if drive else None,
         "seasons": [dict(s) for s in seasons],
         "episodes": [dict(e) for e in episodes],
         "files": [dict(f) for f in files]
@@ -254,10 +279,10 @@ def api_active_catalog_detail(media_id):
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
 
-    # --- Base info from connector_media ---
+    # --- Base info from connector_media (raw_json stays compressed until used) ---
     row = conn.execute("""
         SELECT m.id, m.connector_id, m.title, m.media_type, m.tmdb_id, m.imdb_id,
-               m.poster_url, m.year, m.remote_id, m.title_slug,
+               m.poster_url, m.year, m.remote_id, m.title_slug, m.raw_json,
                c.base_url, c.app_type
         FROM connector_media m
         JOIN connectors c ON m.connector_id = c.id
@@ -302,6 +327,7 @@ def api_active_catalog_detail(media_id):
     # --- App-specific link ---
     data = dict(row)
     data["poster_url"] = normalize_poster(data["poster_url"])
+    raw = LazyJSON(data.pop("raw_json"), {})
 
     if data["app_type"].lower() == "sonarr":
         slug_or_id = data.get("title_slug") or data.get("remote_id")
@@ -323,6 +349,9 @@ def api_active_catalog_detail(media_id):
         "connectorId": data["connector_id"],
         "appType": data["app_type"],
         "appUrl": data["app_url"],
+        "overview": raw.value.get("overview"),
+        "status": raw.value.get("status"),
+        "sizeOnDisk": raw.value.get("sizeOnDisk") or (raw.value.get("statistics") or {}).get("sizeOnDisk"),
         "seasons": [dict(s) for s in seasons],
         "episodes": [dict(e) for e in episodes],
         "files": [dict(f) for f in files]
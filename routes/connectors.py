@@ -1,38 +1,72 @@
+import sqlite3, threading
 from flask import Blueprint, jsonify, request, render_template
 from modules.connector import load_connectors, save_connectors, fetch_connector_stats
 from services.auth import require_api_key
+from services.indexer import DB_FILE
+from services.tasks import TASKS, run_connector_stats, uid_for
+from services.job_queue import TASK_DISPATCH, enqueue_job
 
 connectors_bp = Blueprint("connectors", __name__, url_prefix="/api/v3")
 
 
+def refresh_connector_stats_async():
+    """
+    Queue a connector_stats run for the worker (merged with one already
+    queued or running) and return its job handle. With TASK_DISPATCH=inline
+    there is no worker, so it runs on a background thread and returns None.
+    """
+    if TASK_DISPATCH == "worker":
+        return enqueue_job("connector_stats", TASKS.get("connector_stats", {}).get("name"), "api")
+    threading.Thread(target=run_connector_stats, name="connector-stats-refresh", daemon=True).start()
+    return None
+
+
+def load_cached_status():
+    """Latest snapshot per connector as written by the connector_stats job."""
+    try:
+        with sqlite3.connect(DB_FILE) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT connector_id, status, version, error, checked_at
+                FROM connector_latest
+            """).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {row["connector_id"]: dict(row) for row in rows}
+
+
 # Page render
 @connectors_bp.route("/connector")
 def connector_page():
     return render_template("app.html")
 
 
-# List all connectors (with live status)
+# List all connectors (cached status from the stats job; ?refresh=1 re-polls in the background)
 @connectors_bp.get("/connectors")
 @require_api_key
 def list_connectors():
     cfg = load_connectors()
-    result = {}
+    cached = load_cached_status()
+    refreshing = request.args.get("refresh") in ("1", "true")
+    job = refresh_connector_stats_async() if refreshing else None
 
+    result = {}
     for app, data in cfg.items():
-        stats = fetch_connector_stats(
-            data.get("base_url"),
-            data.get("api_key"),
-            app_type=app,
-            connector_id=data.get("id", app),
-        )
+        stats = cached.get(uid_for(app, data.get("base_url")), {})
         result[app] = {
             "base_url": data.get("base_url"),
             "api_key": data.get("api_key"),
-            "status": stats["status"] == "success",
+            "status": stats.get("status") == "success",
             "version": stats.get("version"),
-            "error": stats.get("error"),
+            "error": stats.get("error") if stats else "Not checked yet",
+            "last_check": stats.get("checked_at"),
+            "refreshing": refreshing,
         }
-    return jsonify(result)
+    if not refreshing:
+        return jsonify(result)
+    # the listing is still the cached one; the refresh shows up in the next call
+    headers = {"Location": f"/api/v3/tasks/jobs/{job['id']}"} if job else {}
+    return jsonify(result), 202, headers
 
 
 # Add or update a connector (validates before saving)
@@ -54,6 +88,7 @@ def add_connector():
     cfg = load_connectors()
     cfg[app_type] = {"base_url": base_url, "api_key": api_key}
     save_connectors(cfg)
+    refresh_connector_stats_async()
 
     return jsonify({"status": "saved", "connector": cfg[app_type]})
 
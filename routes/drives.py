@@ -1,6 +1,7 @@
 import sqlite3
 from flask import Blueprint, jsonify, request
 from services.indexer import DB_FILE
+from services.mounts import probe_drives
 
 drives_bp = Blueprint("drives", __name__, url_prefix="/api/v3")
 
@@ -61,10 +62,16 @@ def root_folders():
     conn.row_factory = sqlite3.Row
     rows = conn.execute("SELECT id, path, total_size FROM drives").fetchall()
     conn.close()
-    return jsonify([{
-        "id": r["id"], "path": r["path"],
-        "freeSpace": r["total_size"], "accessible": True
-    } for r in rows])
+    states = probe_drives([r["path"] for r in rows if r["path"]])  # cached, bounded by MOUNT_PROBE_TIMEOUT
+    folders = []
+    for r in rows:
+        state = states.get(r["path"], {})
+        folders.append({
+            "id": r["id"], "path": r["path"],
+            "freeSpace": state["free"] if state.get("free") is not None else r["total_size"],
+            "accessible": state.get("state") in ("online", "slow")
+        })
+    return jsonify(folders)
 
 @drives_bp.get("/drives/json")
 def get_drives_json():
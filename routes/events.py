@@ -0,0 +1,44 @@
+from flask import Blueprint, Response, request, jsonify
+from services.auth import require_api_key
+from services.events import open_stream, busy_stream, sse_response, sse_stream, format_sse
+from routes.scan import scan_snapshot_renderer
+from routes.system import ensure_status_publisher
+
+events_bp = Blueprint("events", __name__, url_prefix="/api/v3")
+
+STREAM_CHANNELS = ("tasks", "scan", "system")
+
+
+@events_bp.route("/events/stream")
+@require_api_key
+def event_stream():
+    """
+    One SSE stream per dashboard for all the channels it shows:
+    ?channels=tasks,scan,system (default: all). Events are named
+    <channel>.<event>, e.g. tasks.start, scan.update, system.status.
+    """
+    channels = [c for c in request.args.get("channels", ",".join(STREAM_CHANNELS)).split(",") if c]
+    unknown = [c for c in channels if c not in STREAM_CHANNELS]
+    if not channels or unknown:
+        return jsonify({"error": f"Unknown channels: {', '.join(unknown)}" if unknown else "No channels"}), 400
+
+    if "system" in channels:
+        ensure_status_publisher()
+    sub = open_stream(*channels)
+    if sub is None:
+        return Response(busy_stream(), mimetype="text/event-stream")
+    render_scan = scan_snapshot_renderer("scan.update")
+
+    def render(msg):
+        if msg["channel"] == "scan":
+            return render_scan(msg)
+        return format_sse(msg["data"], f"{msg['channel']}.{msg['event']}")
+
+    def events():
+        try:
+            if "scan" in channels:
+                yield render_scan(None)
+            yield from sse_stream(sub, render=render)
+        finally:
+            sub.close()
+    return sse_response(sub, events())
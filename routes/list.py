@@ -8,7 +8,7 @@ list_bp = Blueprint("list", __name__, url_prefix="/api/v3/list")
 def list_movies():
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT title, release_year, tmdb_id FROM media WHERE type='movie' AND tmdb_id IS NOT NULL").fetchall()
+    rows = conn.execute("SELECT title, release_year, tmdb_id FROM media WHERE type='movie' AND tmdb_id IS NOT NULL AND deleted_at IS NULL").fetchall()
     conn.close()
     return jsonify([{"title":r["title"],"year":r["release_year"],"tmdbId":r["tmdb_id"]} for r in rows])
 
@@ -16,6 +16,6 @@ def list_movies():
 def list_series():
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT title, release_year, tmdb_id FROM media WHERE type='tv' AND tmdb_id IS NOT NULL").fetchall()
+    rows = conn.execute("SELECT title, release_year, tmdb_id FROM media WHERE type='tv' AND tmdb_id IS NOT NULL AND deleted_at IS NULL").fetchall()
     conn.close()
     return jsonify([{"title":r["title"],"year":r["release_year"],"tmdbId":r["tmdb_id"],"tvdbId":None} for r in rows])
@@ -0,0 +1,61 @@
+import sqlite3
+from flask import Blueprint, Response
+from services.auth import require_api_key
+from services.indexer import DB_FILE
+from services.parser import clean_title
+from services.events import BUS
+from services.job_queue import queue_depth
+from services.metrics import Gauge, collect, render, load_snapshots
+from routes.scan import scan_manager
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# --- Gauges read at scrape time --- #
+Gauge(
+    "catalogerr_job_queue_depth",
+    "Worker job queue (job_queue) by status",
+    ("status",),
+    fn=lambda: {(status,): n for status, n in queue_depth().items()},
+)
+Gauge(
+    "catalogerr_scan_jobs",
+    "Library scan jobs by state",
+    ("state",),
+    fn=lambda: (lambda st: {
+        ("active",): int(st["active"] is not None),
+        ("queued",): len(st["queued"]),
+    })(scan_manager.status()),
+)
+Gauge(
+    "catalogerr_scan_rate",
+    "Current scan throughput over the last 30s",
+    ("unit",),
+    fn=lambda: (lambda rate: {
+        ("files_per_second",): rate["files_per_sec"],
+        ("bytes_per_second",): rate["bytes_per_sec"],
+    })(scan_manager.progress.snapshot()["rate"]),
+)
+Gauge(
+    "catalogerr_sse_subscribers",
+    "Open SSE streams by channel",
+    ("channel",),
+    fn=lambda: {(ch,): BUS.subscriber_count(ch) for ch in ("tasks", "scan", "system")},
+)
+Gauge(
+    "catalogerr_title_cache",
+    "clean_title() LRU cache statistics",
+    ("stat",),
+    fn=lambda: (lambda info: {
+        ("hits",): info.hits, ("misses",): info.misses, ("size",): info.currsize,
+    })(clean_title.cache_info()),
+)
+
+
+@metrics_bp.route("/metrics")
+@require_api_key
+def metrics():
+    """Prometheus text format (scrape with ?api_key=... or an X-Api-Key header)."""
+    families = collect((("process", "web"),))
+    with sqlite3.connect(DB_FILE) as conn:
+        families += load_snapshots(conn, exclude=("web",))
+    return Response(render(families), mimetype="text/plain; version=0.0.4")
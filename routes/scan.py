@@ -1,37 +1,85 @@
-import threading, time, json
-from flask import Blueprint, jsonify, Response, stream_with_context
-from services.indexer import run_all
+import time
+from flask import Blueprint, jsonify, Response, request
+from services.events import open_stream, busy_stream, sse_response, sse_stream, format_sse
+from services.auth import require_api_key
+from services.progress import ScanProgress
+from services.scan_jobs import ScanManager, list_checkpoints
 
 scan_bp = Blueprint("scan", __name__, url_prefix="/api/v3")
-scan_state = {"phase":"idle","workers":{}}
+scan_progress = ScanProgress()
+scan_manager = ScanManager(scan_progress)
+
+# Bursts of progress events are coalesced into at most one snapshot per interval
+SCAN_STREAM_INTERVAL = 1.0
+
 
 @scan_bp.post("/scan")
+@require_api_key
 def start_scan():
-    def background_scan():
-        try:
-            scan_state["phase"] = "scanning"
-            run_all(scan_state)
-        finally:
-            scan_state["phase"] = "done"
-    threading.Thread(target=background_scan, daemon=True).start()
-    scan_state["phase"] = "starting"
-    return jsonify({"status":"scan started"})
+    """
+    Queue a scan. Body (optional): {"drives": [...], "fresh": true}.
+    Only configured drives (config.yaml parent_paths) can be scanned.
+    Drives already running/queued are merged into the existing job;
+    interrupted scans resume from their checkpoint unless fresh is set.
+    """
+    data = request.get_json(silent=True) or {}
+    drives = data.get("drives") or request.args.getlist("drive")
+    fresh = bool(data.get("fresh") or request.args.get("fresh") in ("1", "true"))
+    if not isinstance(drives, list) or not all(isinstance(d, str) for d in drives):
+        return jsonify({"error": "drives must be a list of drive paths"}), 400
+
+    try:
+        jobs = scan_manager.request(drives, fresh=fresh)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    merged = all(j["merged"] for j in jobs) if jobs else False
+    return jsonify({
+        "status": "scan already running" if merged else "scan started",
+        "jobs": jobs,
+    }), 202
+
+@scan_bp.delete("/scan")
+@require_api_key
+def cancel_scan():
+    cancelled = scan_manager.cancel(request.args.get("drive"))
+    return jsonify({"status": "cancelling" if cancelled else "no scan running", "jobs": cancelled})
 
 @scan_bp.get("/scan/status")
 def scan_status():
-    return jsonify(scan_state)
+    status = scan_manager.status()
+    status["checkpoints"] = list_checkpoints()
+    return jsonify(status)
+
+def scan_snapshot_renderer(event=None):
+    """
+    render() for sse_stream: turns scan bus events into progress snapshots,
+    at most one per SCAN_STREAM_INTERVAL (the subscription keeps only the
+    latest pending scan event, so a burst collapses into one snapshot).
+    """
+    last = [0.0]
+
+    def render(msg):
+        wait = SCAN_STREAM_INTERVAL - (time.monotonic() - last[0])
+        if wait > 0:
+            time.sleep(wait)
+        last[0] = time.monotonic()
+        return format_sse(scan_progress.snapshot(), event)
+    return render
+
 
 @scan_bp.route("/scan/stream")
 def scan_stream():
-    def events():
-        last_snapshot = None
-        while True:
-            snapshot = json.dumps(scan_state)
-            if snapshot != last_snapshot:
-                yield f"data: {snapshot}\n\n"
-                last_snapshot = snapshot
-            time.sleep(1)
-    return Response(stream_with_context(events()), mimetype="text/event-stream")
-
+    sub = open_stream("scan")
+    if sub is None:
+        return Response(busy_stream(), mimetype="text/event-stream")
 
+    render = scan_snapshot_renderer()
 
+    def events():
+        # Blocks on the bus between changes instead of diffing every second
+        try:
+            yield render(None)
+            yield from sse_stream(sub, render=render)
+        finally:
+            sub.close()
+    return sse_response(sub, events())
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify, render_template
-from services.stats import get_stats
+from flask import Blueprint, jsonify, render_template, request
+from services.stats import get_stats, get_connector_history
+from services.analytics import get_store, TYPE_CODES, GROWTH_INTERVALS
 from services.auth import require_api_key
 stats_bp = Blueprint("stats", __name__, url_prefix="")
 
@@ -13,3 +14,35 @@ def stats_page():
 @require_api_key
 def api_stats():
     return jsonify(get_stats())
+
+@stats_bp.route("/api/v3/stats/connectors/<connector_id>/history")
+@require_api_key
+def api_connector_history(connector_id):
+    resolution = request.args.get("resolution", "hourly")
+    limit = request.args.get("limit", 500, type=int)
+    try:
+        return jsonify(get_connector_history(connector_id, resolution, limit))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@stats_bp.route("/api/v3/stats/sizes")
+@require_api_key
+def api_size_distribution():
+    level = request.args.get("level", "file")
+    media_type = request.args.get("type") or None
+    if level not in ("file", "media"):
+        return jsonify({"error": "level must be 'file' or 'media'"}), 400
+    if media_type is not None and media_type not in TYPE_CODES:
+        return jsonify({"error": f"type must be one of {', '.join(TYPE_CODES)}"}), 400
+    return jsonify(get_store().size_distribution(level, media_type))
+
+@stats_bp.route("/api/v3/stats/growth")
+@require_api_key
+def api_growth():
+    interval = request.args.get("interval", "month")
+    media_type = request.args.get("type") or None
+    if interval not in GROWTH_INTERVALS:
+        return jsonify({"error": f"interval must be one of {', '.join(GROWTH_INTERVALS)}"}), 400
+    if media_type is not None and media_type not in TYPE_CODES:
+        return jsonify({"error": f"type must be one of {', '.join(TYPE_CODES)}"}), 400
+    return jsonify(get_store().growth(interval, media_type))
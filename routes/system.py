@@ -1,9 +1,12 @@
-import os, json, shutil, psutil, sqlite3, time
+import os, psutil, sqlite3, time, threading
 from datetime import datetime, timezone
-from flask import Blueprint, jsonify, Response, stream_with_context, render_template, request
+from flask import Blueprint, jsonify, Response, render_template, request
 from services.indexer import DB_FILE
 from services import settings   # <-- central service logic
 from services.auth import require_api_key
+from services.events import BUS, open_stream, busy_stream, sse_response, sse_stream
+from services import profiler
+from services.mounts import probe_drives, sync_drive_states, public_state
 system_bp = Blueprint("system", __name__, url_prefix="")
 
 START_TIME = datetime.now(timezone.utc)
@@ -35,50 +38,110 @@ def channel_log():
     return render_template("channel-log.html")
 
 # --- System status SSE ---
+STATUS_INTERVAL = 5
+_status_thread = None
+_status_thread_lock = threading.Lock()
+
+
+def collect_system_status():
+    boot_time = datetime.fromtimestamp(psutil.boot_time())
+    uptime_seconds = int((datetime.utcnow() - boot_time).total_seconds())
+    mem = psutil.virtual_memory()
+    cpu_load = psutil.getloadavg()
+    disk = psutil.disk_usage(os.getcwd())
+    return {
+        "uptimeSeconds": uptime_seconds,
+        "cpuLoad": f"{cpu_load[0]:.2f},{cpu_load[1]:.2f},{cpu_load[2]:.2f}",
+        "memory": f"{round(mem.used/1024/1024)}MB/{round(mem.total/1024/1024)}MB",
+        "disk": f"{round(disk.used/1024**3,2)}GB/{round(disk.total/1024**3,2)}GB"
+    }
+
+
+def _status_publisher():
+    # One sampler shared by all clients; parks while nobody is listening
+    while True:
+        BUS.wait_for_subscribers("system")
+        try:
+            BUS.publish("system", "status", collect_system_status(), retain=True)
+        except Exception as e:
+            print(f"[{datetime.now()}] ⚠️ System status sample failed: {e}")
+        time.sleep(STATUS_INTERVAL)
+
+
+def ensure_status_publisher():
+    global _status_thread
+    with _status_thread_lock:
+        if _status_thread is None:
+            _status_thread = threading.Thread(target=_status_publisher, daemon=True)
+            _status_thread.start()
+
+
 @system_bp.route("/api/v3/system/status/stream")
 @require_api_key
 def system_status_stream():
-    def event_stream():
-        while True:
-            boot_time = datetime.fromtimestamp(psutil.boot_time())
-            uptime_seconds = int((datetime.utcnow() - boot_time).total_seconds())
-            mem = psutil.virtual_memory()
-            cpu_load = psutil.getloadavg()
-            disk = psutil.disk_usage(os.getcwd())
-            status = {
-                "uptimeSeconds": uptime_seconds,
-                "cpuLoad": f"{cpu_load[0]:.2f},{cpu_load[1]:.2f},{cpu_load[2]:.2f}",
-                "memory": f"{round(mem.used/1024/1024)}MB/{round(mem.total/1024/1024)}MB",
-                "disk": f"{round(disk.used/1024**3,2)}GB/{round(disk.total/1024**3,2)}GB"
-            }
-            yield f"data: {json.dumps(status)}\n\n"
-            time.sleep(5)
-    return Response(stream_with_context(event_stream()), mimetype="text/event-stream")
+    ensure_status_publisher()
+    sub = open_stream("system")
+    if sub is None:
+        return Response(busy_stream(), mimetype="text/event-stream")
+    return sse_response(sub, sse_stream(sub, named_events=False))
 
 # --- System health ---
+def _drive_states():
+    """Cached mount probes for every drive (services/mounts.py), mirrored into drives.online."""
+    with sqlite3.connect(DB_FILE) as conn:
+        paths = [row[0] for row in conn.execute("SELECT path FROM drives WHERE path IS NOT NULL AND path <> ''")]
+        states = probe_drives(paths)
+        sync_drive_states(conn, states)
+    return states
+
+
 @system_bp.route("/api/v3/system/health")
 @require_api_key
 def system_health():
     issues = []
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            conn.row_factory = sqlite3.Row
-            drives = conn.execute("SELECT path FROM drives").fetchall()
-        for d in drives:
-            try:
-                usage = shutil.disk_usage(d["path"])
-                if (usage.free/usage.total)*100 < 10:
-                    issues.append({
-                        "source": "Disk",
-                        "type": "warning",
-                        "message": f"Low space on {d['path']}"
-                    })
-            except Exception as e:
-                issues.append({"source":"Disk","type":"error","message":str(e)})
+        states = _drive_states()
+        for path, s in states.items():
+            if s["state"] == "offline":
+                issues.append({"source": "Disk", "type": "error", "message": f"Drive offline: {path} ({s['error']})"})
+                continue
+            if s["state"] == "slow":
+                issues.append({
+                    "source": "Disk",
+                    "type": "warning",
+                    "message": f"Slow drive: {path} ({s['latency_ms']} ms)"
+                })
+            if s["total"] and (s["free"]/s["total"])*100 < 10:
+                issues.append({
+                    "source": "Disk",
+                    "type": "warning",
+                    "message": f"Low space on {path}"
+                })
     except Exception as e:
         issues.append({"source":"DB","type":"error","message":str(e)})
     return jsonify(issues)
 
+
+@system_bp.route("/api/v3/system/mounts")
+@require_api_key
+def system_mounts():
+    return jsonify([public_state(s) for s in _drive_states().values()])
+
+# --- Request profiles (X-Profile: 1 / PROFILE_REQUESTS=1) ---
+@system_bp.route("/api/v3/system/profile")
+@require_api_key
+def api_list_profiles():
+    return jsonify({"enabled_globally": profiler.PROFILE_REQUESTS, "profiles": profiler.list_profiles()})
+
+
+@system_bp.route("/api/v3/system/profile/<profile_id>")
+@require_api_key
+def api_get_profile(profile_id):
+    profile = profiler.get_profile(profile_id)
+    if not profile:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(profile)
+
 # --- API: Config.yaml ---
 @system_bp.route("/api/v3/config", methods=["GET"])
 @require_api_key
@@ -1,6 +1,10 @@
-import json, queue, sqlite3
-from flask import Blueprint, jsonify, Response, stream_with_context, render_template, request
-from services.tasks import TASK_EVENTS, TASKS, push_task_event
+import sqlite3
+from datetime import datetime
+from flask import Blueprint, jsonify, Response, render_template, request
+from services.tasks import TASKS
+from services.events import open_stream, busy_stream, sse_response, sse_stream
+from services.job_queue import TASK_DISPATCH, enqueue_job, get_job
+from services.task_runs import get_task_history
 from apscheduler.schedulers.background import BackgroundScheduler
 from services.auth import require_api_key
 from services.indexer import DB_FILE
@@ -47,31 +51,52 @@ def tasks_stream():
     if not row:
         return jsonify({"error": "Invalid API key"}), 401
 
-    # If valid -> start streaming events
-    def event_stream():
-        while True:
-            try:
-                event = TASK_EVENTS.get(timeout=5)  # wait max 5s
-                yield f"event: {event['event']}\n"
-                yield f"data: {json.dumps(event['data'])}\n\n"
-            except queue.Empty:
-                yield ": keep-alive\n\n"
+    # If valid -> every client gets its own subscription on the bus
+    sub = open_stream("tasks")
+    if sub is None:
+        return Response(busy_stream(), mimetype="text/event-stream")
+    return sse_response(sub, sse_stream(sub))
 
-    return Response(stream_with_context(event_stream()), mimetype="text/event-stream")
+
+@tasks_bp.get("/tasks/<task_id>/history")
+@require_api_key
+def task_history(task_id):
+    """Recorded runs of a task (duration, items, errors, peak RSS) for trend analysis"""
+    if task_id not in TASKS:
+        return jsonify({"error": "Task not found"}), 404
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+    history = get_task_history(task_id, limit)
+    history["name"] = TASKS[task_id]["name"]
+    return jsonify(history)
 
 
 @tasks_bp.post("/tasks/run/<task_id>")
 @require_api_key
 def run_task(task_id):
-    """Manually trigger a scheduled job"""
+    """Trigger a scheduled job now; returns immediately with a job handle"""
     job = scheduler.get_job(task_id)
     if not job:
         return jsonify({"error": "Task not found"}), 404
-    try:
-        push_task_event("start", {"id": task_id, "name": job.name})
-        job.func()
-        push_task_event("complete", {"id": task_id, "name": job.name, "status": "ok"})
-        return jsonify({"status": "ok", "message": f"Task {job.name} executed"})
-    except Exception as e:
-        push_task_event("error", {"id": task_id, "name": job.name, "error": str(e)})
-        return jsonify({"error": str(e)}), 500
+
+    if TASK_DISPATCH == "worker":
+        handle = enqueue_job(task_id, job.name, "manual")
+        return jsonify({
+            "status": "already queued" if handle["merged"] else "queued",
+            "message": f"Task {job.name} {'is already queued' if handle['merged'] else 'queued'} (job {handle['id']})",
+            "job": handle,
+            "href": f"/api/v3/tasks/jobs/{handle['id']}",
+        }), 202
+
+    # inline mode: let the scheduler's thread pool pick it up right away
+    job.modify(next_run_time=datetime.now())
+    return jsonify({"status": "scheduled", "message": f"Task {job.name} will run now"}), 202
+
+
+@tasks_bp.get("/tasks/jobs/<int:job_id>")
+@require_api_key
+def get_task_job(job_id):
+    """Poll a job handle returned by /tasks/run"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
@@ -0,0 +1,251 @@
+# services/analytics.py
+"""
+Columnar in-memory stats engine.
+
+Keeps `files` and `media` as compact NumPy column arrays (int64 sizes and
+mtimes, int32 years, drive and type as small integer codes) and computes
+the dashboard aggregates in vectorized passes instead of one SQL query each.
+
+Refresh is incremental. A long-lived connection watches PRAGMA data_version,
+so nothing is read while the DB is unchanged. When it does change, rows with
+a rowid above the last one seen are appended. Files rewritten with INSERT OR
+REPLACE get a new rowid, so a row count that doesn't add up means rowids
+vanished: the live rowid list (index-only) is read and the dead slots are
+dropped. Tombstoned files (services/tombstones.py) count as vanished the
+same way. Media rows are never replaced, only their totals and tombstones
+are rewritten (update_counts, reconciliation), so those columns are re-read
+in rowid order.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from services.indexer import DB_FILE
+
+TYPE_CODES = {"movie": 0, "tv": 1}
+PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+GROWTH_INTERVALS = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+
+# Drives are coded by drives.rowid so the join happens in SQLite, not in a Python dict
+FILE_COLUMNS = """
+    f.rowid,
+    COALESCE((SELECT d.rowid FROM drives d WHERE d.id = f.drive_id), 0),
+    f.episode_pk IS NOT NULL,
+    COALESCE(f.size, 0),
+    COALESCE(f.mtime, 0)
+"""
+FILE_DTYPE = [("rowid", "i8"), ("drive", "i4"), ("type", "i1"), ("size", "i8"), ("mtime", "i8")]
+
+MEDIA_COLUMNS = """
+    m.rowid,
+    CASE m.type WHEN 'movie' THEN 0 WHEN 'tv' THEN 1 ELSE -1 END,
+    COALESCE((SELECT d.rowid FROM drives d WHERE d.id = m.drive_id), 0),
+    COALESCE(CAST(m.release_year AS INTEGER), 0)
+"""
+MEDIA_DTYPE = [("rowid", "i8"), ("type", "i1"), ("drive", "i4"), ("year", "i4")]
+TOTALS_DTYPE = [("total_size", "i8"), ("episode_count", "i4"), ("live", "?")]
+
+
+def _columns(cur, dtype):
+    """Cursor rows -> {name: contiguous array} (one column per field)."""
+    arr = np.fromiter(cur, dtype=dtype)
+    return {name: np.ascontiguousarray(arr[name]) for name, _ in dtype}
+
+
+def _empty(dtype):
+    return {name: np.zeros(0, dtype=kind) for name, kind in dtype}
+
+
+class ColumnStore:
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = None
+        self.data_version = None
+        self.files = _empty(FILE_DTYPE)
+        self.media = {**_empty(MEDIA_DTYPE), **_empty(TOTALS_DTYPE)}
+        self.drives = {}  # drives.rowid -> (path, total_size)
+        self.refreshed_at = None
+        self.stats = {"full_loads": 0, "incremental": 0, "unchanged": 0, "last_ms": 0.0}
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        return self.conn
+
+    def refresh(self):
+        """Bring the columns up to date with the DB. Cheap when nothing changed."""
+        with self.lock:
+            conn = self._connect()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self.data_version:
+                self.stats["unchanged"] += 1
+                return self
+            started = time.perf_counter()
+            full = self.data_version is None
+            self.data_version = version
+            self.drives = {
+                rowid: (path, total) for rowid, path, total in conn.execute("SELECT rowid, path, total_size FROM drives")
+            }
+            self._refresh_files(conn, full)
+            self._refresh_media(conn, full)
+            self.refreshed_at = datetime.now()
+            self.stats["full_loads" if full else "incremental"] += 1
+            self.stats["last_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return self
+
+    def _refresh_files(self, conn, full):
+        if full:
+            self.files = _columns(conn.execute(
+                f"SELECT {FILE_COLUMNS} FROM files f WHERE f.deleted_at IS NULL ORDER BY f.rowid"
+            ), FILE_DTYPE)
+            return
+        last = int(self.files["rowid"][-1]) if len(self.files["rowid"]) else 0
+        new = _columns(conn.execute(
+            f"SELECT {FILE_COLUMNS} FROM files f WHERE f.rowid > ? AND f.deleted_at IS NULL ORDER BY f.rowid", (last,)
+        ), FILE_DTYPE)
+        files = {name: np.concatenate([self.files[name], new[name]]) for name in self.files}
+        live = conn.execute("SELECT COUNT(*) FROM files WHERE deleted_at IS NULL").fetchone()[0]
+        if live != len(files["rowid"]):
+            # replaced, deleted or tombstoned rows: keep only the rowids that are still live
+            rowids = np.fromiter((r for (r,) in conn.execute("SELECT rowid FROM files WHERE deleted_at IS NULL")),
+                                 dtype="i8", count=live)
+            keep = np.isin(files["rowid"], rowids, assume_unique=True)
+            files = {name: col[keep] for name, col in files.items()}
+        self.files = files
+
+    def _refresh_media(self, conn, full):
+        last = 0 if full else (int(self.media["rowid"][-1]) if len(self.media["rowid"]) else 0)
+        new = _columns(conn.execute(f"SELECT {MEDIA_COLUMNS} FROM media m WHERE m.rowid > ? ORDER BY m.rowid", (last,)),
+                       MEDIA_DTYPE)
+        media = {name: np.concatenate([self.media[name], new[name]]) if not full else new[name]
+                 for name, _ in MEDIA_DTYPE}
+        totals = _columns(conn.execute(
+            "SELECT COALESCE(total_size, 0), COALESCE(episode_count, 0), deleted_at IS NULL FROM media ORDER BY rowid"
+        ), TOTALS_DTYPE)
+        if len(totals["total_size"]) != len(media["rowid"]):
+            return self._refresh_media(conn, True)  # media rows were deleted
+        media.update(totals)
+        self.media = media
+
+    # --- Aggregates --- #
+
+    def _drive_bins(self, codes, weights=None):
+        size = max(self.drives, default=0) + 1
+        if len(codes):
+            size = max(size, int(codes.max()) + 1)
+        counts = np.bincount(codes, weights=weights, minlength=size)
+        return counts.astype("i8") if weights is not None else counts
+
+    def dashboard(self, now=None):
+        """Counts, sizes, per-drive distribution/utilization, years, averages and trends."""
+        now = now or time.time()
+        m, f = self.media, self.files
+        live = m["live"]
+        movie, tv = (m["type"] == 0) & live, (m["type"] == 1) & live
+        sizes = np.where(live, m["total_size"], 0)
+
+        movie_sizes, tv_sizes = m["total_size"][movie], m["total_size"][tv]
+        movies_per_drive = self._drive_bins(m["drive"][movie])
+        series_per_drive = self._drive_bins(m["drive"][tv])
+        used_per_drive = self._drive_bins(m["drive"], weights=sizes)
+
+        years, year_counts = np.unique(m["year"][(m["year"] > 0) & live], return_counts=True)
+        top = np.argpartition(sizes, -5)[-5:] if len(sizes) > 5 else np.arange(len(sizes))
+        top = top[np.argsort(sizes[top])[::-1]]
+        top = top[live[top]]
+
+        day = 86400
+        added = {f"last_{n}_days": int(np.count_nonzero(f["mtime"] >= now - n * day)) for n in (7, 30, 90)}
+        return {
+            "counts": {
+                "movies": int(movie.sum()),
+                "series": int(tv.sum()),
+                "episodes": int(m["episode_count"][tv].sum()),
+            },
+            "sizes": {
+                "movies": int(movie_sizes.sum()),
+                "series": int(tv_sizes.sum()),
+            },
+            "movies_per_drive": [(self.drives[d][0], int(movies_per_drive[d])) for d in self.drives if movies_per_drive[d]],
+            "series_per_drive": [(self.drives[d][0], int(series_per_drive[d])) for d in self.drives if series_per_drive[d]],
+            "used_per_drive": [(self.drives[d][0], self.drives[d][1], int(used_per_drive[d])) for d in self.drives],
+            "breakdown_by_year": [(int(y), int(c)) for y, c in zip(years[::-1][:10], year_counts[::-1][:10])],
+            "top_rowids": [int(m["rowid"][i]) for i in top],
+            "avg_movie_size": float(movie_sizes.mean()) if len(movie_sizes) else 0,
+            "avg_episode_size": float(tv_sizes.mean()) if len(tv_sizes) else 0,
+            "added": added,
+        }
+
+    def size_distribution(self, level="file", media_type=None):
+        """Percentiles + log2 histogram of file sizes or per-title totals."""
+        cols = self.files if level == "file" else self.media
+        sizes = cols["size" if level == "file" else "total_size"]
+        if level != "file":
+            sizes = np.where(cols["live"], sizes, 0)
+        if media_type is not None:
+            sizes = sizes[cols["type"] == TYPE_CODES[media_type]]
+        sizes = sizes[sizes > 0]
+        if not len(sizes):
+            return {"level": level, "type": media_type, "count": 0, "percentiles": {}, "histogram": []}
+
+        # power-of-two buckets from 1 MiB up; the first one also holds everything smaller
+        buckets = np.clip(np.floor(np.log2(sizes)).astype("i4"), 20, None) - 20
+        bins = np.bincount(buckets)
+        bytes_per_bin = np.bincount(buckets, weights=sizes)
+        return {
+            "level": level,
+            "type": media_type,
+            "count": int(len(sizes)),
+            "total": int(sizes.sum()),
+            "min": int(sizes.min()),
+            "max": int(sizes.max()),
+            "mean": float(sizes.mean()),
+            "percentiles": {f"p{p}": int(v) for p, v in zip(PERCENTILES, np.percentile(sizes, PERCENTILES))},
+            "histogram": [{
+                "from": 0 if i == 0 else 2 ** (20 + i),
+                "to": 2 ** (21 + i),
+                "count": int(c),
+                "bytes": int(b),
+            } for i, (c, b) in enumerate(zip(bins, bytes_per_bin)) if c],
+        }
+
+    def growth(self, interval="month", media_type=None):
+        """Files/bytes added per period (by file mtime) with running totals."""
+        f = self.files
+        mask = f["mtime"] > 0
+        if media_type is not None:
+            mask &= f["type"] == TYPE_CODES[media_type]
+        mtimes, sizes = f["mtime"][mask], f["size"][mask]
+        if not len(mtimes):
+            return {"interval": interval, "type": media_type, "series": []}
+
+        if interval == "week":
+            days = mtimes.astype("datetime64[s]").astype("datetime64[D]")
+            periods = days - (days.astype("i8") + 3) % 7  # numpy weeks start on Thursday (1970-01-01): use Monday
+        else:
+            periods = mtimes.astype("datetime64[s]").astype(f"datetime64[{GROWTH_INTERVALS[interval]}]")
+        keys, inverse = np.unique(periods, return_inverse=True)
+        files_added = np.bincount(inverse)
+        bytes_added = np.bincount(inverse, weights=sizes).astype("i8")
+        cum_files, cum_bytes = np.cumsum(files_added), np.cumsum(bytes_added)
+        return {
+            "interval": interval,
+            "type": media_type,
+            "series": [{
+                "period": str(k.astype("datetime64[D]")),
+                "files": int(fa), "bytes": int(ba),
+                "total_files": int(cf), "total_bytes": int(cb),
+            } for k, fa, ba, cf, cb in zip(keys, files_added, bytes_added, cum_files, cum_bytes)],
+        }
+
+
+STORE = ColumnStore()
+
+
+def get_store():
+    """The shared column store, refreshed if the DB changed since the last call."""
+    return STORE.refresh()
@@ -4,6 +4,26 @@ from functools import wraps
 from services.indexer import DB_FILE  # path to your sqlite DB
 
 
+def request_api_key():
+    return (
+        request.headers.get("X-Api-Key")
+        or request.args.get("apikey")
+        or request.args.get("api_key")
+    )
+
+
+def has_valid_api_key():
+    """True if the request carries a known API key (no logging, no response)."""
+    token = request_api_key()
+    if not token:
+        return False
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        return conn.execute("SELECT 1 FROM api_keys WHERE key=?", (token,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
 def check_api_key():
     public_endpoints = {
         "api.list_movies",
@@ -17,11 +37,7 @@ def check_api_key():
     if request.endpoint in public_endpoints:
         return None
 
-    token = (
-        request.headers.get("X-Api-Key")
-        or request.args.get("apikey")
-        or request.args.get("api_key")
-    )
+    token = request_api_key()
 
     if not token:
         current_app.logger.warning(f"❌ API key missing for {request.endpoint}")
@@ -0,0 +1,299 @@
+# services/checksum.py
+"""
+Full-content checksum verification (bit-rot detection) for cold-storage drives.
+
+The "Checksum Verification" task streams whole files through xxh3-128
+(if the optional `xxhash` package is installed) or BLAKE2b, with large
+sequential reads and a global MB/s cap. The first pass stores a baseline
+checksum per file; later passes re-hash and compare. A different checksum
+while size and mtime are unchanged is reported as a mismatch in the stats
+health section. If size or mtime changed, the file was rewritten on purpose
+and gets a new baseline instead.
+
+Files are verified oldest-verified first and every result is written as
+soon as the file is done, so a run that hits its time budget (or is
+stopped) resumes with the next file on the following run.
+
+Env:
+  CHECKSUM_DRIVES         comma separated drive paths to verify, or "all" (default: none)
+  CHECKSUM_MAX_MBPS       read cap across all drives in MB/s (default 100, 0 = no cap)
+  CHECKSUM_PER_DRIVE      files hashed in parallel per drive (default 1)
+  CHECKSUM_INTERVAL_DAYS  re-verify files after this many days (default 30)
+  CHECKSUM_MAX_MINUTES    time budget of one run (default 240)
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from services.indexer import DB_FILE
+from services.task_runs import count_items, count_errors
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+CHECKSUM_DRIVES = os.getenv("CHECKSUM_DRIVES", "")
+CHECKSUM_MAX_MBPS = float(os.getenv("CHECKSUM_MAX_MBPS", "100"))
+CHECKSUM_PER_DRIVE = int(os.getenv("CHECKSUM_PER_DRIVE", "1"))
+CHECKSUM_INTERVAL_DAYS = int(os.getenv("CHECKSUM_INTERVAL_DAYS", "30"))
+CHECKSUM_MAX_MINUTES = int(os.getenv("CHECKSUM_MAX_MINUTES", "240"))
+READ_SIZE = 8 * 1024 * 1024
+
+
+def ensure_checksum_schema(conn):
+    # Own table (not columns on files): files rows are replaced when a file
+    # changes, the baseline must survive until we've compared against it.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_checksums (
+            file_id TEXT PRIMARY KEY,
+            drive_id TEXT,
+            fullpath TEXT,
+            size INTEGER,
+            mtime INTEGER,
+            algo TEXT,
+            checksum TEXT,
+            hashed_at TEXT,
+            verified_at TEXT,
+            status TEXT,
+            actual_checksum TEXT,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_file_checksums_verified ON file_checksums(verified_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_file_checksums_status ON file_checksums(status)")
+    conn.commit()
+
+
+def new_hasher(algo=None):
+    """Hasher for algo ("xxh3_128" / "blake2b"); None picks the fastest available."""
+    if algo is None:
+        algo = "xxh3_128" if xxhash is not None else "blake2b"
+    if algo == "xxh3_128":
+        if xxhash is None:
+            return algo, None
+        return algo, xxhash.xxh3_128()
+    return "blake2b", hashlib.blake2b(digest_size=32)
+
+
+class Throttle:
+    """Shared read-rate cap: callers sleep when ahead of max_mbps."""
+
+    def __init__(self, max_mbps):
+        self.rate = max_mbps * 1024 * 1024
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.bytes = 0
+
+    def consume(self, n):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            self.bytes += n
+            ahead = self.bytes / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def hash_file(path, hasher, throttle=None, stop=None):
+    """Stream path through hasher. Returns the hex digest, or None if stopped."""
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        advise = hasattr(os, "posix_fadvise")
+        if advise:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        offset = 0
+        while True:
+            if stop is not None and stop.is_set():
+                return None
+            n = f.readinto(buf)
+            if not n:
+                break
+            hasher.update(view[:n])
+            if advise:
+                # don't evict the hot page cache with a cold drive's data
+                os.posix_fadvise(fd, offset, n, os.POSIX_FADV_DONTNEED)
+            offset += n
+            if throttle is not None:
+                throttle.consume(n)
+    return hasher.hexdigest()
+
+
+def selected_drives(conn, setting=CHECKSUM_DRIVES):
+    """(drive_id, path) of the drives opted in via CHECKSUM_DRIVES."""
+    rows = conn.execute("SELECT id, path FROM drives").fetchall()
+    if setting.strip().lower() == "all":
+        return rows
+    wanted = {p.strip().rstrip("/") for p in setting.split(",") if p.strip()}
+    return [(did, path) for did, path in rows if path and path.rstrip("/") in wanted]
+
+
+def pending_files(conn, drive_id, cutoff):
+    """Never-verified files first, then the longest unverified, skipping recent ones."""
+    return conn.execute("""
+        SELECT f.id, d.path || '/' || f.filename, f.size, f.mtime,
+               c.algo, c.checksum, c.size, c.mtime
+        FROM files f
+        JOIN directories d ON d.pk = f.dir_pk
+        LEFT JOIN file_checksums c ON c.file_id = f.id
+        WHERE f.drive_id = ? AND f.deleted_at IS NULL
+          AND (c.verified_at IS NULL OR c.verified_at < ?)
+        ORDER BY c.verified_at IS NOT NULL, c.verified_at, d.path, f.filename
+    """, (drive_id, cutoff)).fetchall()
+
+
+def verify_one(row, drive_id, throttle, stop):
+    """Hash one file and work out its new file_checksums row (None if stopped)."""
+    file_id, path, size, mtime, algo, stored, stored_size, stored_mtime = row
+    now = datetime.now().isoformat()
+    record = {"file_id": file_id, "drive_id": drive_id, "fullpath": path, "size": size, "mtime": mtime,
+              "algo": algo, "checksum": stored, "hashed_at": None, "verified_at": now,
+              "status": "ok", "actual_checksum": None, "error": None}
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {**record, "status": "missing", "error": "file not found"}
+    except OSError as e:
+        return {**record, "status": "error", "error": str(e)}
+
+    rebaseline = stored is None or (st.st_size, int(st.st_mtime)) != (stored_size, stored_mtime)
+    algo, hasher = new_hasher(None if rebaseline else algo)
+    if hasher is None:
+        return {**record, "status": "error", "error": f"{algo} checksum but xxhash is not installed"}
+    try:
+        digest = hash_file(path, hasher, throttle, stop)
+    except OSError as e:
+        return {**record, "status": "error", "error": str(e)}
+    if digest is None:
+        return None
+
+    if rebaseline:
+        return {**record, "algo": algo, "checksum": digest, "size": st.st_size,
+                "mtime": int(st.st_mtime), "hashed_at": now}
+    if digest != stored:
+        return {**record, "status": "mismatch", "actual_checksum": digest,
+                "error": "content changed without a size/mtime change"}
+    return record
+
+
+def save_result(conn, rec, lock):
+    with lock:
+        conn.execute("""
+            INSERT INTO file_checksums
+                (file_id, drive_id, fullpath, size, mtime, algo, checksum, hashed_at,
+                 verified_at, status, actual_checksum, error)
+            VALUES (:file_id, :drive_id, :fullpath, :size, :mtime, :algo, :checksum, :hashed_at,
+                    :verified_at, :status, :actual_checksum, :error)
+            ON CONFLICT(file_id) DO UPDATE SET
+                drive_id=excluded.drive_id, fullpath=excluded.fullpath,
+                size=excluded.size, mtime=excluded.mtime, algo=excluded.algo,
+                checksum=excluded.checksum,
+                hashed_at=COALESCE(excluded.hashed_at, file_checksums.hashed_at),
+                verified_at=excluded.verified_at, status=excluded.status,
+                actual_checksum=excluded.actual_checksum, error=excluded.error
+        """, rec)
+
+
+def run_checksum_verification(drives_setting=None, max_minutes=None):
+    """Verify the opted-in drives within the time budget. Returns per-status counts."""
+    drives_setting = CHECKSUM_DRIVES if drives_setting is None else drives_setting
+    max_minutes = CHECKSUM_MAX_MINUTES if max_minutes is None else max_minutes
+
+    conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None, check_same_thread=False)
+    ensure_checksum_schema(conn)
+    drives = selected_drives(conn, drives_setting)
+    if not drives:
+        print(f"[{datetime.now()}] ⏭ Checksum verification: no drives selected (set CHECKSUM_DRIVES)")
+        conn.close()
+        return {}
+
+    cutoff = (datetime.now() - timedelta(days=CHECKSUM_INTERVAL_DAYS)).isoformat()
+    throttle = Throttle(CHECKSUM_MAX_MBPS)
+    stop = threading.Event()
+    deadline = time.monotonic() + max_minutes * 60
+    db_lock = threading.Lock()
+    counts = {"ok": 0, "baseline": 0, "mismatch": 0, "missing": 0, "error": 0}
+
+    print(f"[{datetime.now()}] 🔐 Checksum verification of {len(drives)} drive(s), "
+          f"{CHECKSUM_MAX_MBPS or 'unlimited'} MB/s, {CHECKSUM_PER_DRIVE} per drive, "
+          f"algo {new_hasher()[0]}")
+
+    def work(drive_id, row):
+        """Verify one file; returns its outcome (None if skipped)."""
+        if time.monotonic() > deadline:
+            stop.set()
+        if stop.is_set():
+            return None
+        rec = verify_one(row, drive_id, throttle, stop)
+        if rec is None:
+            return None
+        save_result(conn, rec, db_lock)
+        if rec["status"] != "ok":
+            icon = "🧨" if rec["status"] == "mismatch" else "⚠️"
+            print(f"[{datetime.now()}] {icon} {rec['status']}: {rec['fullpath']} ({rec['error']})")
+        return "baseline" if rec["hashed_at"] and rec["status"] == "ok" else rec["status"]
+
+    def verify_drive(drive_id, path):
+        with db_lock:
+            rows = pending_files(conn, drive_id, cutoff)
+        print(f"[{datetime.now()}] 💽 {path}: {len(rows)} file(s) due")
+        with ThreadPoolExecutor(max_workers=max(1, CHECKSUM_PER_DRIVE)) as pool:
+            return [outcome for outcome in pool.map(lambda row: work(drive_id, row), rows) if outcome]
+
+    # One thread per drive: drives are independent spindles. Outcomes are
+    # tallied here: count_items/count_errors only count in the job's thread.
+    with ThreadPoolExecutor(max_workers=len(drives)) as pool:
+        for fut in [pool.submit(verify_drive, did, path) for did, path in drives]:
+            for outcome in fut.result():
+                counts[outcome] += 1
+                count_items()
+                if outcome not in ("ok", "baseline"):
+                    count_errors()
+    conn.close()
+
+    elapsed = time.monotonic() - throttle.started
+    mb = throttle.bytes / (1024 * 1024)
+    print(f"[{datetime.now()}] {'⏸' if stop.is_set() else '✅'} Checksum verification "
+          f"{'paused (time budget)' if stop.is_set() else 'complete'}: {counts}, "
+          f"{mb:.0f} MB in {elapsed:.0f}s ({mb / elapsed if elapsed else 0:.1f} MB/s)")
+    return counts
+
+
+def checksum_health(conn):
+    """Summary + mismatches for the stats health section."""
+    try:
+        summary = conn.execute("""
+            SELECT COUNT(*) AS checked,
+                   SUM(status = 'mismatch') AS mismatches,
+                   SUM(status = 'missing') AS missing,
+                   SUM(status = 'error') AS errors,
+                   MIN(verified_at) AS oldest_verified_at
+            FROM file_checksums
+        """).fetchone()
+        mismatches = conn.execute("""
+            SELECT c.fullpath, d.path AS drive, c.algo, c.checksum, c.actual_checksum,
+                   c.hashed_at, c.verified_at
+            FROM file_checksums c
+            LEFT JOIN drives d ON d.id = c.drive_id
+            WHERE c.status = 'mismatch'
+            ORDER BY c.verified_at DESC
+            LIMIT 100
+        """).fetchall()
+    except sqlite3.OperationalError:
+        return None  # table not created yet
+    return {
+        "checked": summary[0] or 0,
+        "mismatches": summary[1] or 0,
+        "missing": summary[2] or 0,
+        "errors": summary[3] or 0,
+        "oldest_verified_at": summary[4],
+        "mismatched_files": [dict(zip(
+            ("path", "drive", "algo", "expected", "actual", "hashed_at", "verified_at"), row
+        )) for row in mismatches],
+    }
@@ -0,0 +1,213 @@
+# services/compress.py
+"""
+Compressed JSON storage for large connector payloads
+(connector_media.raw_json, connector_stats/connector_latest queue + diskspace).
+
+Packed values are BLOBs: one codec byte followed by a zlib stream. Legacy rows
+are plain JSON TEXT and are still read transparently, so nothing breaks
+before the migration below has run.
+
+Usage:
+  python -m services.compress          # compress existing rows + size report
+  python -m services.compress --vacuum # ... and VACUUM afterwards
+"""
+import sys
+import json
+import zlib
+import sqlite3
+from datetime import datetime
+
+CODEC_ZLIB = 0x01
+CODEC_ZLIB_DICT_V1 = 0x02
+
+# Preset dictionary of strings that occur in nearly every Radarr/Sonarr
+# item, queue record and diskspace entry. Most frequent strings go last.
+# Never edit this in place: add a new codec byte + dictionary instead,
+# otherwise existing rows can't be decompressed.
+ZDICT_V1 = (
+    '"freeSpace":"totalSpace":"label":"path":"/mnt/'
+    '"trackedDownloadStatus":"ok","trackedDownloadState":"downloading","downloadClient":'
+    '"protocol":"torrent","indexer":"estimatedCompletionTime":"timeleft":"sizeleft":'
+    '"statusMessages":[],"downloadId":"episodeId":"seriesId":"movieId":'
+    '"page":1,"pageSize":10,"sortKey":"timeleft","sortDirection":"ascending","totalRecords":"records":['
+    '"seasonFolder":true,"seasonNumber":"seasons":[{"episodeFileCount":"episodeCount":'
+    '"totalEpisodeCount":"previousAiring":"nextAiring":"network":"airTime":"seriesType":"standard",'
+    '"languageProfileId":"qualityProfileId":"rootFolderPath":"minimumAvailability":"released",'
+    '"isAvailable":true,"folderName":"inCinemas":"physicalRelease":"digitalRelease":"studio":'
+    '"youTubeTrailerId":"website":"certification":"runtime":"cleanTitle":"sortTitle":'
+    '"originalTitle":"originalLanguage":{"id":1,"name":"English"},"alternateTitles":[],'
+    '"secondaryYearSourceId":0,"genres":["Drama","Comedy","Action","Thriller"],"tags":[],'
+    '"ratings":{"imdb":{"votes":"value":"type":"user"},"tmdb":{"votes":"rottenTomatoes":'
+    '"statistics":{"seasonCount":"sizeOnDisk":"percentOfEpisodes":100.0,'
+    '"movieFileId":"hasFile":true,"monitored":true,"status":"continuing","ended":false,'
+    '"images":[{"coverType":"poster","url":"/MediaCover/","remoteUrl":"https://image.tmdb.org/t/p/original/'
+    '"},{"coverType":"fanart","url":"/MediaCover/","remoteUrl":"https://artworks.thetvdb.com/banners/'
+    '"added":"T00:00:00Z","year":"tmdbId":"imdbId":"tt","tvdbId":"titleSlug":"title":"overview":"id":'
+).encode("utf-8")
+
+ZDICTS = {CODEC_ZLIB_DICT_V1: ZDICT_V1}
+
+# (table, key column, payload columns) that hold compressed JSON
+PACKED_COLUMNS = [
+    ("connector_media", "id", ["raw_json"]),
+    ("connector_stats", "id", ["queue", "diskspace"]),
+    ("connector_latest", "connector_id", ["queue", "diskspace"]),
+]
+
+
+def pack_json(obj, level=6):
+    """Serialize obj to compact JSON and compress it with the shared dictionary."""
+    if obj is None:
+        return None
+    raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    c = zlib.compressobj(level, zdict=ZDICT_V1)
+    return bytes([CODEC_ZLIB_DICT_V1]) + c.compress(raw) + c.flush()
+
+
+def unpack_bytes(value):
+    """Return the JSON text of a stored payload (packed BLOB or legacy TEXT)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value:
+        return None
+    codec, body = value[0], value[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if codec in ZDICTS:
+        d = zlib.decompressobj(zdict=ZDICTS[codec])
+        return (d.decompress(body) + d.flush()).decode("utf-8")
+    # Not one of ours: assume it's raw UTF-8 JSON stored as a blob
+    return value.decode("utf-8")
+
+
+def unpack_json(value, default=None):
+    """Decode a stored payload to Python objects; returns default if empty/invalid."""
+    try:
+        text = unpack_bytes(value)
+        return json.loads(text) if text else default
+    except Exception:
+        return default
+
+
+class LazyJSON:
+    """Defers decompression + parsing of a stored payload until first use."""
+    __slots__ = ("_raw", "_default", "_value", "_loaded")
+
+    def __init__(self, raw, default=None):
+        self._raw = raw
+        self._default = default
+        self._value = None
+        self._loaded = False
+
+    @property
+    def value(self):
+        if not self._loaded:
+            self._value = unpack_json(self._raw, self._default)
+            self._raw = None
+            self._loaded = True
+        return self._value
+
+
+# ---------------- Migration ---------------- #
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+
+def payload_size_report(conn):
+    """Bytes used by each packed column, split by legacy TEXT vs packed BLOB."""
+    report = {}
+    for table, _, cols in PACKED_COLUMNS:
+        if not _table_exists(conn, table):
+            continue
+        for col in cols:
+            text_rows, text_bytes, blob_rows, blob_bytes = conn.execute(f"""
+                SELECT
+                  SUM(typeof({col}) = 'text'),
+                  COALESCE(SUM(CASE WHEN typeof({col}) = 'text' THEN LENGTH(CAST({col} AS BLOB)) END), 0),
+                  SUM(typeof({col}) = 'blob'),
+                  COALESCE(SUM(CASE WHEN typeof({col}) = 'blob' THEN LENGTH({col}) END), 0)
+                FROM {table}
+            """).fetchone()
+            report[f"{table}.{col}"] = {
+                "text_rows": text_rows or 0,
+                "text_bytes": text_bytes,
+                "blob_rows": blob_rows or 0,
+                "blob_bytes": blob_bytes,
+                "total_bytes": text_bytes + blob_bytes,
+            }
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    report["db"] = {
+        "file_bytes": page_count * page_size,
+        "free_bytes": freelist * page_size,
+    }
+    return report
+
+
+def migrate_compress_payloads(conn, batch_size=500):
+    """Compress every legacy TEXT payload in place. Safe to re-run."""
+    converted = 0
+    for table, key, cols in PACKED_COLUMNS:
+        if not _table_exists(conn, table):
+            continue
+        for col in cols:
+            while True:
+                rows = conn.execute(f"""
+                    SELECT {key}, {col} FROM {table}
+                    WHERE typeof({col}) = 'text'
+                    LIMIT ?
+                """, (batch_size,)).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row_key, text in rows:
+                    try:
+                        packed = pack_json(json.loads(text)) if text else None
+                    except Exception:
+                        # Not valid JSON: keep the bytes, just mark them as a blob
+                        packed = text.encode("utf-8")
+                    updates.append((packed, row_key))
+                conn.executemany(f"UPDATE {table} SET {col}=? WHERE {key}=?", updates)
+                conn.commit()
+                converted += len(updates)
+            print(f"[{datetime.now()}] 🗜 {table}.{col} compressed")
+    return converted
+
+
+def print_size_report(before, after):
+    def fmt(n):
+        return f"{n / 1024 / 1024:.2f} MB"
+
+    print(f"{'column':<32} {'before':>12} {'after':>12} {'ratio':>8}")
+    for name in before:
+        if name == "db":
+            continue
+        b = before[name]["total_bytes"]
+        a = after.get(name, {}).get("total_bytes", 0)
+        ratio = f"{a / b * 100:.1f}%" if b else "-"
+        print(f"{name:<32} {fmt(b):>12} {fmt(a):>12} {ratio:>8}")
+    print(f"{'index.db (file)':<32} {fmt(before['db']['file_bytes']):>12} {fmt(after['db']['file_bytes']):>12}")
+    print(f"{'index.db (free pages)':<32} {fmt(before['db']['free_bytes']):>12} {fmt(after['db']['free_bytes']):>12}")
+
+
+if __name__ == "__main__":
+    from services.indexer import DB_FILE
+
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    before = payload_size_report(conn)
+    converted = migrate_compress_payloads(conn)
+    if "--vacuum" in sys.argv:
+        print(f"[{datetime.now()}] 🧹 VACUUM...")
+        conn.execute("VACUUM")
+    after = payload_size_report(conn)
+    conn.close()
+
+    print(f"[{datetime.now()}] ✅ Compressed {converted} payloads")
+    print_size_report(before, after)
@@ -0,0 +1,189 @@
+# services/events.py
+"""
+In-process pub/sub for the SSE endpoints.
+
+Every connected client gets its own Subscription, so one event reaches all
+dashboards instead of whichever stream happened to pop it from a shared
+queue first. Streams block on their subscription: an idle stream costs no
+CPU.
+
+A dashboard opens a single stream for all the channels it shows
+(/api/v3/events/stream, routes/events.py), so each open page holds one
+gthread request thread. At most SSE_MAX_CLIENTS streams are served at once
+and the rest of the pool stays free for normal requests. A client over the
+limit gets an empty stream that asks it to retry later.
+
+Channels in use:
+  tasks   start/queued/complete/error events from services.tasks
+  scan    scan progress updates (services/progress.py)
+  system  periodic host status (routes/system.py)
+
+scan and system are state channels: a subscriber only keeps the latest
+pending event of each, so a burst of scan updates can't push task events
+out of its queue.
+"""
+import os
+import json
+import threading
+from collections import deque
+from flask import Response, stream_with_context
+
+KEEPALIVE_SECONDS = 15
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", "48"))
+SSE_RETRY_MS = 3000
+SSE_BUSY_RETRY_MS = 30000
+STATE_CHANNELS = {"scan", "system"}
+
+
+class Subscription:
+    """
+    One client's view of the bus. Events of state channels replace each
+    other; for the rest the oldest are dropped once maxsize are pending.
+    """
+
+    def __init__(self, bus, channels, maxsize):
+        self.bus = bus
+        self.channels = set(channels)
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._events = deque()
+        self._latest = {}  # state channel -> pending event
+        self._ready = threading.Condition()
+
+    def put(self, event):
+        with self._ready:
+            if event["channel"] in STATE_CHANNELS:
+                self._latest[event["channel"]] = event
+            else:
+                self._events.append(event)
+                if len(self._events) > self.maxsize:
+                    self._events.popleft()
+                    self.dropped += 1
+            self._ready.notify()
+
+    def _pop(self):
+        if self._events:
+            return self._events.popleft()
+        if self._latest:
+            return self._latest.pop(next(iter(self._latest)))
+        return None
+
+    def get(self, timeout=None):
+        """Next event, or None after timeout seconds without one."""
+        with self._ready:
+            self._ready.wait_for(lambda: self._events or self._latest, timeout)
+            return self._pop()
+
+    def drain(self):
+        """Pop everything currently pending (used to coalesce bursts)."""
+        with self._ready:
+            events = list(self._events) + list(self._latest.values())
+            self._events.clear()
+            self._latest.clear()
+        return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._subs = set()
+        self._retained = {}  # channel -> last retained event
+
+    def publish(self, channel, event, data=None, retain=False):
+        """
+        Fan an event out to every subscriber of channel. A retained event is
+        also replayed to clients that subscribe later (current state).
+        """
+        msg = {"channel": channel, "event": event, "data": data}
+        with self._lock:
+            if retain:
+                self._retained[channel] = msg
+            subs = [s for s in self._subs if channel in s.channels]
+        for s in subs:
+            s.put(msg)
+
+    def subscribe(self, *channels, maxsize=256, limit=None):
+        """New Subscription, or None if limit subscriptions are already open."""
+        sub = Subscription(self, channels, maxsize)
+        with self._lock:
+            if limit is not None and len(self._subs) >= limit:
+                return None
+            self._subs.add(sub)
+            for ch in channels:
+                if ch in self._retained:
+                    sub.put(self._retained[ch])
+            self._changed.notify_all()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+            self._changed.notify_all()
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            return sum(1 for s in self._subs if channel is None or channel in s.channels)
+
+    def wait_for_subscribers(self, channel, timeout=None):
+        """Block until channel has at least one subscriber (for lazy producers)."""
+        with self._lock:
+            return self._changed.wait_for(
+                lambda: any(channel in s.channels for s in self._subs), timeout
+            )
+
+
+BUS = EventBus()
+
+
+def format_sse(data, event=None):
+    msg = f"event: {event}\n" if event else ""
+    return msg + f"data: {json.dumps(data)}\n\n"
+
+
+def open_stream(*channels, maxsize=256):
+    """Subscribe a new SSE client, or None when SSE_MAX_CLIENTS are connected."""
+    return BUS.subscribe(*channels, maxsize=maxsize, limit=SSE_MAX_CLIENTS)
+
+
+def busy_stream():
+    """Body for a client over the limit: no events, retry later."""
+    return f"retry: {SSE_BUSY_RETRY_MS}\n\n"
+
+
+def sse_response(sub, body):
+    """
+    Streaming response for body (a generator over sub). The subscription is
+    also closed when the response is, in case the generator never started.
+    """
+    response = Response(stream_with_context(body), mimetype="text/event-stream")
+    response.call_on_close(sub.close)
+    return response
+
+
+def sse_stream(sub, named_events=True, keepalive=KEEPALIVE_SECONDS, render=None):
+    """
+    Generator turning a Subscription into SSE text; always unsubscribes.
+    render(msg), if given, returns the text for one event.
+    """
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            msg = sub.get(timeout=keepalive)
+            if msg is None:
+                yield ": keep-alive\n\n"
+            elif render is not None:
+                yield render(msg)
+            else:
+                yield format_sse(msg["data"], msg["event"] if named_events else None)
+    finally:
+        sub.close()
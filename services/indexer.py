@@ -9,6 +9,14 @@ from datetime import datetime
 from dotenv import load_dotenv
 import bcrypt
 from services.enrichment import enrich_unmatched
+from services.parser import parse_filename, clean_title
+from services.utils import TMDB_API_URL, TMDB_IMAGE_URL
+from services.metrics import FILES_INDEXED, SCAN_BYTES, CACHE_REQUESTS, ENRICH_OUTCOMES
+from services.tombstones import (
+    ensure_tombstone_schema, set_drive_online, now_stamp,
+    reconcile_directory, reconcile_subtree, cascade_tombstones, revive,
+)
+from services.mounts import probe_drives, sync_drive_states
 # ---------------- Config ---------------- #
 DB_FILE = "index.db"
 
@@ -63,70 +71,6 @@ def _migrate_drives_unique_and_ids(conn):
 def sha1_str(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
-tv_pattern = re.compile(
-    r"^(?P<title>.+?)[ ._-]+S(?P<season>\d{1,2})E(?P<episode>\d{1,2})(?:[ ._-]+(?P<ep_title>.*?))?(?:\.\w+)?$",
-    re.IGNORECASE
-)
-
-movie_pattern = re.compile(
-    r"^(?P<title>.+?) \((?P<year>\d{4})\)(?: (?P<quality>.+))?$",
-    re.IGNORECASE
-)
-tv_pattern_alt = re.compile(
-    r"^(?P<title>.+?)\.S(?P<season>\d{2})E(?P<episode>\d{2})(?:\.(?P<ep_title>.+?))?\.",
-    re.IGNORECASE
-)
-
-def parse_filename(filename: str, fullpath: str):
-    full_lower = fullpath.lower()
-    name, _ = os.path.splitext(filename)
-
-    # --- Folder-based overrides ---
-    if "/tvshows/" in full_lower or re.search(r"/season\s*\d+", full_lower):
-        m = tv_pattern.match(filename) or tv_pattern_alt.match(filename)
-        if m:
-            return {
-                "type": "tv",
-                "title": m.group("title").replace('.', ' ').strip(),
-                "season": int(m.group("season")),
-                "episode": int(m.group("episode")),
-                "ep_title": (m.group("ep_title") or "").replace('.', ' ').strip()
-            }
-        return {"type": "tv", "title": name}
-
-    if "/movies/" in full_lower:
-        mm = movie_pattern.match(name)
-        if mm:
-            return {
-                "type": "movie",
-                "title": mm.group("title").strip(),
-                "year": int(mm.group("year")),
-                "quality": mm.group("quality") or None
-            }
-        return {"type": "movie", "title": name}
-
-    # --- Regex fallback ---
-    m = tv_pattern.match(filename) or tv_pattern_alt.match(filename)
-    if m:
-        return {
-            "type": "tv",
-            "title": m.group("title").replace('.', ' ').strip(),
-            "season": int(m.group("season")),
-            "episode": int(m.group("episode")),
-            "ep_title": (m.group("ep_title") or "").replace('.', ' ').strip()
-        }
-
-    mm = movie_pattern.match(name)
-    if mm:
-        return {
-            "type": "movie",
-            "title": mm.group("title").strip(),
-            "year": int(mm.group("year")),
-            "quality": mm.group("quality") or None
-        }
-
-    return {"type": "movie", "title": name}
-
 def ensure_admin_user(conn):
     cur = conn.cursor()
     cur.execute("SELECT id FROM users WHERE username=?", ("admin",))
@@ -146,23 +90,6 @@ def ensure_admin_user(conn):
     conn.commit()
     logger.log("✅ Admin user created from .env")
 
-def clean_title(raw):
-    # Strip common rip tags and junk
-    junk_patterns = [
-        r"\b\d{3,4}p\b",      # 1080p, 2160p
-        r"\bbluray\b", r"\bwebrip\b", r"\bweb[- ]dl\b",
-        r"\bx265\b", r"\bx264\b",
-        r"\bddp\d+\.\d+\b",   # DDP5.1, DDP7.1
-        r"\bac3\b", r"\bdd\b",
-        r"\byts\b", r"\bedge\d+\b",  # release group names
-        r"\bswaxon\b", r"\bethel\b"
-    ]
-    title = raw
-    for pat in junk_patterns:
-        title = re.sub(pat, "", title, flags=re.IGNORECASE)
-    # Collapse whitespace
-    return re.sub(r"\s+", " ", title).strip()
-
 # ---------------- Metadata fetchers ---------------- #
 def fetch_sonarr(title):
     if not SONARR_URL or not SONARR_API_KEY:
@@ -207,7 +134,7 @@ def fetch_tmdb(title, mtype="movie"):
         logger.log("⚠️ TMDB not configured.")
         return None
     try:
-        base = "https://api.themoviedb.org/3/search"
+        base = f"{TMDB_API_URL}/search"
         url = f"{base}/{mtype}"
         params = {"query": title, "api_key": TMDB_API_KEY}
         logger.log(f"🌐 [TMDB] GET {url} params={params}")
@@ -221,25 +148,190 @@ def fetch_tmdb(title, mtype="movie"):
         return None
 
 
+def fetch_tmdb_details(tmdb_id, mtype="movie"):
+    """Direct TMDB lookup by id (one request, no title search)."""
+    if not TMDB_API_KEY or not tmdb_id:
+        return None
+    try:
+        url = f"{TMDB_API_URL}/{'tv' if mtype == 'tv' else 'movie'}/{tmdb_id}"
+        logger.log(f"🌐 [TMDB] GET {url}")
+        r = requests.get(url, params={"api_key": TMDB_API_KEY}, timeout=10)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        logger.log(f"❌ TMDB details failed for {tmdb_id}: {e}")
+        return None
+
+
+# ---------------- ID-first resolution ---------------- #
+# Radarr/Sonarr already know the tmdbId/imdbId (and full details) for
+# everything in connector_media. Matching archive titles against that
+# locally saves the lookup + TMDB search round-trips for most items.
+
+TITLE_YEAR_RE = re.compile(r"\s*[\(\[]((?:19|20)\d{2})[\)\]]\s*$")
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_title(title):
+    """Return (normalized title, year hint) for matching across sources."""
+    title = title or ""
+    year = None
+    m = TITLE_YEAR_RE.search(title)
+    if m:
+        year = int(m.group(1))
+        title = title[:m.start()]
+    norm = NON_ALNUM_RE.sub(" ", clean_title(title).lower().replace("&", " and ")).strip()
+    return norm, year
+
+
+def build_connector_index(conn):
+    """Index connector_media by (type, normalized title[, year])."""
+    index = {"by_year": {}, "by_title": {}}
+    try:
+        rows = conn.execute("""
+            SELECT media_type, title, year, tmdb_id, imdb_id, tvdb_id, raw_json
+            FROM connector_media
+        """).fetchall()
+    except sqlite3.OperationalError:
+        return index  # connector tables not created yet
+
+    for media_type, title, year, tmdb_id, imdb_id, tvdb_id, raw_json in rows:
+        mtype = "tv" if media_type == "series" else "movie"
+        norm, title_year = normalize_title(title)
+        entry = {
+            "app": "Sonarr" if mtype == "tv" else "Radarr",
+            "tmdb_id": tmdb_id,
+            "imdb_id": imdb_id,
+            "tvdb_id": tvdb_id,
+            "raw": raw_json,  # inflated only when matched
+        }
+        y = year or title_year
+        if y:
+            index["by_year"][(mtype, norm, y)] = entry
+        index["by_title"].setdefault((mtype, norm), []).append(entry)
+    return index
+
+
+def match_connector_media(index, title, release_year, mtype):
+    from services.compress import unpack_json
+
+    if not index:
+        return None
+    norm, title_year = normalize_title(title)
+    year = release_year or title_year
+    entry = index["by_year"].get((mtype, norm, year)) if year else None
+    if entry is None:
+        candidates = index["by_title"].get((mtype, norm), [])
+        entry = candidates[0] if len(candidates) == 1 else None
+    if entry is None:
+        return None
+    if not isinstance(entry["raw"], dict):
+        entry["raw"] = unpack_json(entry["raw"], {}) or {}
+    return entry
+
+
 def re_enrich_all_metadata():
     conn = sqlite3.connect(DB_FILE)
     cur = conn.cursor()
 
-    cur.execute("SELECT id, type, title FROM media")
+    cur.execute("SELECT id, type, title FROM media WHERE deleted_at IS NULL")
     all_media = cur.fetchall()
 
     logger.log(f"🔄 Re-enriching metadata for {len(all_media)} media items...")
 
+    index = build_connector_index(conn)
+    stats = {"checked": len(all_media), "skipped": 0, "local": 0, "tmdb_id": 0,
+             "search": 0, "unmatched": 0, "failed": 0}
+
     for media_id, mtype, title in all_media:
         try:
-            enrich_metadata(conn, media_id, title, mtype)
+            outcome = enrich_metadata(conn, media_id, title, mtype, connector_index=index) or "skipped"
         except Exception as e:
+            outcome = "failed"
             logger.log(f"⚠️ Failed to enrich {title}: {e}")
+        stats[outcome] += 1
+        ENRICH_OUTCOMES.inc(outcome=outcome)
 
     conn.close()
+
+    attempted = stats["checked"] - stats["skipped"]
+    id_first = stats["local"] + stats["tmdb_id"]
+    stats["id_first_hit_rate"] = round(id_first / attempted * 100, 2) if attempted else 0
+
+    logger.log(
+        f"🎯 ID-first resolution: {id_first}/{attempted} ({stats['id_first_hit_rate']}%) "
+        f"[local={stats['local']}, tmdb_id={stats['tmdb_id']}, search={stats['search']}, "
+        f"unmatched={stats['unmatched']}, failed={stats['failed']}]"
+    )
     logger.log("✅ Re-enrichment phase complete.")
+    return stats
 
 # ---------------- Schema ---------------- #
+# media/seasons/episodes/files: INTEGER pk for joins, the SHA1 `id` stays
+# the external identifier used by the API (see _migrate_surrogate_keys).
+# files uses AUTOINCREMENT: pks are never reused, so "pk > last seen" finds
+# every change (services/analytics.py).
+# Paths live in `directories` (see directory_pk): files keep dir_pk + filename,
+# media/seasons keep folder_pk. A file's path is `d.path || '/' || f.filename`.
+KEYED_TABLES = {
+    "directories": """
+        CREATE TABLE IF NOT EXISTS directories (
+            pk INTEGER PRIMARY KEY,
+            parent_pk INTEGER REFERENCES directories(pk),
+            name TEXT NOT NULL,
+            path TEXT NOT NULL UNIQUE
+        )""",
+    "media": """
+        CREATE TABLE IF NOT EXISTS media (
+            pk INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            type TEXT,
+            title TEXT,
+            folder_pk INTEGER REFERENCES directories(pk),
+            drive_id TEXT,
+            release_year INTEGER,
+            quality TEXT,
+            tmdb_id INTEGER,
+            sonarr_id INTEGER,
+            radarr_id INTEGER,
+            season_count INTEGER DEFAULT 0,
+            episode_count INTEGER DEFAULT 0,
+            total_size INTEGER DEFAULT 0
+        )""",
+    "seasons": """
+        CREATE TABLE IF NOT EXISTS seasons (
+            pk INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            media_pk INTEGER REFERENCES media(pk),
+            season_number INTEGER,
+            folder_pk INTEGER REFERENCES directories(pk),
+            episode_count INTEGER DEFAULT 0,
+            total_size INTEGER DEFAULT 0
+        )""",
+    "episodes": """
+        CREATE TABLE IF NOT EXISTS episodes (
+            pk INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            season_pk INTEGER REFERENCES seasons(pk),
+            episode_number INTEGER,
+            title TEXT,
+            size INTEGER DEFAULT 0
+        )""",
+    "files": """
+        CREATE TABLE IF NOT EXISTS files (
+            pk INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            media_pk INTEGER REFERENCES media(pk),
+            season_pk INTEGER REFERENCES seasons(pk),
+            episode_pk INTEGER REFERENCES episodes(pk),
+            dir_pk INTEGER REFERENCES directories(pk),
+            filename TEXT,
+            drive_id TEXT,
+            size INTEGER DEFAULT 0,
+            mtime INTEGER DEFAULT 0
+        )""",
+}
+
 def create_schema(conn):
     cur = conn.cursor()
 
@@ -255,54 +347,8 @@ def create_schema(conn):
         total_size INTEGER
     )""")
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS media (
-        id TEXT PRIMARY KEY,
-        type TEXT,
-        title TEXT,
-        folder_path TEXT,
-        drive_id TEXT,
-        release_year INTEGER,
-        quality TEXT,
-        tmdb_id INTEGER,
-        sonarr_id INTEGER,
-        radarr_id INTEGER,
-        season_count INTEGER DEFAULT 0,
-        episode_count INTEGER DEFAULT 0,
-        total_size INTEGER DEFAULT 0
-    )""")
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS seasons (
-        id TEXT PRIMARY KEY,
-        media_id TEXT,
-        season_number INTEGER,
-        folder_path TEXT,
-        episode_count INTEGER DEFAULT 0,
-        total_size INTEGER DEFAULT 0
-    )""")
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS episodes (
-        id TEXT PRIMARY KEY,
-        season_id TEXT,
-        episode_number INTEGER,
-        title TEXT,
-        size INTEGER DEFAULT 0
-    )""")
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS files (
-        id TEXT PRIMARY KEY,
-        media_id TEXT,
-        season_id TEXT,
-        episode_id TEXT,
-        filename TEXT,
-        fullpath TEXT,
-        drive_id TEXT,
-        size INTEGER DEFAULT 0,
-        mtime INTEGER DEFAULT 0
-    )""")
+    for ddl in KEYED_TABLES.values():
+        cur.execute(ddl)
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS metadata (
@@ -340,10 +386,145 @@ def create_schema(conn):
     )""")
 
     conn.commit()
+    migrated = _migrate_surrogate_keys(conn)
+    migrated = _migrate_directories(conn) or migrated
+    if migrated:
+        logger.log("🧹 Reclaiming space (VACUUM)...")
+        conn.execute("VACUUM")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_seasons_media ON seasons(media_pk, season_number)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_episodes_season ON episodes(season_pk, episode_number)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_files_media ON files(media_pk)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_files_dir ON files(dir_pk)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_directories_parent ON directories(parent_pk)")
+    conn.commit()
+    ensure_tombstone_schema(conn)
     logger.log("💾 Database schema ensured (with users + api_keys).")
     _migrate_drives_unique_and_ids(conn)
 
 
+# SHA1 TEXT foreign keys -> INTEGER pk references, per table:
+# (old column, new column, parent table)
+SURROGATE_KEY_TABLES = {
+    "media": [],
+    "seasons": [("media_id", "media_pk", "media")],
+    "episodes": [("season_id", "season_pk", "seasons")],
+    "files": [("media_id", "media_pk", "media"), ("season_id", "season_pk", "seasons"),
+              ("episode_id", "episode_pk", "episodes")],
+}
+
+def _migrate_surrogate_keys(conn):
+    """
+    Rebuild media/seasons/episodes/files from SHA1 TEXT primary keys to
+    INTEGER pks with integer foreign keys. The SHA1 stays as the UNIQUE `id`.
+    Runs once: tables that already have a `pk` column are left alone.
+    Returns True if anything was migrated.
+    """
+    pending = [t for t in SURROGATE_KEY_TABLES
+               if "pk" not in {row[1] for row in conn.execute(f"PRAGMA table_info({t})")}]
+    if not pending:
+        return False
+
+    logger.log(f"🔑 Migrating {', '.join(pending)} to integer keys...")
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        for table in SURROGATE_KEY_TABLES:
+            if table not in pending:
+                continue
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            conn.execute(KEYED_TABLES[table])
+            old_cols = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table}_legacy)")]
+            new_cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            fks = {old: (new, parent) for old, new, parent in SURROGATE_KEY_TABLES[table]}
+            # columns added later by ALTER TABLE (e.g. fingerprints) come along
+            for col, coltype in old_cols:
+                if col not in new_cols and col not in fks:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {coltype}")
+            copied = [col for col, _ in old_cols if col not in fks]
+            joins = " ".join(
+                f"LEFT JOIN {parent} p{i} ON p{i}.id = o.{old}" for i, (old, (_, parent)) in enumerate(fks.items())
+            )
+            conn.execute(f"""
+                INSERT INTO {table} ({", ".join(copied + [new for new, _ in fks.values()])})
+                SELECT {", ".join([f"o.{c}" for c in copied] + [f"p{i}.pk" for i in range(len(fks))])}
+                FROM {table}_legacy o {joins}
+                WHERE o.id IS NOT NULL
+                ORDER BY o.rowid
+            """)
+        for table in pending:
+            conn.execute(f"DROP TABLE {table}_legacy")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.log("✅ Integer key migration complete.")
+    return True
+
+
+def directory_pk(conn, path, cache=None):
+    """
+    pk of the directories row for path, creating it and any missing parents.
+    cache (path -> pk) saves the lookup for the many files of one directory.
+    """
+    path = os.path.normpath(path)
+    if cache is not None and path in cache:
+        return cache[path]
+    row = conn.execute("SELECT pk FROM directories WHERE path=?", (path,)).fetchone()
+    if row is None:
+        parent = os.path.dirname(path)
+        parent_pk = directory_pk(conn, parent, cache) if parent != path else None
+        conn.execute("INSERT OR IGNORE INTO directories (parent_pk, name, path) VALUES (?,?,?)",
+                     (parent_pk, os.path.basename(path) or path, path))
+        row = conn.execute("SELECT pk FROM directories WHERE path=?", (path,)).fetchone()
+    if cache is not None:
+        cache[path] = row[0]
+    return row[0]
+
+
+# Path columns folded into directories: table -> (old column, new column, stores a file path)
+PATH_COLUMNS = {
+    "media": ("folder_path", "folder_pk", False),
+    "seasons": ("folder_path", "folder_pk", False),
+    "files": ("fullpath", "dir_pk", True),
+}
+
+def _migrate_directories(conn):
+    """
+    Replace files.fullpath and media/seasons.folder_path with references into
+    directories. Runs once: tables without the old column are left alone.
+    Returns True if anything was migrated.
+    """
+    pending = {t: cols for t, cols in PATH_COLUMNS.items()
+               if cols[0] in {row[1] for row in conn.execute(f"PRAGMA table_info({t})")}}
+    if not pending:
+        return False
+
+    logger.log(f"📁 Moving {', '.join(pending)} paths into directories...")
+    cache = {}
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        for table, (old, new, is_file) in pending.items():
+            if new not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {new} INTEGER REFERENCES directories(pk)")
+            rows = conn.execute(f"SELECT pk, {old} FROM {table} WHERE {old} IS NOT NULL").fetchall()
+            updates = [(directory_pk(conn, os.path.dirname(path) if is_file else path, cache), pk)
+                       for pk, path in rows]
+            conn.executemany(f"UPDATE {table} SET {new}=? WHERE pk=?", updates)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for table, (old, _, _) in pending.items():
+        try:
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {old}")
+        except sqlite3.OperationalError as e:
+            # SQLite < 3.35 has no DROP COLUMN: the column stays, unused
+            logger.log(f"⚠️ Could not drop {table}.{old}: {e}")
+    conn.commit()
+    logger.log(f"✅ Path migration complete ({len(cache)} directories).")
+    return True
+
 # ---------------- Drive Insert ---------------- #
 # ---------------- Drive Insert ---------------- #
 def insert_drive(conn, path, device=None, brand=None, model=None, serial=None, total_size=None):
@@ -367,7 +548,12 @@ def insert_drive(conn, path, device=None, brand=None, model=None, serial=None, t
     return cur.lastrowid
 
 
-def enrich_metadata(conn, media_id, title, mtype="movie"):
+def enrich_metadata(conn, media_id, title, mtype="movie", connector_index=None):
+    """
+    Fill metadata for one media row. Returns how it was resolved:
+    None (nothing to do), "local" (connector_media match), "tmdb_id"
+    (direct TMDB lookup by a locally known id), "search" or "unmatched".
+    """
     cur = conn.cursor()
 
     # Load existing metadata row
@@ -412,13 +598,26 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
 
     logger.log(f"🔎 Enriching {mtype}: raw='{raw_title}', cleaned='{cleaned_title}', year={release_year}")
 
+    # --- ID-first: already in Radarr/Sonarr (connector_media)? ---
+    outcome = "search"
+    local = match_connector_media(connector_index, raw_title, release_year, mtype)
+    CACHE_REQUESTS.inc(cache="connector_index", result="hit" if local else "miss")
+    if local and local["raw"]:
+        data, provider, outcome = local["raw"], local["app"], "local"
+    elif local and local["tmdb_id"]:
+        data = fetch_tmdb_details(local["tmdb_id"], mtype)
+        if data:
+            data.setdefault("imdbId", local["imdb_id"])
+            provider, outcome = "TMDB-id", "tmdb_id"
+
     # --- Try Sonarr/Radarr ---
-    if mtype == "tv":
-        data = fetch_sonarr(cleaned_title)
-        provider = "Sonarr" if data else None
-    else:
-        data = fetch_radarr(cleaned_title)
-        provider = "Radarr" if data else None
+    if not data:
+        if mtype == "tv":
+            data = fetch_sonarr(cleaned_title)
+            provider = "Sonarr" if data else None
+        else:
+            data = fetch_radarr(cleaned_title)
+            provider = "Radarr" if data else None
 
     # --- Fallbacks: TMDB ---
     if not data:
@@ -448,7 +647,9 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
         # Poster update rules
         new_poster = (
             data.get("remotePoster")
-            or (f"https://image.tmdb.org/t/p/w500{data['poster_path']}" if data.get("poster_path") else None)
+            or (f"{TMDB_IMAGE_URL}/w500{data['poster_path']}" if data.get("poster_path") else None)
+            or next((img.get("remoteUrl") for img in data.get("images") or []
+                     if img.get("coverType") == "poster" and img.get("remoteUrl")), None)
         )
         old_poster = fields.get("poster_url")
 
@@ -458,7 +659,7 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
             poster = new_poster or old_poster  # prefer new if available
 
         backdrop = (
-            f"https://image.tmdb.org/t/p/original{data['backdrop_path']}"
+            f"{TMDB_IMAGE_URL}/original{data['backdrop_path']}"
             if data.get("backdrop_path")
             else fields.get("backdrop_url")
         )
@@ -467,8 +668,11 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
         if isinstance(data.get("genres"), list):
             genres = ", ".join([g if isinstance(g, str) else g.get("name") for g in data["genres"]])
 
+        ratings = data.get("ratings") or {}
         rating = (
-            data.get("ratings", {}).get("value")
+            (ratings.get("value")
+             or (ratings.get("tmdb") or {}).get("value")
+             or (ratings.get("imdb") or {}).get("value"))
             if "ratings" in data
             else data.get("vote_average")
         ) or fields.get("rating")
@@ -491,7 +695,8 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
             (tmdb_id, sonarr_id, radarr_id, media_id)
         )
         conn.commit()
-        logger.log(f"📑 Enriched {mtype}: {title_val} from {provider}")
+        logger.log(f"📑 Enriched {mtype}: {title_val} from {provider}" + (" (local match)" if outcome == "local" else ""))
+        return outcome
     else:
         if not row:
             conn.execute(
@@ -504,16 +709,18 @@ def enrich_metadata(conn, media_id, title, mtype="movie"):
             )
             conn.commit()
         logger.log(f"⚠️ Could not enrich {mtype}: {raw_title} (no match)")
+        return "unmatched"
 
 
 
 
-def insert_file(conn, drive_id, fullpath):
+def insert_file(conn, drive_id, fullpath, dir_cache=None):
+    """Index one file. Returns (outcome, size): "indexed", "unchanged" or "ignored"."""
     filename = os.path.basename(fullpath)
     ext = os.path.splitext(filename)[1].lower()
     if ext not in VIDEO_EXTENSIONS:
         logger.log(f"🚫 Ignored non-video file: {filename}")
-        return
+        return "ignored", 0
 
     parsed = parse_filename(filename, fullpath)
     file_id = sha1_str(os.path.abspath(fullpath))
@@ -522,44 +729,63 @@ def insert_file(conn, drive_id, fullpath):
 
     # check existing
     cur = conn.cursor()
-    row = cur.execute("SELECT size, mtime FROM files WHERE id=?", (file_id,)).fetchone()
-    if row and row[0] == size and row[1] == mtime:
-        return  # unchanged
+    row = cur.execute("SELECT size, mtime, deleted_at FROM files WHERE id=?", (file_id,)).fetchone()
+    if row and row[0] == size and row[1] == mtime and row[2] is None:
+        return "unchanged", size
 
     if parsed["type"] == "tv":
         media_id = sha1_str(parsed["title"].lower())
         season_id = sha1_str(f"{media_id}-S{parsed['season']}")
         episode_id = sha1_str(f"{season_id}-E{parsed['episode']}")
-        series_folder = os.path.dirname(os.path.dirname(fullpath))
-        season_folder = os.path.dirname(fullpath)
+        season_folder = directory_pk(conn, os.path.dirname(fullpath), dir_cache)
+        series_folder = directory_pk(conn, os.path.dirname(os.path.dirname(fullpath)), dir_cache)
 
-        conn.execute("INSERT OR IGNORE INTO media (id,type,title,folder_path,drive_id) VALUES (?,?,?,?,?)",
+        conn.execute("INSERT OR IGNORE INTO media (id,type,title,folder_pk,drive_id) VALUES (?,?,?,?,?)",
                      (media_id, "tv", parsed["title"], series_folder, drive_id))
-        conn.execute("INSERT OR IGNORE INTO seasons (id,media_id,season_number,folder_path) VALUES (?,?,?,?)",
-                     (season_id, media_id, parsed["season"], season_folder))
-        conn.execute("INSERT OR IGNORE INTO episodes (id,season_id,episode_number,title,size) VALUES (?,?,?,?,?)",
-                     (episode_id, season_id, parsed["episode"], parsed["ep_title"], size))
         conn.execute("""
-            INSERT OR REPLACE INTO files (id,media_id,season_id,episode_id,filename,fullpath,drive_id,size,mtime)
-            VALUES (?,?,?,?,?,?,?,?,?)
-        """, (file_id, media_id, season_id, episode_id, filename, fullpath, drive_id, size, mtime))
+            INSERT OR IGNORE INTO seasons (id,media_pk,season_number,folder_pk)
+            VALUES (?,(SELECT pk FROM media WHERE id=?),?,?)
+        """, (season_id, media_id, parsed["season"], season_folder))
+        conn.execute("""
+            INSERT OR IGNORE INTO episodes (id,season_pk,episode_number,title,size)
+            VALUES (?,(SELECT pk FROM seasons WHERE id=?),?,?,?)
+        """, (episode_id, season_id, parsed["episode"], parsed["ep_title"], size))
+        # Multi-episode files (S01E01-E02): the extra episodes exist but carry no size of their own
+        for extra in parsed.get("episodes", [])[1:]:
+            conn.execute("""
+                INSERT OR IGNORE INTO episodes (id,season_pk,episode_number,title,size)
+                VALUES (?,(SELECT pk FROM seasons WHERE id=?),?,?,?)
+            """, (sha1_str(f"{season_id}-E{extra}"), season_id, extra, parsed["ep_title"], 0))
+        conn.execute("""
+            INSERT OR REPLACE INTO files (id,media_pk,season_pk,episode_pk,dir_pk,filename,drive_id,size,mtime)
+            VALUES (?,(SELECT pk FROM media WHERE id=?),(SELECT pk FROM seasons WHERE id=?),
+                    (SELECT pk FROM episodes WHERE id=?),?,?,?,?,?)
+        """, (file_id, media_id, season_id, episode_id, season_folder, filename, drive_id, size, mtime))
+        # a file that came back brings its show out of the tombstones
+        revive(conn, "media", [media_id])
+        revive(conn, "seasons", [season_id])
+        revive(conn, "episodes", [episode_id] + [sha1_str(f"{season_id}-E{e}") for e in parsed.get("episodes", [])[1:]])
         conn.commit()
         logger.log(f"🎬 Indexed TV: {parsed['title']} S{parsed['season']:02}E{parsed['episode']:02}")
 
     else:
         media_id = sha1_str(parsed["title"].lower() + str(parsed.get("year", "")))
+        folder = directory_pk(conn, os.path.dirname(fullpath), dir_cache)
         conn.execute("""
-            INSERT OR IGNORE INTO media (id,type,title,folder_path,drive_id,release_year,quality)
+            INSERT OR IGNORE INTO media (id,type,title,folder_pk,drive_id,release_year,quality)
             VALUES (?,?,?,?,?,?,?)
-        """, (media_id, "movie", parsed["title"], os.path.dirname(fullpath),
+        """, (media_id, "movie", parsed["title"], folder,
               drive_id, parsed.get("year"), parsed.get("quality")))
         conn.execute("""
-            INSERT OR REPLACE INTO files (id,media_id,filename,fullpath,drive_id,size,mtime)
-            VALUES (?,?,?,?,?,?,?)
-        """, (file_id, media_id, filename, fullpath, drive_id, size, mtime))
+            INSERT OR REPLACE INTO files (id,media_pk,dir_pk,filename,drive_id,size,mtime)
+            VALUES (?,(SELECT pk FROM media WHERE id=?),?,?,?,?,?)
+        """, (file_id, media_id, folder, filename, drive_id, size, mtime))
+        revive(conn, "media", [media_id])
         conn.commit()
         logger.log(f"🎥 Indexed Movie: {parsed['title']} ({parsed.get('year')}) [{parsed.get('quality')}]")
 
+    return "indexed", size
+
 
 # ---------------- Aggregation Updates ---------------- #
 def update_counts(conn):
@@ -568,16 +794,19 @@ def update_counts(conn):
     # Update TV seasons
     conn.execute("""
     UPDATE seasons
-    SET episode_count = (SELECT COUNT(*) FROM episodes e WHERE e.season_id = seasons.id),
-        total_size = (SELECT COALESCE(SUM(size),0) FROM episodes e WHERE e.season_id = seasons.id)
+    SET episode_count = (SELECT COUNT(*) FROM episodes e WHERE e.season_pk = seasons.pk AND e.deleted_at IS NULL),
+        total_size = (SELECT COALESCE(SUM(size),0) FROM episodes e
+                      WHERE e.season_pk = seasons.pk AND e.deleted_at IS NULL)
     """)
 
     # Update TV media
     conn.execute("""
     UPDATE media
-    SET season_count = (SELECT COUNT(*) FROM seasons s WHERE s.media_id = media.id),
-        episode_count = (SELECT COALESCE(SUM(episode_count),0) FROM seasons s WHERE s.media_id = media.id),
-        total_size = (SELECT COALESCE(SUM(total_size),0) FROM seasons s WHERE s.media_id = media.id)
+    SET season_count = (SELECT COUNT(*) FROM seasons s WHERE s.media_pk = media.pk AND s.deleted_at IS NULL),
+        episode_count = (SELECT COALESCE(SUM(episode_count),0) FROM seasons s
+                         WHERE s.media_pk = media.pk AND s.deleted_at IS NULL),
+        total_size = (SELECT COALESCE(SUM(total_size),0) FROM seasons s
+                      WHERE s.media_pk = media.pk AND s.deleted_at IS NULL)
     WHERE type = 'tv'
     """)
 
@@ -587,7 +816,7 @@ def update_counts(conn):
     SET total_size = (
         SELECT COALESCE(SUM(size),0)
         FROM files f
-        WHERE f.media_id = media.id
+        WHERE f.media_pk = media.pk AND f.deleted_at IS NULL
     )
     WHERE type = 'movie'
     """)
@@ -596,51 +825,169 @@ def update_counts(conn):
     logger.log("✅ Counts updated.")
 
 
-def run_all(scan_state=None):
-    conn = sqlite3.connect(DB_FILE)
-    create_schema(conn)
+def expected_file_count(conn, scan_path):
+    """Files indexed under scan_path by the previous scan (for the ETA)."""
+    root = os.path.normpath(scan_path)
+    prefix = root.rstrip("/") + "/"
+    return conn.execute("""
+        SELECT COUNT(*) FROM directories d JOIN files f ON f.dir_pk = d.pk
+        WHERE (d.path = ? OR (d.path >= ? AND d.path < ?)) AND f.deleted_at IS NULL
+    """, (root, prefix, prefix[:-1] + "0")).fetchone()[0]
 
-    if scan_state is not None:
-        scan_state["workers"].clear()
 
-    # 1. Scan & index files
-    for entry in CONFIG.get("parent_paths", []):
-        scan_path = entry["path"]
-        drive_id = insert_drive(conn, scan_path)  # fix param order
-        logger.log(f"🚀 Scanning {scan_path}")
-
-        if scan_state is not None:
-            scan_state["workers"][scan_path] = "scanning"
-
-        for root, dirs, files in os.walk(scan_path):
-            for fname in files:
-                fullpath = os.path.join(root, fname)
-                try:
-                    if scan_state is not None:
-                        scan_state["workers"][fname] = "indexing"
-
-                    insert_file(conn, drive_id, fullpath)
-
-                    if scan_state is not None:
-                        scan_state["workers"][fname] = "done"
-                except Exception as e:
-                    logger.log(f"⚠️ Failed {fullpath}: {e}")
-                    if scan_state is not None:
-                        scan_state["workers"][fname] = f"error: {e}"
-
-        if scan_state is not None:
-            scan_state["workers"][scan_path] = "done"
-
-    # 2. Update aggregates
+def drive_for_directory(conn, dir_pk):
+    """The drives row whose path is the closest ancestor of a directory (or None)."""
+    return conn.execute("""
+        WITH RECURSIVE up(pk, parent_pk, path) AS (
+            SELECT pk, parent_pk, path FROM directories WHERE pk = ?
+            UNION ALL
+            SELECT d.pk, d.parent_pk, d.path FROM directories d JOIN up ON d.pk = up.parent_pk
+        )
+        SELECT dr.* FROM up JOIN drives dr ON rtrim(dr.path, '/') = up.path
+        ORDER BY LENGTH(up.path) DESC
+        LIMIT 1
+    """, (dir_pk,)).fetchone()
+
+
+def dir_key(relpath):
+    """Sort key matching the order of a sorted top-down os.walk (pre-order)."""
+    return () if relpath in ("", ".") else tuple(relpath.split(os.sep))
+
+
+def scan_drive(conn, scan_path, progress=None, cancel=None, resume_from=None, on_dir_done=None):
+    """
+    Walk and index one drive in a deterministic (sorted) order.
+
+    resume_from is the relative path of the last completed directory of an
+    interrupted scan: everything before it in walk order is skipped.
+    on_dir_done(relpath) is called after each directory's files are indexed.
+    Files that vanished are tombstoned (services/tombstones.py). An unmounted
+    drive is flagged offline and not walked.
+    Returns "done", "offline", or "cancelled" once the cancel event is set.
+    """
+    drive_id = insert_drive(conn, scan_path)  # fix param order
+    logger.log(f"🚀 Scanning {scan_path}" + (f" (resuming after '{resume_from}')" if resume_from is not None else ""))
+
+    if progress is not None:
+        progress.start_drive(scan_path)
+
+    # probed with a timeout: a hung mount must not block the walk below
+    mount = probe_drives([scan_path], max_age=0)[scan_path]
+    if mount["state"] == "offline":
+        set_drive_online(conn, scan_path, False)
+        logger.log(f"🔌 {scan_path} is offline ({mount['error']}): skipped, its files are kept")
+        if progress is not None:
+            progress.finish_drive(scan_path, "offline")
+        return "offline"
+    if set_drive_online(conn, scan_path, True):
+        logger.log(f"🔌 {scan_path} is back online")
+    if mount["state"] == "slow":
+        logger.log(f"🐢 {scan_path} is slow to answer ({mount['latency_ms']} ms)")
+    stamp = now_stamp()
+    visited = set()
+    tombstoned = 0
+
+    done_key = dir_key(resume_from) if resume_from is not None else None
+    dir_cache = {}
+
+    for root, dirs, files in os.walk(scan_path):
+        dirs.sort()
+        rel = os.path.relpath(root, scan_path)
+        key = dir_key(rel)
+
+        if done_key is not None:
+            # Drop subtrees that were finished before the checkpoint
+            dirs[:] = [
+                d for d in dirs
+                if not (key + (d,) < done_key and done_key[:len(key) + 1] != key + (d,))
+            ]
+            if key <= done_key:
+                continue
+
+        if progress is not None:
+            progress.enter_dir(root)
+        for fname in sorted(files):
+            if cancel is not None and cancel.is_set():
+                logger.log(f"🛑 Scan of {scan_path} cancelled in {root}")
+                if progress is not None:
+                    progress.finish_drive(scan_path, "cancelled")
+                return "cancelled"
+
+            fullpath = os.path.join(root, fname)
+            try:
+                outcome, size = insert_file(conn, drive_id, fullpath, dir_cache)
+                FILES_INDEXED.inc(outcome=outcome)
+                SCAN_BYTES.inc(size)
+                if progress is not None:
+                    progress.record(fullpath, outcome, size)
+            except Exception as e:
+                FILES_INDEXED.inc(outcome="error")
+                logger.log(f"⚠️ Failed {fullpath}: {e}")
+                if progress is not None:
+                    progress.error(fullpath, e)
+
+        visited.add(os.path.normpath(root))
+        tombstoned += reconcile_directory(conn, root, files, stamp)
+        conn.commit()
+        if on_dir_done is not None:
+            on_dir_done("" if rel == "." else rel)
+
+    # a drive that dropped out mid-walk looks like every folder was deleted
+    if probe_drives([scan_path], max_age=0)[scan_path]["state"] != "offline":
+        tombstoned += reconcile_subtree(conn, scan_path, visited, stamp)
+    else:
+        set_drive_online(conn, scan_path, False)
+        logger.log(f"🔌 {scan_path} went away during the scan: skipped removed-folder check")
+    if tombstoned:
+        cascaded = cascade_tombstones(conn, stamp)
+        logger.log(f"🪦 {tombstoned} missing files tombstoned on {scan_path} "
+                   f"({cascaded['episodes']} episodes, {cascaded['seasons']} seasons, {cascaded['media']} media)")
+    conn.commit()
+
+    if progress is not None:
+        progress.finish_drive(scan_path)
+    return "done"
+
+
+def finish_scan(conn):
+    """Post-scan steps: aggregates, then enrichment of anything missing metadata."""
     update_counts(conn)
 
-    # 3. Enrich everything that’s missing metadata
     logger.log("🎬 Running enrichment for all media...")
     try:
         re_enrich_all_metadata()
     except Exception as e:
         logger.log(f"⚠️ Enrichment phase failed: {e}")
 
+
+def run_all(progress=None):
+    """Scan all configured paths. progress is an optional services.progress.ScanProgress."""
+    conn = sqlite3.connect(DB_FILE)
+    create_schema(conn)
+
+    scan_paths = [entry["path"] for entry in CONFIG.get("parent_paths", [])]
+
+    # Probe every drive at once (bounded by MOUNT_PROBE_TIMEOUT) and skip the offline ones
+    for scan_path in scan_paths:
+        insert_drive(conn, scan_path)
+    mounts = probe_drives(scan_paths, max_age=0)
+    sync_drive_states(conn, mounts)
+    for scan_path, mount in mounts.items():
+        if mount["state"] == "offline":
+            logger.log(f"🔌 Skipping offline drive {scan_path} ({mount['error']})")
+    scan_paths = [p for p in scan_paths if mounts[p]["state"] != "offline"]
+
+    if progress is not None:
+        for scan_path in scan_paths:
+            progress.add_drive(scan_path, expected_file_count(conn, scan_path))
+
+    # 1. Scan & index files
+    for scan_path in scan_paths:
+        scan_drive(conn, scan_path, progress)
+
+    # 2. + 3. Aggregates and enrichment
+    finish_scan(conn)
+
     conn.close()
     logger.log("🎉 Scan + enrichment complete.")
 
@@ -0,0 +1,257 @@
+# services/job_queue.py
+"""
+SQLite-backed job queue between the web app and worker.py.
+
+The web process only enqueues (from the scheduler or /api/v3/tasks/run)
+and the worker process claims and runs the jobs, so heavy tasks never
+share the API's GIL. Every state change bumps `seq`, which lets the web
+process pick up changes with one indexed query (see watch_job_queue).
+"""
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from services.indexer import DB_FILE
+
+# "worker": scheduled/manual runs go through the queue (run `python worker.py`)
+# "inline": old behaviour, jobs run on the scheduler's threads in the web process
+TASK_DISPATCH = os.getenv("TASK_DISPATCH", "worker").lower()
+
+JOB_HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = 120
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_PRUNE_SECONDS = 3600
+WATCH_INTERVAL = 2
+FINISHED = ("done", "error", "lost")
+
+
+def get_queue_connection():
+    return sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+
+
+def ensure_job_queue_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            name TEXT,
+            source TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            enqueued_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            heartbeat_at TEXT,
+            worker TEXT,
+            error TEXT,
+            seq INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_job_queue_status ON job_queue(status, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_job_queue_seq ON job_queue(seq)")
+    conn.commit()
+
+
+JOB_COLUMNS = ("id, task_id, name, source, status, enqueued_at, started_at, "
+               "finished_at, heartbeat_at, worker, error, seq")
+JOB_KEYS = tuple(c.strip() for c in JOB_COLUMNS.split(","))
+
+
+def _row_to_job(row):
+    return dict(zip(JOB_KEYS, row)) if row else None
+
+
+def _next_seq(cur):
+    return cur.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM job_queue").fetchone()[0]
+
+
+def enqueue_job(task_id, name=None, source="schedule"):
+    """
+    Queue a run of task_id and return its handle. If the task is already
+    queued or running, that job is returned instead (one run per task).
+    """
+    conn = get_queue_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        row = cur.execute(f"""
+            SELECT {JOB_COLUMNS} FROM job_queue
+            WHERE task_id=? AND status IN ('queued', 'running')
+            ORDER BY id LIMIT 1
+        """, (task_id,)).fetchone()
+        if row:
+            conn.commit()
+            return {**_row_to_job(row), "merged": True}
+
+        cur.execute("""
+            INSERT INTO job_queue (task_id, name, source, status, enqueued_at, seq)
+            VALUES (?, ?, ?, 'queued', ?, ?)
+        """, (task_id, name, source, datetime.now().isoformat(), _next_seq(cur)))
+        job_id = cur.lastrowid
+        conn.commit()
+        return {**get_job(job_id, conn), "merged": False}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_job(job_id, conn=None):
+    own = conn is None
+    conn = conn or get_queue_connection()
+    try:
+        row = conn.execute(f"SELECT {JOB_COLUMNS} FROM job_queue WHERE id=?", (job_id,)).fetchone()
+        return _row_to_job(row)
+    finally:
+        if own:
+            conn.close()
+
+
+def claim_next_job(conn, worker, exclude_tasks=()):
+    """Atomically move the oldest queued job to running for this worker."""
+    placeholders = ",".join("?" * len(exclude_tasks))
+    skip = f"AND task_id NOT IN ({placeholders})" if exclude_tasks else ""
+    query = f"""
+        SELECT id FROM job_queue
+        WHERE status='queued' {skip}
+        ORDER BY id LIMIT 1
+    """
+    # Idle polls stop at this plain read; the write lock is only taken when
+    # there is something to claim (re-checked under the lock, another worker
+    # may get there first).
+    if conn.execute(query, tuple(exclude_tasks)).fetchone() is None:
+        return None
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        row = cur.execute(query, tuple(exclude_tasks)).fetchone()
+        if not row:
+            conn.commit()
+            return None
+        now = datetime.now().isoformat()
+        cur.execute("""
+            UPDATE job_queue
+            SET status='running', started_at=?, heartbeat_at=?, worker=?, seq=?
+            WHERE id=?
+        """, (now, now, worker, _next_seq(cur), row[0]))
+        conn.commit()
+        return get_job(row[0], conn)
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def heartbeat_job(conn, job_id):
+    conn.execute("UPDATE job_queue SET heartbeat_at=? WHERE id=?", (datetime.now().isoformat(), job_id))
+
+
+def finish_job(conn, job_id, status="done", error=None):
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("""
+            UPDATE job_queue SET status=?, error=?, finished_at=?, seq=?
+            WHERE id=?
+        """, (status, error, datetime.now().isoformat(), _next_seq(cur), job_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def recover_stale_jobs(conn, stale_seconds=JOB_STALE_SECONDS):
+    """Mark running jobs whose worker stopped heartbeating as lost."""
+    cutoff = (datetime.now() - timedelta(seconds=stale_seconds)).isoformat()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        stale = cur.execute(
+            "SELECT id FROM job_queue WHERE status='running' AND heartbeat_at < ?", (cutoff,)
+        ).fetchall()
+        for (job_id,) in stale:
+            cur.execute("""
+                UPDATE job_queue SET status='lost', error='worker stopped responding',
+                       finished_at=?, seq=?
+                WHERE id=?
+            """, (datetime.now().isoformat(), _next_seq(cur), job_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(stale)
+
+
+def prune_finished_jobs(conn, retention_days=JOB_RETENTION_DAYS):
+    """
+    Delete finished jobs older than retention_days. The newest row is always
+    kept so seq keeps counting up for watch_job_queue.
+    """
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    placeholders = ",".join("?" * len(FINISHED))
+    return conn.execute(f"""
+        DELETE FROM job_queue
+        WHERE status IN ({placeholders}) AND finished_at < ?
+          AND seq < (SELECT MAX(seq) FROM job_queue)
+    """, (*FINISHED, cutoff)).rowcount
+
+
+def list_jobs(task_id=None, limit=50):
+    conn = get_queue_connection()
+    try:
+        where, params = ("WHERE task_id=?", (task_id,)) if task_id else ("", ())
+        rows = conn.execute(f"""
+            SELECT {JOB_COLUMNS} FROM job_queue {where}
+            ORDER BY id DESC LIMIT ?
+        """, (*params, limit)).fetchall()
+        return [_row_to_job(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def queue_depth(conn=None):
+    own = conn is None
+    conn = conn or get_queue_connection()
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) FROM job_queue WHERE status IN ('queued', 'running') GROUP BY status"
+        ).fetchall()
+        depth = {"queued": 0, "running": 0}
+        depth.update(dict(rows))
+        return depth
+    finally:
+        if own:
+            conn.close()
+
+
+# ---------------- Web side: mirror queue changes into TASKS / SSE ---------------- #
+
+def watch_job_queue(on_change, interval=WATCH_INTERVAL):
+    """
+    Start a daemon thread calling on_change(job) for every job state change
+    made by the worker process (one indexed query per interval).
+    """
+    def loop():
+        conn = get_queue_connection()
+        last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM job_queue").fetchone()[0]
+        while True:
+            time.sleep(interval)
+            try:
+                rows = conn.execute(f"""
+                    SELECT {JOB_COLUMNS} FROM job_queue WHERE seq > ? ORDER BY seq
+                """, (last_seq,)).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"[{datetime.now()}] ⚠️ Job queue watch failed: {e}")
+                continue
+            for row in rows:
+                job = _row_to_job(row)
+                last_seq = job["seq"]
+                try:
+                    on_change(job)
+                except Exception as e:
+                    print(f"[{datetime.now()}] ⚠️ Job change handler failed: {e}")
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    return t
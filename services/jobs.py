@@ -1,4 +1,5 @@
 from services.tasks import TASKS, push_task_event
+from services.task_runs import last_runs
 
 
 def job_submitted(event):
@@ -19,3 +20,31 @@ def job_error(event):
             "id": event.job_id,
             "error": str(event.exception)
         })
+
+
+# Worker mode (TASK_DISPATCH=worker): state comes from the job_queue table,
+# mirrored here by services.job_queue.watch_job_queue.
+JOB_QUEUE_EVENTS = {"queued": "queued", "running": "start", "done": "complete", "error": "error", "lost": "error"}
+
+def job_queue_changed(job):
+    task = TASKS.get(job["task_id"])
+    if task is None:
+        return
+    task["status"] = {"running": "running", "done": "completed"}.get(job["status"], job["status"])
+    task["job_id"] = job["id"]
+    if job["finished_at"]:
+        task["last_run"] = job["started_at"]
+    event = JOB_QUEUE_EVENTS.get(job["status"])
+    if event == "error":
+        push_task_event("error", {"id": task["id"], "name": task["name"], "job_id": job["id"], "error": job["error"]})
+    elif event:
+        push_task_event(event, {**task, "job_id": job["id"]})
+
+
+def restore_task_state():
+    """Seed TASKS status/last_run from task_runs so they survive restarts."""
+    for task_id, last in last_runs().items():
+        if task_id in TASKS:
+            TASKS[task_id]["status"] = "completed" if last["status"] == "ok" else last["status"]
+            TASKS[task_id]["last_run"] = last["started_at"]
+            TASKS[task_id]["last_duration_ms"] = last["duration_ms"]
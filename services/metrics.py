@@ -0,0 +1,307 @@
+# services/metrics.py
+"""
+Minimal in-process metrics (counters, gauges, histograms) rendered in the
+Prometheus text format at /metrics. No client library or external service.
+
+Usage:
+    from services.metrics import DB_LOCK_RETRIES
+    DB_LOCK_RETRIES.inc(op="execute")
+
+    with OUTBOUND_LATENCY.time(provider="tmdb", status="200"): ...
+
+worker.py runs in its own process: it periodically stores a snapshot of
+its samples in metrics_snapshots, and /metrics merges that in with a
+process="worker" label.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+from services.utils import TMDB_API_URL, TMDB_IMAGE_URL
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SNAPSHOT_INTERVAL = 15
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple((n, str(labels.get(n, ""))) for n in self.labelnames)
+
+    def samples(self):
+        """[(suffix, labels, value)] for rendering."""
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), fn=None):
+        """fn: optional callback returning {label values tuple: value}, read at scrape time."""
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.fn is None:
+            return super().samples()
+        try:
+            values = self.fn()
+        except Exception as e:
+            print(f"[{datetime.now()}] ⚠️ Gauge {self.name} failed: {e}")
+            return []
+        return [("", tuple(zip(self.labelnames, key)), value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield labels  # callers may fill in labels (e.g. status) before exit
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, n) in self._values.items():
+                for bound, c in zip(self.buckets, counts):
+                    out.append(("_bucket", key + (("le", _fmt_value(float(bound))),), c))
+                out.append(("_bucket", key + (("le", "+Inf"),), n))
+                out.append(("_sum", key, total))
+                out.append(("_count", key, n))
+        return out
+
+
+REGISTRY = []
+
+
+# ---------------- Rendering ---------------- #
+
+def collect(extra_labels=()):
+    """Families as plain data: [{name, type, help, samples: [(suffix, labels, value)]}]."""
+    extra = tuple(extra_labels)
+    return [{
+        "name": m.name,
+        "type": m.kind,
+        "help": m.help,
+        "samples": [(suffix, list(extra + tuple(labels)), value) for suffix, labels, value in m.samples()],
+    } for m in REGISTRY]
+
+
+def render(families):
+    merged = {}
+    for fam in families:
+        entry = merged.setdefault(fam["name"], {"type": fam["type"], "help": fam["help"], "samples": []})
+        entry["samples"].extend(fam["samples"])
+
+    lines = []
+    for name, fam in merged.items():
+        lines.append(f"# HELP {name} {fam['help']}")
+        lines.append(f"# TYPE {name} {fam['type']}")
+        for suffix, labels, value in fam["samples"]:
+            lines.append(f"{name}{suffix}{_fmt_labels([tuple(l) for l in labels])} {_fmt_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- Worker snapshots ---------------- #
+
+def ensure_metrics_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metrics_snapshots (
+            process TEXT PRIMARY KEY,
+            families TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def save_snapshot(conn, process):
+    conn.execute("""
+        INSERT INTO metrics_snapshots (process, families, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(process) DO UPDATE SET families=excluded.families, updated_at=excluded.updated_at
+    """, (process, json.dumps(collect((("process", process),))), datetime.now().isoformat()))
+    conn.commit()
+
+
+def load_snapshots(conn, exclude=()):
+    try:
+        rows = conn.execute("SELECT process, families FROM metrics_snapshots").fetchall()
+    except sqlite3.OperationalError:
+        return []
+    families = []
+    for process, data in rows:
+        if process not in exclude:
+            families.extend(json.loads(data))
+    return families
+
+
+def start_snapshot_thread(db_file, process, interval=SNAPSHOT_INTERVAL):
+    def loop():
+        conn = sqlite3.connect(db_file, timeout=30)
+        ensure_metrics_schema(conn)
+        while True:
+            try:
+                save_snapshot(conn, process)
+            except Exception as e:
+                print(f"[{datetime.now()}] ⚠️ Metrics snapshot failed: {e}")
+            time.sleep(interval)
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    return t
+
+
+# ---------------- Outbound HTTP ---------------- #
+
+def _provider_hosts():
+    hosts = {}
+    for app, var in (("sonarr", "SONARR_URL"), ("radarr", "RADARR_URL")):
+        url = os.getenv(var)
+        if url:
+            hosts[urlparse(url).netloc] = app
+    return hosts
+
+
+def http_provider(url, hosts=None):
+    """Label an outbound URL: tmdb / tmdb_images / sonarr / radarr / other."""
+    if url.startswith(TMDB_IMAGE_URL):
+        return "tmdb_images"
+    if url.startswith(TMDB_API_URL):
+        return "tmdb"
+    netloc = urlparse(url).netloc
+    hosts = _provider_hosts() if hosts is None else hosts
+    if netloc in hosts:
+        return hosts[netloc]
+    path = urlparse(url).path
+    if "/api/v3/series" in path or "/api/v3/episode" in path:
+        return "sonarr"
+    if "/api/v3/movie" in path:
+        return "radarr"
+    return "other"
+
+
+_http_installed = False
+
+
+def install_http_metrics():
+    """Time every requests call (requests.get/post/Session) by provider."""
+    global _http_installed
+    if _http_installed:
+        return
+    import requests
+
+    original = requests.Session.request
+    hosts = _provider_hosts()
+
+    def timed_request(self, method, url, *args, **kwargs):
+        provider = http_provider(url, hosts)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            resp = original(self, method, url, *args, **kwargs)
+            status = str(resp.status_code)
+            return resp
+        finally:
+            OUTBOUND_LATENCY.observe(time.perf_counter() - start, provider=provider, status=status)
+
+    requests.Session.request = timed_request
+    _http_installed = True
+
+
+# ---------------- Metrics ---------------- #
+
+HTTP_LATENCY = Histogram(
+    "catalogerr_http_request_duration_seconds",
+    "API request latency by endpoint",
+    ("method", "endpoint", "status"),
+)
+OUTBOUND_LATENCY = Histogram(
+    "catalogerr_outbound_request_duration_seconds",
+    "Outbound HTTP latency by provider (TMDB, Sonarr, Radarr, ...)",
+    ("provider", "status"),
+)
+DB_LOCK_RETRIES = Counter(
+    "catalogerr_db_lock_retries_total",
+    "SQLite 'database is locked' retries in safe_execute/safe_executemany",
+    ("op",),
+)
+FILES_INDEXED = Counter(
+    "catalogerr_scan_files_total",
+    "Files visited by library scans, by outcome",
+    ("outcome",),
+)
+SCAN_BYTES = Counter(
+    "catalogerr_scan_bytes_total",
+    "Bytes of video files visited by library scans",
+)
+ENRICH_OUTCOMES = Counter(
+    "catalogerr_enrich_items_total",
+    "Media items handled by metadata enrichment, by how they were resolved",
+    ("outcome",),
+)
+CACHE_REQUESTS = Counter(
+    "catalogerr_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ("cache", "result"),
+)
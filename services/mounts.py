@@ -0,0 +1,114 @@
+# services/mounts.py
+"""
+Mount-health probe for the configured drives.
+
+A hung NFS/SMB share or a dying USB disk blocks stat(), scandir() and
+statvfs() with no timeout. Each probe therefore runs in its own daemon
+thread, and the caller waits at most MOUNT_PROBE_TIMEOUT seconds for all of
+them together. A probe that doesn't answer in time marks the drive offline.
+Its thread stays parked in the kernel, and while it does no new probe is
+started for that path, so a dead mount costs one stuck thread, not one per
+request.
+
+States:
+  online   mounted and answered within MOUNT_SLOW_MS
+  slow     mounted but answered slower than MOUNT_SLOW_MS
+  offline  missing, not mounted, errored or timed out
+
+Results are cached per path for MOUNT_CACHE_SECONDS (health endpoints), and
+scans ask for a fresh probe (max_age=0). sync_drive_states mirrors the state
+into drives.online / offline_since (services/tombstones.py), so offline
+drives are skipped by scans and never mistaken for deleted content.
+
+Env:
+  MOUNT_PROBE_TIMEOUT  seconds to wait for a probe (default 5)
+  MOUNT_SLOW_MS        answer time above which a drive is "slow" (default 2000)
+  MOUNT_CACHE_SECONDS  how long health endpoints reuse a result (default 60)
+"""
+import os
+import time
+import shutil
+import threading
+from datetime import datetime
+
+from services.tombstones import drive_available, set_drive_online
+
+MOUNT_PROBE_TIMEOUT = float(os.getenv("MOUNT_PROBE_TIMEOUT", "5"))
+MOUNT_SLOW_MS = float(os.getenv("MOUNT_SLOW_MS", "2000"))
+MOUNT_CACHE_SECONDS = float(os.getenv("MOUNT_CACHE_SECONDS", "60"))
+
+_cache = {}     # path -> last result
+_inflight = {}  # path -> probe thread (kept while it hangs)
+_lock = threading.Lock()
+
+
+def _probe(path, out):
+    started = time.monotonic()
+    try:
+        if drive_available(path):
+            usage = shutil.disk_usage(path)
+            out.update(state="online", total=usage.total, used=usage.used, free=usage.free)
+        else:
+            out.update(state="offline", error="not mounted")
+    except Exception as e:
+        out.update(state="offline", error=str(e))
+    out["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+
+def _record(path, result):
+    result = {"path": path, "state": "offline", "error": None, "latency_ms": None,
+              "total": None, "used": None, "free": None, **result,
+              "checked_at": datetime.now().isoformat(), "checked_ts": time.time()}
+    with _lock:
+        previous = _cache.get(path)
+        _cache[path] = result
+    if previous is None or previous["state"] != result["state"]:
+        detail = result["error"] or f"{result['latency_ms']} ms"
+        print(f"[{datetime.now()}] 🔌 Drive {path}: {result['state']} ({detail})")
+    return result
+
+
+def probe_drives(paths, max_age=MOUNT_CACHE_SECONDS, timeout=MOUNT_PROBE_TIMEOUT):
+    """
+    {path: result} for each path: cached if younger than max_age, otherwise
+    probed (in parallel, all within one timeout). Never blocks longer than timeout.
+    """
+    now = time.time()
+    results, started = {}, []
+    with _lock:
+        for path in dict.fromkeys(paths):
+            cached = _cache.get(path)
+            if cached is not None and now - cached["checked_ts"] < max_age:
+                results[path] = cached
+                continue
+            thread = _inflight.get(path)
+            if thread is not None and thread.is_alive():
+                started.append((path, None, {"state": "offline", "error": "previous probe still hanging"}))
+                continue
+            out = {}
+            thread = threading.Thread(target=_probe, args=(path, out), name=f"mount-probe {path}", daemon=True)
+            _inflight[path] = thread
+            thread.start()
+            started.append((path, thread, out))
+
+    deadline = time.monotonic() + timeout
+    for path, thread, out in started:
+        if thread is not None:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                out = {"state": "offline", "error": f"no answer within {timeout:g}s"}
+            elif out["state"] == "online" and out["latency_ms"] >= MOUNT_SLOW_MS:
+                out["state"] = "slow"
+        results[path] = _record(path, dict(out))
+    return results
+
+
+def sync_drive_states(conn, results):
+    """Mirror probe results into drives.online (slow drives still count as online)."""
+    for path, result in results.items():
+        set_drive_online(conn, path, result["state"] != "offline")
+
+
+def public_state(result):
+    """A probe result without the internal timestamp, for JSON responses."""
+    return {k: v for k, v in result.items() if k != "checked_ts"}
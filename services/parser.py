@@ -0,0 +1,153 @@
+# services/parser.py
+"""
+Release-name parsing for the indexer.
+
+All patterns are compiled once at import and each form is tried with a
+single combined regex, so a filename is matched in one pass instead of
+several uncompiled re.search/re.match calls.
+
+Titles are extracted exactly as the original indexer did for the forms it
+already understood ("Show - S01E01 - Title", "Show.S01E01", "Movie (2010)"),
+because media ids are sha1(title) and must stay stable across rescans.
+"""
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# --- Folder hints (matched against the full path, case-insensitive) ---
+TV_DIR_RE = re.compile(r"/tvshows/|/season\s*\d+", re.IGNORECASE)
+MOVIE_DIR_RE = re.compile(r"/movies/", re.IGNORECASE)
+
+# --- TV: one pattern, three episode notations ---
+#   Show - S01E01 - Title      Show.S01E01E02      Show S01E01-E03
+#   Show.S01E100               Show - 1x02 - Title Show 1x02-03
+TV_RE = re.compile(
+    r"""
+    ^(?P<title>.+?)[ ._-]+
+    (?:
+        S(?P<season>\d{1,2})[ ._]?E(?P<episode>\d{1,3})
+        (?:(?:-?E|-)(?P<episode_end>\d{1,3}))*
+      |
+        (?P<x_season>\d{1,2})x(?P<x_episode>\d{2,3})
+        (?:-(?:\d{1,2}x)?(?P<x_episode_end>\d{2,3}))?
+    )
+    (?=[ ._-]|$)
+    (?:[ ._-]+(?P<ep_title>.*))?
+    $
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# --- Movies: one pattern, three notations (first match wins) ---
+#   Movie (2010) 1080p         Movie [2010] 1080p     Movie.2010.1080p.BluRay
+# The scene form needs release tags after the year: a bare trailing number
+# is part of the title ("Blade Runner 2049", "Space 1999").
+MOVIE_RE = re.compile(
+    r"""
+    ^(?:
+        (?P<title>.+?)\ \((?P<year>\d{4})\)(?:\ (?P<quality>.+))?
+      |
+        (?P<b_title>.+?)[ ._]\[(?P<b_year>\d{4})\](?:[ ._-]+(?P<b_quality>.+))?
+      |
+        (?P<s_title>.+)[ ._](?P<s_year>(?:19|20)\d{2})[ ._-]+(?P<s_quality>.+)
+    )$
+    """,
+    re.VERBOSE,
+)
+
+# Where release tags start inside an episode title ("Pilot.1080p.WEB-DL")
+EP_TITLE_TAGS_RE = re.compile(
+    r"(?:^|[ ._-])(?:\d{3,4}p|4k|uhd|hdr|bluray|bdrip|brrip|webrip|web[ ._-]?dl|web|hdtv|hdrip|dvdrip"
+    r"|x26[45]|h\.?26[45]|hevc|avc|aac|ac3|dts|ddp?\d?\.?\d?|proper|repack)(?:[ ._-]|$).*$",
+    re.IGNORECASE,
+)
+
+# Junk stripped by clean_title, as one alternation (longer tokens first)
+JUNK_RE = re.compile(
+    r"\b(?:\d{3,4}p|bluray|webrip|web[- ]dl|x265|x264|ddp\d+\.\d+|ac3|dd|yts|edge\d+|swaxon|ethel)\b",
+    re.IGNORECASE,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Scene years past this are part of the title ("Blade Runner 2049 1080p")
+MAX_SCENE_YEAR = datetime.now().year + 1
+
+
+def _dots(s):
+    return (s or "").replace(".", " ").strip()
+
+
+def _tv_result(m):
+    if m.group("season") is not None:
+        season = int(m.group("season"))
+        first = int(m.group("episode"))
+        last = m.group("episode_end")
+    else:
+        season = int(m.group("x_season"))
+        first = int(m.group("x_episode"))
+        last = m.group("x_episode_end")
+    last = int(last) if last else first
+    if last < first:
+        last = first
+
+    ep_title = EP_TITLE_TAGS_RE.sub("", m.group("ep_title") or "")
+    return {
+        "type": "tv",
+        "title": _dots(m.group("title")),
+        "season": season,
+        "episode": first,
+        "episodes": list(range(first, last + 1)),
+        "ep_title": _dots(ep_title),
+    }
+
+
+def _movie_result(m):
+    """Parsed movie, or None for a scene-form year that can't be a release year."""
+    if m.group("title") is not None:
+        return {
+            "type": "movie",
+            "title": m.group("title").strip(),
+            "year": int(m.group("year")),
+            "quality": m.group("quality") or None,
+        }
+    prefix = "b_" if m.group("b_title") is not None else "s_"
+    if prefix == "s_" and int(m.group("s_year")) > MAX_SCENE_YEAR:
+        return None
+    return {
+        "type": "movie",
+        "title": _dots(m.group(prefix + "title")),
+        "year": int(m.group(prefix + "year")),
+        "quality": _dots(m.group(prefix + "quality")) or None,
+    }
+
+
+def parse_filename(filename: str, fullpath: str):
+    name, _ = os.path.splitext(filename)
+
+    # --- Folder-based overrides ---
+    if TV_DIR_RE.search(fullpath):
+        m = TV_RE.match(name)
+        if m:
+            return _tv_result(m)
+        return {"type": "tv", "title": name}
+
+    if MOVIE_DIR_RE.search(fullpath):
+        mm = MOVIE_RE.match(name)
+        movie = _movie_result(mm) if mm else None
+        return movie or {"type": "movie", "title": name}
+
+    # --- Regex fallback ---
+    m = TV_RE.match(name)
+    if m:
+        return _tv_result(m)
+
+    mm = MOVIE_RE.match(name)
+    movie = _movie_result(mm) if mm else None
+    return movie or {"type": "movie", "title": name}
+
+
+@lru_cache(maxsize=8192)
+def clean_title(raw):
+    # Strip common rip tags and junk, then collapse whitespace
+    return WHITESPACE_RE.sub(" ", JUNK_RE.sub("", raw)).strip()
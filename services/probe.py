@@ -0,0 +1,465 @@
+# services/probe.py
+"""
+Container header probing: resolution, codecs, HDR, audio tracks, duration.
+
+Parses Matroska/WebM (EBML), MP4/MOV/M4V (ISO BMFF boxes) and AVI (RIFF)
+headers in pure Python. Only element/box headers are read and payloads are
+skipped with seeks, so a multi-GB file costs a few small reads (an MP4's
+moov box, usually well under a few MB, is the largest).
+
+Results live in `file_probes`, keyed by file id and cached on the file's
+(size, mtime). Like services/fingerprint.py this module has no app imports
+so the process pool can spawn workers cheaply.
+"""
+import io
+import os
+import json
+import struct
+from datetime import datetime
+
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024 * 1024  # AVI hdrl / MKV Tracks upper bound
+
+
+def ensure_probe_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_probes (
+            file_id TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime INTEGER,
+            container TEXT,
+            duration REAL,
+            width INTEGER,
+            height INTEGER,
+            resolution TEXT,
+            video_codec TEXT,
+            hdr TEXT,
+            bitrate INTEGER,
+            audio_codec TEXT,
+            audio_channels INTEGER,
+            audio_tracks TEXT,
+            subtitle_tracks INTEGER,
+            error TEXT,
+            probed_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def resolution_label(width, height):
+    """Nominal resolution; width first so scope crops (1920x800) still count as 1080p."""
+    if not width or not height:
+        return None
+    if width >= 3200 or height >= 2000:
+        return "2160p"
+    if width >= 1800 or height >= 1000:
+        return "1080p"
+    if width >= 1200 or height >= 700:
+        return "720p"
+    if height >= 560:
+        return "576p"
+    return "480p"
+
+
+# ---------------
+# Matroska / WebM
+# ---------------
+
+MKV_CODECS = {
+    "V_MPEGH/ISO/HEVC": "hevc", "V_MPEG4/ISO/AVC": "h264", "V_AV1": "av1", "V_VP9": "vp9", "V_VP8": "vp8",
+    "V_MPEG4/ISO/ASP": "mpeg4", "V_MPEG4/ISO/SP": "mpeg4", "V_MPEG4/ISO/AP": "mpeg4",
+    "V_MPEG2": "mpeg2", "V_MPEG1": "mpeg1", "V_MS/VFW/FOURCC": "vfw", "V_THEORA": "theora",
+    "A_AAC": "aac", "A_AC3": "ac3", "A_EAC3": "eac3", "A_DTS": "dts", "A_TRUEHD": "truehd", "A_FLAC": "flac",
+    "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_MPEG/L3": "mp3", "A_MPEG/L2": "mp2", "A_PCM": "pcm",
+    "A_ALAC": "alac",
+}
+
+EBML_HEADER, SEGMENT, SEEKHEAD, INFO, TRACKS, CLUSTER = 0x1A45DFA3, 0x18538067, 0x114D9B74, 0x1549A966, 0x1654AE6B, 0x1F43B675
+DV_CONFIGS = {b"dvcC", b"dvvC", b"dvwC"}
+
+
+def _vint(f, keep_marker=False):
+    """EBML variable-length int -> (value, length, unknown_size)."""
+    b = f.read(1)
+    if not b:
+        raise EOFError
+    first, length, mask = b[0], 1, 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML length")
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise EOFError
+    value = first if keep_marker else first & (mask - 1)
+    for c in rest:
+        value = (value << 8) | c
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _elements(f, start, end):
+    """Yield (id, data_offset, size) of the EBML elements in [start, end); size None = unknown."""
+    pos = start
+    while end is None or pos < end:
+        f.seek(pos)
+        try:
+            eid, n1, _ = _vint(f, keep_marker=True)
+            size, n2, unknown = _vint(f)
+        except EOFError:
+            return
+        data = pos + n1 + n2
+        yield eid, data, None if unknown else size
+        if unknown:
+            return  # only containers (Segment/Cluster) have unknown sizes
+        pos = data + size
+
+
+def _read(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+def _uint(f, offset, size):
+    return int.from_bytes(_read(f, offset, size), "big")
+
+
+def _float(f, offset, size):
+    data = _read(f, offset, size)
+    return struct.unpack(">f" if size == 4 else ">d", data)[0] if size in (4, 8) else 0.0
+
+
+def _str(f, offset, size):
+    return _read(f, offset, size).split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+def _mkv_track(f, start, end):
+    track = {"type": None, "codec": None, "language": "eng", "default": True}
+    for eid, data, size in _elements(f, start, end):
+        if eid == 0x83:
+            track["type"] = _uint(f, data, size)
+        elif eid == 0x86:
+            codec_id = _str(f, data, size)
+            track["codec"] = MKV_CODECS.get(codec_id) or MKV_CODECS.get(codec_id.split("/")[0]) or codec_id.lower()
+        elif eid == 0x22B59C:
+            track["language"] = _str(f, data, size)
+        elif eid == 0x22B59D:
+            track["language"] = _str(f, data, size)  # BCP47 wins over the legacy code
+        elif eid == 0x88:
+            track["default"] = bool(_uint(f, data, size))
+        elif eid == 0xE0:  # Video
+            for vid, vdata, vsize in _elements(f, data, data + size):
+                if vid == 0xB0:
+                    track["width"] = _uint(f, vdata, vsize)
+                elif vid == 0xBA:
+                    track["height"] = _uint(f, vdata, vsize)
+                elif vid == 0x55B0:  # Colour
+                    for cid, cdata, csize in _elements(f, vdata, vdata + vsize):
+                        if cid == 0x55BA:
+                            track["transfer"] = _uint(f, cdata, csize)
+        elif eid == 0xE1:  # Audio
+            for aid, adata, asize in _elements(f, data, data + size):
+                if aid == 0x9F:
+                    track["channels"] = _uint(f, adata, asize)
+        elif eid == 0x41E4:  # BlockAdditionMapping
+            for bid, bdata, bsize in _elements(f, data, data + size):
+                if bid == 0x41E7 and _read(f, bdata, bsize)[-4:] in DV_CONFIGS:
+                    track["dolby_vision"] = True
+    return track
+
+
+def probe_matroska(f):
+    info = {"container": "matroska", "tracks": []}
+    segment = None
+    for eid, data, size in _elements(f, 0, None):
+        if eid == EBML_HEADER:
+            for hid, hdata, hsize in _elements(f, data, data + size):
+                if hid == 0x4282 and _str(f, hdata, hsize) == "webm":
+                    info["container"] = "webm"
+        elif eid == SEGMENT:
+            segment = (data, None if size is None else data + size)
+            break
+    if segment is None:
+        raise ValueError("no Matroska segment")
+
+    found, seeks = {}, {}
+    for eid, data, size in _elements(f, *segment):
+        if eid in (INFO, TRACKS):
+            found[eid] = (data, size)
+        elif eid == SEEKHEAD:
+            for sid, sdata, ssize in _elements(f, data, data + size):
+                if sid != 0x4DBB:
+                    continue
+                target = pos = None
+                for kid, kdata, ksize in _elements(f, sdata, sdata + ssize):
+                    if kid == 0x53AB:
+                        target = _uint(f, kdata, ksize)
+                    elif kid == 0x53AC:
+                        pos = _uint(f, kdata, ksize)
+                if target is not None and pos is not None:
+                    seeks.setdefault(target, segment[0] + pos)
+        if eid == CLUSTER or size is None or len(found) == 2:
+            break  # media data starts: anything still missing is behind it, use the SeekHead
+
+    for eid in (INFO, TRACKS):
+        if eid not in found and eid in seeks:
+            for sid, data, size in _elements(f, seeks[eid], None):
+                if sid == eid and size is not None:
+                    found[eid] = (data, size)
+                break
+
+    if INFO in found:
+        data, size = found[INFO]
+        scale, duration = 1_000_000, None
+        for eid, edata, esize in _elements(f, data, data + size):
+            if eid == 0x2AD7B1:
+                scale = _uint(f, edata, esize)
+            elif eid == 0x4489:
+                duration = _float(f, edata, esize)
+        if duration:
+            info["duration"] = duration * scale / 1e9
+    if TRACKS in found:
+        data, size = found[TRACKS]
+        for eid, edata, esize in _elements(f, data, data + size):
+            if eid == 0xAE:
+                info["tracks"].append(_mkv_track(f, edata, edata + esize))
+    for track in info["tracks"]:
+        track["type"] = {1: "video", 2: "audio", 17: "subtitle"}.get(track["type"], "other")
+        transfer = track.pop("transfer", None)
+        if track.pop("dolby_vision", False):
+            track["hdr"] = "Dolby Vision"
+        elif transfer == 16:
+            track["hdr"] = "HDR10"
+        elif transfer == 18:
+            track["hdr"] = "HLG"
+    return info
+
+
+# ------------------
+# MP4 / MOV (ISO BMFF)
+# ------------------
+
+MP4_CODECS = {
+    "avc1": "h264", "avc3": "h264", "hvc1": "hevc", "hev1": "hevc", "dvh1": "hevc", "dvhe": "hevc",
+    "av01": "av1", "vp09": "vp9", "mp4v": "mpeg4", "mp4a": "aac", "ac-3": "ac3", "ec-3": "eac3",
+    "Opus": "opus", "fLaC": "flac", "alac": "alac", "dtsc": "dts", "dtsh": "dts", "dtsl": "dts",
+    "mlpa": "truehd", ".mp3": "mp3", "lpcm": "pcm", "sowt": "pcm", "twos": "pcm",
+}
+
+
+def _boxes(f, start, end):
+    """Yield (type, payload_offset, payload_size) for the boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        size, kind = struct.unpack(">I4s", head)
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind.decode("latin-1"), pos + header, size - header
+        pos += size
+
+
+def _mp4_sample_entry(f, kind, data, size, track):
+    track["codec"] = MP4_CODECS.get(kind, kind.strip().lower())
+    if track["type"] == "video":
+        track["width"], track["height"] = struct.unpack(">HH", _read(f, data + 24, 4))
+        for child, cdata, csize in _boxes(f, data + 78, data + size):
+            if child in ("dvcC", "dvvC", "dvwC"):
+                track["hdr"] = "Dolby Vision"
+            elif child == "colr" and _read(f, cdata, 4) == b"nclx" and "hdr" not in track:
+                _, transfer = struct.unpack(">HH", _read(f, cdata + 4, 4))
+                if transfer in (16, 18):
+                    track["hdr"] = "HDR10" if transfer == 16 else "HLG"
+        if kind in ("dvh1", "dvhe"):
+            track["hdr"] = "Dolby Vision"
+    elif track["type"] == "audio":
+        track["channels"] = struct.unpack(">H", _read(f, data + 16, 2))[0]
+
+
+def _mp4_track(f, start, end):
+    track = {"type": "other", "codec": None, "language": None, "default": True}
+    for kind, data, size in _boxes(f, start, end):
+        if kind == "tkhd":
+            track["default"] = bool(_read(f, data, 4)[3] & 1)  # track_enabled
+        elif kind != "mdia":
+            continue
+        for mkind, mdata, msize in _boxes(f, data, data + size):
+            if mkind == "mdhd":
+                version = _read(f, mdata, 1)[0]
+                lang = struct.unpack(">H", _read(f, mdata + (32 if version == 1 else 20), 2))[0]
+                if lang:
+                    track["language"] = "".join(chr(((lang >> s) & 0x1F) + 0x60) for s in (10, 5, 0))
+            elif mkind == "hdlr":
+                handler = _read(f, mdata + 8, 4)
+                track["type"] = {b"vide": "video", b"soun": "audio", b"sbtl": "subtitle",
+                                 b"subt": "subtitle", b"text": "subtitle"}.get(handler, "other")
+        for mkind, mdata, msize in _boxes(f, data, data + size):
+            if mkind != "minf":
+                continue
+            for skind, sdata, ssize in _boxes(f, mdata, mdata + msize):
+                if skind != "stbl":
+                    continue
+                for tkind, tdata, tsize in _boxes(f, sdata, sdata + ssize):
+                    if tkind == "stsd":
+                        for ekind, edata, esize in _boxes(f, tdata + 8, tdata + tsize):
+                            _mp4_sample_entry(f, ekind, edata, esize, track)
+                            break
+    return track
+
+
+def probe_mp4(f, file_size):
+    moov = None
+    for kind, data, size in _boxes(f, 0, file_size):
+        if kind == "moov":
+            moov = (data, size)
+            break
+    if moov is None:
+        raise ValueError("no moov box")
+    if moov[1] > MAX_MOOV_BYTES:
+        raise ValueError(f"moov box too large ({moov[1]} bytes)")
+    m = io.BytesIO(_read(f, *moov))
+    info = {"container": "mp4", "tracks": []}
+    for kind, data, size in _boxes(m, 0, moov[1]):
+        if kind == "mvhd":
+            version = _read(m, data, 1)[0]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", _read(m, data + 20, 12))
+            else:
+                timescale, duration = struct.unpack(">II", _read(m, data + 12, 8))
+            if timescale:
+                info["duration"] = duration / timescale
+        elif kind == "trak":
+            info["tracks"].append(_mp4_track(m, data, data + size))
+    return info
+
+
+# ---
+# AVI
+# ---
+
+AVI_AUDIO = {0x0001: "pcm", 0x0050: "mp2", 0x0055: "mp3", 0x00FF: "aac", 0x2000: "ac3", 0x2001: "dts"}
+AVI_VIDEO = {"XVID": "mpeg4", "DIVX": "mpeg4", "DX50": "mpeg4", "FMP4": "mpeg4", "H264": "h264",
+             "X264": "h264", "AVC1": "h264", "HEVC": "hevc", "MJPG": "mjpeg"}
+
+
+def _riff_chunks(f, start, end):
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        kind, size = struct.unpack("<4sI", head)
+        yield kind, pos + 8, size
+        pos += 8 + size + (size & 1)
+
+
+def probe_avi(f):
+    info = {"container": "avi", "tracks": []}
+    for kind, data, size in _riff_chunks(f, 12, 12 + MAX_HEADER_BYTES):
+        if kind != b"LIST" or _read(f, data, 4) != b"hdrl":
+            continue
+        for ckind, cdata, csize in _riff_chunks(f, data + 4, data + size):
+            if ckind == b"avih":
+                usec, _, _, _, frames = struct.unpack("<5I", _read(f, cdata, 20))
+                info["duration"] = frames * usec / 1e6 if usec else None
+            elif ckind == b"LIST" and _read(f, cdata, 4) == b"strl":
+                track = {"type": "other", "codec": None, "language": None, "default": True}
+                for skind, sdata, ssize in _riff_chunks(f, cdata + 4, cdata + csize):
+                    if skind == b"strh":
+                        fcc_type, handler = struct.unpack("<4s4s", _read(f, sdata, 8))
+                        track["type"] = {b"vids": "video", b"auds": "audio", b"txts": "subtitle"}.get(fcc_type, "other")
+                        if track["type"] == "video":
+                            name = handler.decode("latin-1").strip("\0 ").upper()
+                            track["codec"] = AVI_VIDEO.get(name, name.lower() or None)
+                    elif skind == b"strf" and track["type"] == "video":
+                        w, h = struct.unpack("<ii", _read(f, sdata + 4, 8))
+                        track["width"], track["height"] = w, abs(h)
+                    elif skind == b"strf" and track["type"] == "audio":
+                        tag, channels = struct.unpack("<HH", _read(f, sdata, 4))
+                        track["codec"] = AVI_AUDIO.get(tag, f"0x{tag:04x}")
+                        track["channels"] = channels
+                info["tracks"].append(track)
+        break  # movi follows hdrl
+    return info
+
+
+# -------
+# Probing
+# -------
+
+def probe_file(path):
+    """Return (summary dict, size, mtime) for a video file."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_RANDOM)
+        magic = f.read(12)
+        if magic[:4] == b"\x1a\x45\xdf\xa3":
+            info = probe_matroska(f)
+        elif magic[4:8] in (b"ftyp", b"moov", b"free", b"mdat", b"wide", b"skip"):
+            info = probe_mp4(f, st.st_size)
+        elif magic[:4] == b"RIFF" and magic[8:12] == b"AVI ":
+            info = probe_avi(f)
+        else:
+            raise ValueError("unrecognised container")
+    return summarize(info, st.st_size), st.st_size, int(st.st_mtime)
+
+
+def summarize(info, size):
+    """Flatten parsed tracks into the file_probes columns."""
+    tracks = info["tracks"]
+    videos = [t for t in tracks if t["type"] == "video"]
+    audios = [t for t in tracks if t["type"] == "audio"]
+    video = next((t for t in videos if t.get("width")), videos[0] if videos else {})
+    audio = next((t for t in audios if t.get("default")), audios[0] if audios else {})
+    duration = info.get("duration") or None
+    return {
+        "container": info["container"],
+        "duration": round(duration, 3) if duration else None,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "resolution": resolution_label(video.get("width"), video.get("height")),
+        "video_codec": video.get("codec"),
+        "hdr": video.get("hdr"),
+        "bitrate": int(size * 8 / duration / 1000) if duration else None,  # kbit/s, whole file
+        "audio_codec": audio.get("codec"),
+        "audio_channels": audio.get("channels"),
+        "audio_tracks": json.dumps([
+            {"codec": t.get("codec"), "channels": t.get("channels"), "language": t.get("language")}
+            for t in audios
+        ], separators=(",", ":")),
+        "subtitle_tracks": sum(1 for t in tracks if t["type"] == "subtitle"),
+    }
+
+
+def probe_job(item):
+    """Process pool entry point: (file_id, path) -> file_probes row dict.
+
+    Unreadable/unknown files still get size/mtime so the failure is cached too.
+    """
+    file_id, path = item
+    row = {"file_id": file_id, "probed_at": datetime.now().isoformat(), "error": None}
+    try:
+        summary, row["size"], row["mtime"] = probe_file(path)
+        row.update(summary)
+    except FileNotFoundError as e:
+        row["error"] = str(e)  # no size/mtime: not cached, retried next run
+    except (OSError, ValueError, EOFError, struct.error) as e:
+        try:
+            st = os.stat(path)
+            row["size"], row["mtime"] = st.st_size, int(st.st_mtime)
+        except OSError:
+            pass
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
@@ -0,0 +1,235 @@
+# services/profiler.py
+"""
+Opt-in request profiler.
+
+Enable per request with an `X-Profile: 1` header (or `?profile=1` for
+pages opened in a browser) on a request that carries a valid API key, or
+for every request with PROFILE_REQUESTS=1.
+
+While a request is profiled, every sqlite3 connection it opens records
+each statement (sqlite3 trace callback, so trigger and implicit
+BEGIN/COMMIT statements show up too) with the time spent executing and
+fetching it, plus a per-statement summary (one query run 200 times for a
+20-season show stands out there). A cProfile summary is captured alongside. Results go into a
+small in-memory ring buffer (see /api/v3/system/profile) and the response
+carries X-Profile-Id and Server-Timing headers.
+"""
+import os
+import io
+import time
+import uuid
+import pstats
+import sqlite3
+import cProfile
+import threading
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlencode
+
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0").lower() in ("1", "true", "yes")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP_FUNCTIONS = 25
+SECRET_PARAMS = ("api_key", "apikey")  # stripped from the stored request path
+
+PROFILES = deque(maxlen=PROFILE_KEEP)
+_PROFILES_LOCK = threading.Lock()
+_local = threading.local()
+
+_original_connect = sqlite3.connect
+
+
+# ---------------- SQL capture ---------------- #
+
+SQL_KEEP = 5000  # statements kept per profile; the per-statement summary counts them all
+
+
+def _add_statement(profile, sql):
+    entry = {"sql": sql, "ms": 0.0, "statements": 0}
+    profile["sql_total"] += 1
+    if len(profile["sql"]) < SQL_KEEP:
+        profile["sql"].append(entry)
+    summary = profile["by_statement"].setdefault(sql, {"sql": sql, "calls": 0, "ms": 0.0})
+    summary["calls"] += 1
+    entry["summary"] = summary
+    return entry
+
+
+def _add_time(entry, elapsed):
+    ms = elapsed * 1000
+    entry["ms"] += ms
+    entry["summary"]["ms"] += ms
+
+
+def _trace(profile, sql):
+    """sqlite3 trace callback: every statement SQLite runs, incl. triggers and implicit BEGIN."""
+    if "_started" not in profile:
+        return  # connection outlived its request; the profile is already stored
+    active = profile.get("_active")
+    if active is not None:
+        active["statements"] += 1
+    else:
+        _add_statement(profile, sql.strip())["statements"] = 1
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    _entry = None
+
+    def _run(self, method, sql, *args):
+        profile = getattr(_local, "profile", None)
+        if profile is None:
+            return method(sql, *args)
+        entry = profile["_active"] = _add_statement(profile, " ".join(sql.split()))
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            profile["_active"] = None
+            _add_time(entry, time.perf_counter() - start)
+            self._entry = entry
+
+    def _fetch(self, method, *args):
+        if self._entry is None:
+            return method(*args)
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _add_time(self._entry, time.perf_counter() - start)
+
+    def execute(self, sql, params=()):
+        return self._run(super().execute, sql, params)
+
+    def executemany(self, sql, seq):
+        return self._run(super().executemany, sql, seq)
+
+    def executescript(self, script):
+        return self._run(super().executescript, script)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        return self._fetch(super().__next__)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    # Connection.execute() creates its cursor in C, so route it through ours
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def _profiled_connect(*args, **kwargs):
+    profile = getattr(_local, "profile", None)
+    if profile is None or "factory" in kwargs:
+        return _original_connect(*args, **kwargs)
+    conn = _original_connect(*args, factory=ProfilingConnection, **kwargs)
+    conn.set_trace_callback(lambda sql: _trace(profile, sql))
+    return conn
+
+
+def install():
+    """Route sqlite3.connect through the profiler (no-op unless a request is profiled)."""
+    sqlite3.connect = _profiled_connect
+
+
+# ---------------- Request lifecycle ---------------- #
+
+def wants_profile(headers, args):
+    return PROFILE_REQUESTS or headers.get("X-Profile") == "1" or args.get("profile") == "1"
+
+
+def request_path(path, args):
+    """Path and query string to store, without the API key parameters."""
+    query = urlencode([(k, v) for k, v in args.items(multi=True) if k.lower() not in SECRET_PARAMS])
+    return f"{path}?{query}" if query else path
+
+
+def start(method, path, endpoint):
+    profile = {
+        "id": uuid.uuid4().hex[:12],
+        "at": datetime.now().isoformat(),
+        "method": method,
+        "path": path,
+        "endpoint": endpoint,
+        "sql": [],
+        "sql_total": 0,
+        "by_statement": {},
+        "_active": None,
+        "_started": time.perf_counter(),
+        "_cprofile": cProfile.Profile(),
+    }
+    try:
+        profile["_cprofile"].enable()
+    except ValueError:
+        profile["_cprofile"] = None  # another profiler already active on this thread
+    _local.profile = profile
+    return profile
+
+
+def stop(status=None):
+    """Finish the active profile, store it and return it (None if not profiling)."""
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        return None
+    _local.profile = None
+
+    prof = profile.pop("_cprofile")
+    functions = None
+    if prof is not None:
+        prof.disable()
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        functions = out.getvalue()
+
+    for entry in profile["sql"]:
+        entry.pop("summary")
+        entry["ms"] = round(entry["ms"], 3)
+    by_statement = sorted(profile.pop("by_statement").values(), key=lambda s: s["ms"], reverse=True)
+    for summary in by_statement:
+        summary["ms"] = round(summary["ms"], 3)
+    profile.pop("_active")
+
+    profile.update({
+        "status": status,
+        "total_ms": round((time.perf_counter() - profile.pop("_started")) * 1000, 3),
+        "sql_count": profile.pop("sql_total"),
+        "sql_ms": round(sum(s["ms"] for s in by_statement), 3),
+        # grouped by statement text: many calls of one query points at an N+1 loop
+        "by_statement": by_statement,
+        "functions": functions,
+    })
+    with _PROFILES_LOCK:
+        PROFILES.append(profile)
+    return profile
+
+
+def server_timing(profile):
+    return (f'sql;dur={profile["sql_ms"]};desc="{profile["sql_count"]} statements", '
+            f'total;dur={profile["total_ms"]}')
+
+
+def list_profiles():
+    with _PROFILES_LOCK:
+        return [{k: p[k] for k in ("id", "at", "method", "path", "endpoint", "status",
+                                    "total_ms", "sql_count", "sql_ms")}
+                for p in reversed(PROFILES)]
+
+
+def get_profile(profile_id):
+    with _PROFILES_LOCK:
+        return next((p for p in PROFILES if p["id"] == profile_id), None)
@@ -0,0 +1,159 @@
+# services/progress.py
+"""
+Scan progress model.
+
+Memory and snapshot size are constant regardless of library size:
+counters per drive, plus ring buffers of the last N events and errors.
+Rates are measured over a short sliding window, and the ETA is based on
+the number of files the previous scan indexed on each drive.
+"""
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+from services.events import BUS
+
+RECENT_EVENTS = 50
+RECENT_ERRORS = 20
+RATE_WINDOW = 30       # seconds of samples used for files/s and bytes/s
+OUTCOMES = ("indexed", "unchanged", "ignored", "errors")
+
+
+def _counters():
+    return {"files_seen": 0, "bytes": 0, **{k: 0 for k in OUTCOMES}}
+
+
+class ScanProgress:
+    def __init__(self, recent=RECENT_EVENTS, errors=RECENT_ERRORS):
+        self._lock = threading.Lock()
+        self._recent_size = recent
+        self._errors_size = errors
+        self.phase = "idle"
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = None
+            self.finished_at = None
+            self.current = {"drive": None, "dir": None}
+            self.totals = _counters()
+            self.drives = {}
+            self.recent = deque(maxlen=self._recent_size)
+            self.errors = deque(maxlen=self._errors_size)
+            self._samples = deque()  # (monotonic, files_seen, bytes)
+
+    # ---- updates (called from the scan thread) ---- #
+
+    def set_phase(self, phase):
+        with self._lock:
+            self.phase = phase
+            if phase == "scanning" and self.started_at is None:
+                self.started_at = datetime.now().isoformat()
+            if phase in ("done", "cancelled", "error"):
+                self.finished_at = datetime.now().isoformat()
+            self._event("phase", phase)
+        self._notify()
+
+    def add_drive(self, path, expected_files=None):
+        """Register a drive up front so the ETA covers drives not started yet."""
+        with self._lock:
+            self.drives[path] = {"phase": "queued", "expected_files": expected_files, **_counters()}
+
+    def start_drive(self, path):
+        with self._lock:
+            self.drives.setdefault(path, {"expected_files": None, **_counters()})["phase"] = "scanning"
+            self.current = {"drive": path, "dir": path}
+            self._event("drive", f"{path}: scanning")
+        self._notify()
+
+    def finish_drive(self, path, phase="done"):
+        with self._lock:
+            if path in self.drives:
+                self.drives[path]["phase"] = phase
+            self._event("drive", f"{path}: {phase}")
+        self._notify()
+
+    def enter_dir(self, path):
+        with self._lock:
+            self.current["dir"] = path
+
+    def record(self, path, outcome, size=0):
+        """Count one file; outcome is "indexed", "unchanged" or "ignored"."""
+        with self._lock:
+            self._count(outcome, size)
+            if outcome == "indexed":
+                self._event("indexed", path)
+        self._notify()
+
+    def error(self, path, exc):
+        with self._lock:
+            self._count("errors", 0)
+            entry = {"at": datetime.now().isoformat(), "path": path, "error": str(exc)}
+            self.errors.append(entry)
+            self._event("error", f"{path}: {exc}")
+        self._notify()
+
+    def _count(self, outcome, size):
+        drive = self.drives.get(self.current["drive"])
+        for c in (self.totals, drive) if drive else (self.totals,):
+            c["files_seen"] += 1
+            c[outcome] += 1
+            c["bytes"] += size or 0
+
+        now = time.monotonic()
+        if not self._samples or now - self._samples[-1][0] >= 1:
+            self._samples.append((now, self.totals["files_seen"], self.totals["bytes"]))
+            while now - self._samples[0][0] > RATE_WINDOW:
+                self._samples.popleft()
+
+    def _event(self, kind, message):
+        self.recent.append({"at": datetime.now().isoformat(), "type": kind, "message": message})
+
+    def _notify(self):
+        BUS.publish("scan", "update")
+
+    # ---- reads ---- #
+
+    def _rates(self):
+        if not self._samples:
+            return 0.0, 0.0
+        t0, files0, bytes0 = self._samples[0]
+        elapsed = time.monotonic() - t0
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (
+            (self.totals["files_seen"] - files0) / elapsed,
+            (self.totals["bytes"] - bytes0) / elapsed,
+        )
+
+    def _eta(self, files_per_sec):
+        remaining = 0
+        for d in self.drives.values():
+            if d["phase"] not in ("queued", "scanning"):
+                continue
+            if not d["expected_files"]:
+                return None  # first scan of this drive: nothing to estimate from
+            remaining += max(d["expected_files"] - d["indexed"] - d["unchanged"], 0)
+        if not files_per_sec:
+            return None
+        return int(remaining / files_per_sec)
+
+    def snapshot(self):
+        with self._lock:
+            files_per_sec, bytes_per_sec = self._rates()
+            return {
+                "phase": self.phase,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "current": dict(self.current),
+                "totals": dict(self.totals),
+                "drives": {p: dict(d) for p, d in self.drives.items()},
+                "rate": {
+                    "files_per_sec": round(files_per_sec, 2),
+                    "bytes_per_sec": int(bytes_per_sec),
+                },
+                "eta_seconds": self._eta(files_per_sec),
+                "recent": list(self.recent),
+                "errors": list(self.errors),
+            }
@@ -0,0 +1,249 @@
+# services/scan_jobs.py
+"""
+Scan job manager.
+
+- One scan per drive: requesting a drive that is already running or queued
+  returns the existing job instead of starting a second pass.
+- Jobs run one at a time on a single runner thread (SQLite has one writer).
+- cancel() stops the active job cooperatively between files and drops
+  queued ones.
+- The last completed directory of every running drive is checkpointed in
+  scan_checkpoints, so an interrupted (crashed/cancelled) scan resumes
+  where it stopped instead of re-walking the whole drive.
+"""
+import time
+import uuid
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+from services.indexer import (
+    DB_FILE, CONFIG, create_schema, scan_drive, finish_scan, expected_file_count,
+)
+
+CHECKPOINT_INTERVAL = 5  # seconds between checkpoint writes while scanning
+
+
+def ensure_scan_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_checkpoints (
+            drive_path TEXT PRIMARY KEY,
+            job_id TEXT,
+            last_dir TEXT,
+            dirs_done INTEGER DEFAULT 0,
+            status TEXT,
+            started_at TEXT,
+            updated_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def load_checkpoint(conn, drive_path):
+    row = conn.execute(
+        "SELECT last_dir, dirs_done, status FROM scan_checkpoints WHERE drive_path=?",
+        (drive_path,)
+    ).fetchone()
+    return {"last_dir": row[0], "dirs_done": row[1], "status": row[2]} if row else None
+
+
+def save_checkpoint(conn, drive_path, job_id, last_dir, dirs_done, status="running"):
+    now = datetime.now().isoformat()
+    conn.execute("""
+        INSERT INTO scan_checkpoints (drive_path, job_id, last_dir, dirs_done, status, started_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(drive_path) DO UPDATE SET
+            job_id=excluded.job_id,
+            last_dir=excluded.last_dir,
+            dirs_done=excluded.dirs_done,
+            status=excluded.status,
+            updated_at=excluded.updated_at
+    """, (drive_path, job_id, last_dir, dirs_done, status, now, now))
+    conn.commit()
+
+
+def clear_checkpoint(conn, drive_path):
+    conn.execute("DELETE FROM scan_checkpoints WHERE drive_path=?", (drive_path,))
+    conn.commit()
+
+
+def list_checkpoints():
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        ensure_scan_schema(conn)
+        rows = conn.execute("SELECT * FROM scan_checkpoints ORDER BY updated_at DESC").fetchall()
+    return [dict(r) for r in rows]
+
+
+def configured_drives():
+    return [entry["path"] for entry in CONFIG.get("parent_paths", [])]
+
+
+class ScanManager:
+    def __init__(self, progress):
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._active = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def request(self, drives=None, fresh=False):
+        """
+        Queue scans for drives (default: all configured). Returns the jobs.
+        Raises ValueError for drives that aren't configured.
+        """
+        configured = configured_drives()
+        unknown = [d for d in drives or () if d not in configured]
+        if unknown:
+            raise ValueError(f"Not a configured drive: {', '.join(unknown)}")
+        drives = drives or configured
+        jobs = []
+        with self._lock:
+            if self._thread is None:
+                # New batch: start from a clean progress model
+                self.progress.reset()
+                self.progress.set_phase("starting")
+
+            for drive in drives:
+                existing = next(
+                    (j for j in ([self._active] if self._active else []) + list(self._queue)
+                     if j["drive"] == drive),
+                    None,
+                )
+                if existing:
+                    existing["merged"] += 1
+                    jobs.append(existing)
+                    continue
+
+                job = {
+                    "id": uuid.uuid4().hex[:12],
+                    "drive": drive,
+                    "status": "queued",
+                    "fresh": bool(fresh),
+                    "merged": 0,
+                    "requested_at": datetime.now().isoformat(),
+                    "started_at": None,
+                    "finished_at": None,
+                    "resumed_from": None,
+                }
+                self._queue.append(job)
+                self.progress.add_drive(drive)
+                jobs.append(job)
+
+            if self._thread is None and self._queue:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return [dict(j) for j in jobs]
+
+    def cancel(self, drive=None):
+        """Cancel the active job and drop queued ones (optionally for one drive)."""
+        cancelled = []
+        with self._lock:
+            for job in list(self._queue):
+                if drive is None or job["drive"] == drive:
+                    self._queue.remove(job)
+                    job["status"] = "cancelled"
+                    self.progress.finish_drive(job["drive"], "cancelled")
+                    cancelled.append(dict(job))
+            if self._active and (drive is None or self._active["drive"] == drive):
+                self._active["status"] = "cancelling"
+                self._cancel.set()
+                cancelled.append(dict(self._active))
+        return cancelled
+
+    def status(self):
+        with self._lock:
+            active = dict(self._active) if self._active else None
+            queued = [dict(j) for j in self._queue]
+        return {"active": active, "queued": queued, "progress": self.progress.snapshot()}
+
+    # ---- runner ---- #
+
+    def _run(self):
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        create_schema(conn)
+        ensure_scan_schema(conn)
+        completed = 0
+
+        try:
+            while True:
+                with self._lock:
+                    job = self._queue.popleft() if self._queue else None
+                    self._active = job
+                    self._cancel.clear()
+
+                if job is None:
+                    if completed:
+                        self.progress.set_phase("finalizing")
+                        finish_scan(conn)
+                        completed = 0
+                    with self._lock:
+                        if not self._queue:
+                            drives = self.progress.snapshot()["drives"].values()
+                            cancelled = any(d["phase"] == "cancelled" for d in drives)
+                            self.progress.set_phase("cancelled" if cancelled else "done")
+                            self._thread = None
+                            break
+                    continue
+
+                self.progress.set_phase("scanning")
+                if self._run_job(conn, job) == "done":
+                    completed += 1
+        except Exception as e:
+            print(f"[{datetime.now()}] ❌ Scan runner failed: {e}")
+            with self._lock:
+                self._active = None
+                self._queue.clear()
+                self._thread = None
+            self.progress.set_phase("error")
+            conn.close()
+            return
+
+        conn.close()
+
+    def _run_job(self, conn, job):
+        drive = job["drive"]
+        checkpoint = None if job["fresh"] else load_checkpoint(conn, drive)
+        resume_from = checkpoint["last_dir"] if checkpoint else None
+        dirs_done = (checkpoint["dirs_done"] or 0) if checkpoint else 0
+
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            job["resumed_from"] = resume_from
+
+        self.progress.add_drive(drive, expected_file_count(conn, drive))
+        save_checkpoint(conn, drive, job["id"], resume_from, dirs_done)
+
+        state = {"last_dir": resume_from, "dirs_done": dirs_done, "saved_at": time.monotonic()}
+
+        def on_dir_done(relpath):
+            state["last_dir"] = relpath
+            state["dirs_done"] += 1
+            if time.monotonic() - state["saved_at"] >= CHECKPOINT_INTERVAL:
+                save_checkpoint(conn, drive, job["id"], relpath, state["dirs_done"])
+                state["saved_at"] = time.monotonic()
+
+        try:
+            outcome = scan_drive(
+                conn, drive, self.progress,
+                cancel=self._cancel, resume_from=resume_from, on_dir_done=on_dir_done,
+            )
+        except Exception as e:
+            print(f"[{datetime.now()}] ❌ Scan of {drive} failed: {e}")
+            save_checkpoint(conn, drive, job["id"], state["last_dir"], state["dirs_done"], "failed")
+            self.progress.error(drive, e)
+            outcome = "failed"
+        else:
+            if outcome == "done":
+                clear_checkpoint(conn, drive)
+            else:
+                save_checkpoint(conn, drive, job["id"], state["last_dir"], state["dirs_done"], outcome)
+
+        with self._lock:
+            job["status"] = outcome
+            job["finished_at"] = datetime.now().isoformat()
+        print(f"[{datetime.now()}] 🏁 Scan job {job['id']} ({drive}): {outcome}")
+        return outcome
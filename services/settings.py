@@ -4,6 +4,7 @@ import yaml
 import sqlite3
 import uuid
 from sqlalchemy import create_engine
+from services.tombstones import tombstone_orphans
 
 # --- File locations (root of project) ---
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -132,13 +133,20 @@ def save_config(data):
                 print(f"[➕] Added drive path: {raw_path} (id={new_id})")
 
         # ✅ Remove orphaned (only delete if not in yaml)
+        removed = False
         for db_id, db_path in db_paths.items():
             if db_path not in yaml_paths:
                 conn.execute("DELETE FROM drives WHERE id=?", (db_id,))
                 print(f"[🗑️] Removed drive path: {db_path}")
+                removed = True
 
         conn.commit()
 
+        # Their files/media are tombstoned, not left behind (purged by compaction)
+        if removed:
+            orphans = tombstone_orphans(conn)
+            print(f"[🪦] Tombstoned {orphans} files no longer under any drive")
+
     return {
         "status": "saved",
         "parent_paths": parent_paths,
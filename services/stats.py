@@ -2,8 +2,14 @@ import os
 import sqlite3
 import json
 import logging
+import threading
 from datetime import datetime
 from services.indexer import DB_FILE
+from services.compress import unpack_bytes
+from services.checksum import checksum_health
+from services.tombstones import tombstone_counts
+from services.analytics import get_store
+from services.metrics import CACHE_REQUESTS
 
 
 
@@ -17,8 +23,10 @@ def safe_int(val, default=0):
 
 
 def safe_json(val, default):
+    """Decode a JSON column, compressed (BLOB) or legacy TEXT."""
     try:
-        return json.loads(val) if val else default
+        text = unpack_bytes(val)
+        return json.loads(text) if text else default
     except Exception as e:
         logging.warning(f"[{datetime.now()}] ⚠️ JSON decode error: {e}")
         return default
@@ -48,23 +56,69 @@ def parse_size(val):
     except Exception:
         return 0
 
+def technical_breakdown(cur):
+    """Codec/resolution/HDR breakdowns and storage efficiency from file_probes (run_media_probe)."""
+    try:
+        probed = cur.execute("""
+            SELECT COUNT(p.file_id) AS probed, COUNT(*) - COUNT(p.file_id) AS unprobed,
+                   SUM(p.error IS NOT NULL) AS failed
+            FROM files f LEFT JOIN file_probes p ON p.file_id = f.id
+            WHERE f.deleted_at IS NULL
+        """).fetchone()
+    except sqlite3.OperationalError:
+        return None  # table not created yet
+
+    def breakdown(column, missing="unknown"):
+        rows = cur.execute(f"""
+            SELECT COALESCE(p.{column}, '{missing}') AS name, COUNT(*) AS files,
+                   SUM(f.size) AS bytes, SUM(p.duration) AS seconds
+            FROM file_probes p JOIN files f ON f.id = p.file_id
+            WHERE p.error IS NULL AND f.deleted_at IS NULL
+            GROUP BY 1 ORDER BY bytes DESC
+        """).fetchall()
+        return [{"name": r["name"], "files": r["files"], "bytes": safe_int(r["bytes"]),
+                 "hours": round((r["seconds"] or 0) / 3600, 1)} for r in rows]
+
+    # GB per hour of runtime: what each codec/resolution combination costs
+    efficiency = cur.execute("""
+        SELECT p.video_codec, p.resolution, COUNT(*) AS files,
+               SUM(f.size) AS bytes, SUM(p.duration) AS seconds, AVG(p.bitrate) AS avg_bitrate
+        FROM file_probes p JOIN files f ON f.id = p.file_id
+        WHERE p.error IS NULL AND p.duration > 0 AND f.deleted_at IS NULL
+        GROUP BY p.video_codec, p.resolution
+        ORDER BY bytes DESC
+    """).fetchall()
+
+    return {
+        "probed_files": safe_int(probed["probed"]) - safe_int(probed["failed"]),
+        "unprobed_files": safe_int(probed["unprobed"]),
+        "failed_files": safe_int(probed["failed"]),
+        "resolutions": breakdown("resolution"),
+        "video_codecs": breakdown("video_codec"),
+        "hdr": breakdown("hdr", "SDR"),
+        "audio_codecs": breakdown("audio_codec"),
+        "containers": breakdown("container"),
+        "efficiency": [{
+            "video_codec": r["video_codec"],
+            "resolution": r["resolution"],
+            "files": r["files"],
+            "bytes": safe_int(r["bytes"]),
+            "gb_per_hour": round(r["bytes"] / 1024**3 / (r["seconds"] / 3600), 2),
+            "avg_bitrate_kbps": safe_int(r["avg_bitrate"]),
+        } for r in efficiency],
+    }
+
+
 def get_archive_stats():
     with sqlite3.connect(DB_FILE) as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
 
-        # --- Counts --- #
-        counts = {
-            "movies": safe_int(cur.execute("SELECT COUNT(*) FROM media WHERE type='movie'").fetchone()[0]),
-            "series": safe_int(cur.execute("SELECT COUNT(*) FROM media WHERE type='tv'").fetchone()[0]),
-            "episodes": safe_int(cur.execute("SELECT SUM(episode_count) FROM media WHERE type='tv'").fetchone()[0]),
-        }
-
-        # --- Sizes (already stored in bytes for media) --- #
-        sizes = {
-            "movies": safe_int(cur.execute("SELECT SUM(total_size) FROM media WHERE type='movie'").fetchone()[0]),
-            "series": safe_int(cur.execute("SELECT SUM(total_size) FROM media WHERE type='tv'").fetchone()[0]),
-        }
+        # Counts, sizes, distribution, utilization and trends in one
+        # vectorized pass over the in-memory columns (services/analytics.py)
+        dash = get_store().dashboard()
+        counts = dash["counts"]
+        sizes = dict(dash["sizes"])
         sizes["total"] = sizes["movies"] + sizes["series"]
 
         # --- Drives --- #
@@ -72,47 +126,28 @@ def get_archive_stats():
         capacity = sum(parse_size(row["total_size"]) for row in drive_rows)
 
         drives = {
-            "count": safe_int(cur.execute("SELECT COUNT(*) FROM drives").fetchone()[0]),
+            "count": len(drive_rows),
             "capacity": capacity,
         }
 
         # Distribution
-        movies_per_drive = cur.execute("""
-            SELECT d.path AS drive, COUNT(m.id) AS count
-            FROM media m
-            JOIN drives d ON m.drive_id = d.id
-            WHERE m.type='movie'
-            GROUP BY d.id
-        """).fetchall()
-
-        series_per_drive = cur.execute("""
-            SELECT d.path AS drive, COUNT(m.id) AS count
-            FROM media m
-            JOIN drives d ON m.drive_id = d.id
-            WHERE m.type='tv'
-            GROUP BY d.id
-        """).fetchall()
-
-        breakdown_by_year = cur.execute("""
-            SELECT release_year, COUNT(*) AS count
-            FROM media
-            WHERE release_year IS NOT NULL
-            GROUP BY release_year
-            ORDER BY release_year DESC
-            LIMIT 10
-        """).fetchall()
-
-        top5_largest = cur.execute("""
-            SELECT title, total_size
-            FROM media
-            ORDER BY total_size DESC
-            LIMIT 5
-        """).fetchall()
+        movies_per_drive = [{"drive": drive, "count": count} for drive, count in dash["movies_per_drive"]]
+        series_per_drive = [{"drive": drive, "count": count} for drive, count in dash["series_per_drive"]]
+        breakdown_by_year = [{"release_year": year, "count": count} for year, count in dash["breakdown_by_year"]]
+
+        # top_rowids are media rowids, i.e. media.pk (an INTEGER PRIMARY KEY
+        # aliases rowid, so "SELECT rowid" would come back named pk)
+        titles = {row["pk"]: row for row in cur.execute(f"""
+            SELECT pk, title, total_size FROM media
+            WHERE pk IN ({",".join("?" * len(dash["top_rowids"]))})
+        """, dash["top_rowids"]).fetchall()}
+        top5_largest = [titles[r] for r in dash["top_rowids"] if r in titles]
 
         # Redundancy
         redundant = cur.execute("""
             SELECT title, COUNT(DISTINCT drive_id) AS copies
             FROM media
+            WHERE deleted_at IS NULL
             GROUP BY title
         """).fetchall()
 
@@ -126,25 +161,45 @@ def get_archive_stats():
             "percent_protected": round((backed_up / total_items * 100), 2) if total_items else 0,
         }
 
-        # Utilization
-        per_drive = cur.execute("""
-            SELECT d.path AS drive,
-                   d.total_size AS total,
-                   COALESCE(SUM(m.total_size), 0) AS used
-            FROM drives d
-            LEFT JOIN media m ON m.drive_id = d.id
-            GROUP BY d.id
+        # Verified redundancy: identical content (fingerprint) on another drive
+        fingerprinted = cur.execute("""
+            SELECT COUNT(fingerprint) AS done, COUNT(*) AS total FROM files
+            WHERE deleted_at IS NULL
+        """).fetchone()
+        verified = cur.execute("""
+            WITH fp AS (
+                SELECT fingerprint, COUNT(DISTINCT drive_id) AS drives
+                FROM files WHERE fingerprint IS NOT NULL AND deleted_at IS NULL
+                GROUP BY fingerprint
+            )
+            SELECT f.media_pk, COUNT(*) AS files, SUM(fp.drives > 1) AS protected
+            FROM files f JOIN fp ON fp.fingerprint = f.fingerprint
+            WHERE f.deleted_at IS NULL
+            GROUP BY f.media_pk
+        """).fetchall()
+        verified_backed_up = sum(1 for r in verified if r["protected"] == r["files"])
+
+        # Same content more than once on one drive (wasted space)
+        duplicate_files = cur.execute("""
+            SELECT f.fingerprint, f.drive_id, COUNT(*) AS copies, MAX(f.size) AS size,
+                   GROUP_CONCAT(d.path || '/' || f.filename, char(10)) AS paths
+            FROM files f
+            JOIN directories d ON d.pk = f.dir_pk
+            WHERE f.fingerprint IS NOT NULL AND f.deleted_at IS NULL
+            GROUP BY f.fingerprint, f.drive_id
+            HAVING copies > 1
+            ORDER BY (copies - 1) * size DESC
         """).fetchall()
 
+        # Utilization
         utilization = []
-        for row in per_drive:
-            total_bytes = parse_size(row["total"])
-            used_bytes = safe_int(row["used"])
+        for drive, total, used in dash["used_per_drive"]:
+            total_bytes = parse_size(total)
             utilization.append({
-                "drive": row["drive"],
+                "drive": drive,
                 "total": total_bytes,
-                "used": used_bytes,
-                "percent": round((used_bytes / total_bytes) * 100, 2) if total_bytes else 0,
+                "used": used,
+                "percent": round((used / total_bytes) * 100, 2) if total_bytes else 0,
             })
 
         largest_drive = max(utilization, key=lambda r: r["total"], default=None)
@@ -153,25 +208,32 @@ def get_archive_stats():
         # Health
         stale_files = cur.execute("""
             SELECT id, title FROM media
-            WHERE total_size=0 OR total_size IS NULL
+            WHERE (total_size=0 OR total_size IS NULL) AND deleted_at IS NULL
         """).fetchall()
 
         duplicates = cur.execute("""
             SELECT tmdb_id, COUNT(*) AS cnt
             FROM media
-            WHERE tmdb_id IS NOT NULL
+            WHERE tmdb_id IS NOT NULL AND deleted_at IS NULL
             GROUP BY tmdb_id
             HAVING cnt > 1
         """).fetchall()
 
-        # Trends
-        avg_movie_size = cur.execute(
-            "SELECT AVG(total_size) FROM media WHERE type='movie'"
-        ).fetchone()[0] or 0
+        # Soft-deleted rows waiting for compaction, and unmounted drives
+        tombstones = tombstone_counts(conn)
+        offline_drives = cur.execute("""
+            SELECT path, offline_since FROM drives WHERE online = 0 ORDER BY path
+        """).fetchall()
 
-        avg_episode_size = cur.execute(
-            "SELECT AVG(total_size) FROM media WHERE type='tv'"
-        ).fetchone()[0] or 0
+        # Full-content verification results (run_checksum_verification)
+        checksums = checksum_health(conn)
+
+        # Resolution/codec breakdowns from container headers
+        technical = technical_breakdown(cur)
+
+        # Trends
+        avg_movie_size = dash["avg_movie_size"]
+        avg_episode_size = dash["avg_episode_size"]
 
     # conn auto-closes here
 
@@ -190,6 +252,11 @@ def get_archive_stats():
             "archive_only_count": redundancy["unprotected"],
             "active_only_count": 0,  # TODO: check connector match
             "coverage": f"{redundancy['percent_protected']}%",
+            # by fingerprint (run_file_fingerprints) rather than by title
+            "verified_backed_up_count": verified_backed_up,
+            "verified_unprotected_count": len(verified) - verified_backed_up,
+            "fingerprinted_files": safe_int(fingerprinted["done"]),
+            "unfingerprinted_files": safe_int(fingerprinted["total"]) - safe_int(fingerprinted["done"]),
         },
         "utilization": {
             "per_drive": utilization,
@@ -197,22 +264,36 @@ def get_archive_stats():
             "smallest_drive": smallest_drive,
         },
         "trends": {
-            "added": {
-                "last_7_days": 0,
-                "last_30_days": 0,
-                "last_90_days": 0,
-            },
+            "added": dash["added"],  # files by mtime
             "avg_movie_size": avg_movie_size,
             "avg_episode_size": avg_episode_size,
         },
+        "technical": technical,
         "health": {
             "stale": len(stale_files),
             "duplicates": [dict(row) for row in duplicates],
-            "orphaned": 0,
+            "duplicate_files": [{
+                "drive_id": row["drive_id"],
+                "copies": row["copies"],
+                "size": row["size"],
+                "paths": row["paths"].split("\n"),
+            } for row in duplicate_files[:50]],
+            "duplicate_bytes": sum((row["copies"] - 1) * safe_int(row["size"]) for row in duplicate_files),
+            "orphaned": tombstones["media"],
+            "tombstones": tombstones,
+            "offline_drives": [dict(row) for row in offline_drives],
+            "checksums": checksums,
         },
     }
 
 
+# Parsed queue/diskspace per connector, keyed by the snapshot they came from.
+# connector_latest.stats_id only changes when the stats job inserts a new
+# snapshot, so between runs the dashboard never re-inflates/re-parses them.
+_PAYLOAD_CACHE = {}  # connector_id -> (stats_id, queue, diskspace)
+_PAYLOAD_LOCK = threading.Lock()
+
+
 def get_connector_stats():
     with sqlite3.connect(DB_FILE) as conn:
         conn.row_factory = sqlite3.Row
@@ -220,45 +301,98 @@ def get_connector_stats():
 
         logging.info(f"[{datetime.now()}] 🔍 Fetching latest connector stats...")
 
-        cur.execute("""
-            SELECT cs.connector_id, cs.status, cs.version, cs.error,
-                   cs.queue, cs.diskspace, cs.checked_at,
-                   c.app_type
-            FROM connector_stats cs
-            JOIN connectors c ON cs.connector_id = c.id
-            INNER JOIN (
-                SELECT connector_id, MAX(checked_at) AS latest
-                FROM connector_stats
-                GROUP BY connector_id
-            ) latest_cs
-            ON cs.connector_id = latest_cs.connector_id
-            AND cs.checked_at = latest_cs.latest
-        """)
-        rows = cur.fetchall()
+        # connector_latest is maintained by trigger on connector_stats insert,
+        # connector_summary by the sync + stats jobs.
+        rows = cur.execute("""
+            SELECT cl.connector_id, cl.stats_id, cl.status, cl.version, cl.error,
+                   cl.checked_at, c.app_type,
+                   s.media_count, s.queue_count, s.disk_total, s.disk_free
+            FROM connector_latest cl
+            JOIN connectors c ON cl.connector_id = c.id
+            LEFT JOIN connector_summary s ON s.connector_id = cl.connector_id
+        """).fetchall()
+
+        with _PAYLOAD_LOCK:
+            stale = [
+                row["connector_id"] for row in rows
+                if _PAYLOAD_CACHE.get(row["connector_id"], (None,))[0] != row["stats_id"]
+            ]
+        CACHE_REQUESTS.inc(len(rows) - len(stale), cache="connector_payload", result="hit")
+        CACHE_REQUESTS.inc(len(stale), cache="connector_payload", result="miss")
+        if stale:
+            placeholders = ",".join("?" * len(stale))
+            payloads = cur.execute(f"""
+                SELECT connector_id, stats_id, queue, diskspace
+                FROM connector_latest
+                WHERE connector_id IN ({placeholders})
+            """, stale).fetchall()
+            with _PAYLOAD_LOCK:
+                for p in payloads:
+                    _PAYLOAD_CACHE[p["connector_id"]] = (
+                        p["stats_id"],
+                        safe_json(p["queue"], {"records": []}),
+                        safe_json(p["diskspace"], []),
+                    )
 
         connectors = []
-        for row in rows:
-            cur.execute("SELECT COUNT(*) FROM connector_media WHERE connector_id = ?", (row["connector_id"],))
-            media_count = safe_int(cur.fetchone()[0])
-
-            connector_data = {
-                "id": row["connector_id"],
-                "app_type": row["app_type"],
-                "status": row["status"],
-                "version": row["version"],
-                "error": row["error"],
-                "media_count": media_count,
-                "queue": safe_json(row["queue"], {"records": []}),
-                "diskspace": safe_json(row["diskspace"], []),
-                "last_check": row["checked_at"],
-            }
-            connectors.append(connector_data)
+        with _PAYLOAD_LOCK:
+            for row in rows:
+                _, queue, diskspace = _PAYLOAD_CACHE.get(row["connector_id"], (None, {"records": []}, []))
+                connectors.append({
+                    "id": row["connector_id"],
+                    "app_type": row["app_type"],
+                    "status": row["status"],
+                    "version": row["version"],
+                    "error": row["error"],
+                    "media_count": safe_int(row["media_count"]),
+                    "queue_count": safe_int(row["queue_count"]),
+                    "disk_total": safe_int(row["disk_total"]),
+                    "disk_free": safe_int(row["disk_free"]),
+                    "queue": queue,
+                    "diskspace": diskspace,
+                    "last_check": row["checked_at"],
+                })
 
         logging.info(f"[{datetime.now()}] 🎯 Total connectors fetched: {len(connectors)}")
 
     return connectors
 
 
+HISTORY_TABLES = {
+    "hourly": "connector_stats_hourly",
+    "daily": "connector_stats_daily",
+}
+
+def get_connector_history(connector_id, resolution="hourly", limit=500):
+    """Downsampled connector history (see run_connector_stats_retention)."""
+    table = HISTORY_TABLES.get(resolution)
+    if not table:
+        raise ValueError(f"Unknown resolution: {resolution}")
+
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f"""
+            SELECT bucket, samples, ok_samples, queue_sum, queue_max,
+                   disk_total_max, disk_free_sum, disk_free_min, last_version
+            FROM {table}
+            WHERE connector_id = ?
+            ORDER BY bucket DESC
+            LIMIT ?
+        """, (connector_id, limit)).fetchall()
+
+    return [{
+        "bucket": row["bucket"],
+        "samples": row["samples"],
+        "uptime": round(row["ok_samples"] / row["samples"] * 100, 2) if row["samples"] else 0,
+        "queue_avg": round(row["queue_sum"] / row["samples"], 2) if row["samples"] else 0,
+        "queue_max": row["queue_max"],
+        "disk_total": row["disk_total_max"],
+        "disk_free_avg": row["disk_free_sum"] // row["samples"] if row["samples"] else 0,
+        "disk_free_min": row["disk_free_min"],
+        "version": row["last_version"],
+    } for row in reversed(rows)]
+
+
 def get_stats():
     archive = get_archive_stats()
     connectors = get_connector_stats()
@@ -271,7 +405,7 @@ def get_stats():
 
         archive_titles = set([
             row["title"].strip().lower()
-            for row in cur.execute("SELECT title FROM media WHERE title IS NOT NULL").fetchall()
+            for row in cur.execute("SELECT title FROM media WHERE title IS NOT NULL AND deleted_at IS NULL").fetchall()
         ])
 
         active_titles = set([
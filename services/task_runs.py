@@ -0,0 +1,188 @@
+# services/task_runs.py
+"""
+Persistent task run history (task_runs table) and job instrumentation.
+
+Every scheduled/manual run goes through run_instrumented(), which records
+start/end time, duration, outcome and peak RSS. Jobs report their own
+work with count_items() / count_errors() from the thread running the job:
+
+    from services.task_runs import count_items, count_errors
+    count_items(len(rows))
+
+Peak RSS is sampled from the process running the job (the worker, or the
+web process in inline mode), so concurrent jobs share the same peak.
+
+Runs older than TASK_RUNS_RETENTION_DAYS (default 30) are deleted when the
+same task starts a new run, so frequent jobs don't grow the table forever.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import psutil
+
+from services.indexer import DB_FILE
+
+RSS_SAMPLE_SECONDS = 0.5
+TASK_RUNS_RETENTION_DAYS = int(os.getenv("TASK_RUNS_RETENTION_DAYS", "30"))
+
+_current = threading.local()
+
+
+def ensure_task_runs_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS task_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            name TEXT,
+            job_id INTEGER,
+            source TEXT,
+            status TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            duration_ms INTEGER,
+            items INTEGER DEFAULT 0,
+            errors INTEGER DEFAULT 0,
+            peak_rss INTEGER,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_task_runs_task ON task_runs(task_id, started_at)")
+    conn.commit()
+
+
+def count_items(n=1):
+    """Add n processed items to the run active in this thread (no-op outside a run)."""
+    run = getattr(_current, "run", None)
+    if run is not None:
+        run["items"] += n
+
+
+def count_errors(n=1):
+    """Add n per-item failures to the run active in this thread."""
+    run = getattr(_current, "run", None)
+    if run is not None:
+        run["errors"] += n
+
+
+def _rss_sampler(run, stop):
+    proc = psutil.Process()
+    while True:
+        try:
+            run["peak_rss"] = max(run["peak_rss"], proc.memory_info().rss)
+        except Exception:
+            pass
+        if stop.wait(RSS_SAMPLE_SECONDS):
+            return
+
+
+def prune_task_runs(conn, task_id, retention_days=TASK_RUNS_RETENTION_DAYS):
+    """Delete runs of task_id that started more than retention_days ago."""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    return conn.execute("DELETE FROM task_runs WHERE task_id=? AND started_at < ?",
+                        (task_id, cutoff)).rowcount
+
+
+def run_instrumented(task_id, name, func, job_id=None, source="schedule"):
+    """Run func() and record it in task_runs. Exceptions are recorded, then re-raised."""
+    run = {"items": 0, "errors": 0, "peak_rss": 0}
+    started_at = datetime.now().isoformat()
+    started = time.monotonic()
+
+    with sqlite3.connect(DB_FILE, timeout=30) as conn:
+        ensure_task_runs_schema(conn)
+        run_id = conn.execute("""
+            INSERT INTO task_runs (task_id, name, job_id, source, status, started_at)
+            VALUES (?, ?, ?, ?, 'running', ?)
+        """, (task_id, name, job_id, source, started_at)).lastrowid
+        prune_task_runs(conn, task_id)
+    conn.close()
+
+    stop = threading.Event()
+    threading.Thread(target=_rss_sampler, args=(run, stop), daemon=True).start()
+    _current.run = run
+
+    status, error = "ok", None
+    try:
+        return func()
+    except Exception as e:
+        status, error = "error", str(e)
+        raise
+    finally:
+        _current.run = None
+        stop.set()
+        try:
+            run["peak_rss"] = max(run["peak_rss"], psutil.Process().memory_info().rss)
+        except Exception:
+            pass
+        duration_ms = int((time.monotonic() - started) * 1000)
+        with sqlite3.connect(DB_FILE, timeout=30) as conn:
+            conn.execute("""
+                UPDATE task_runs
+                SET status=?, finished_at=?, duration_ms=?, items=?, errors=?, peak_rss=?, error=?
+                WHERE id=?
+            """, (status, datetime.now().isoformat(), duration_ms, run["items"], run["errors"],
+                  run["peak_rss"], error, run_id))
+        conn.close()
+        print(f"[{datetime.now()}] 📈 {name}: {status} in {duration_ms} ms, "
+              f"{run['items']} items, {run['errors']} errors, peak RSS {run['peak_rss'] // (1024 * 1024)} MB")
+
+
+def last_runs():
+    """Latest finished run per task, to restore TASKS after a restart."""
+    with sqlite3.connect(DB_FILE) as conn:
+        ensure_task_runs_schema(conn)
+        rows = conn.execute("""
+            SELECT r.task_id, r.status, r.started_at, r.duration_ms
+            FROM task_runs r
+            JOIN (
+                SELECT task_id, MAX(id) AS id FROM task_runs
+                WHERE finished_at IS NOT NULL GROUP BY task_id
+            ) last ON last.id = r.id
+        """).fetchall()
+    conn.close()
+    return {task_id: {"status": status, "started_at": started_at, "duration_ms": duration_ms}
+            for task_id, status, started_at, duration_ms in rows}
+
+
+def _trend(values):
+    if len(values) < 4:
+        return None
+    half = len(values) // 2
+    old, new = values[:half], values[half:]
+    old_avg = sum(old) / len(old)
+    return round((sum(new) / len(new)) / old_avg, 2) if old_avg else None
+
+
+def get_task_history(task_id, limit=100):
+    with sqlite3.connect(DB_FILE) as conn:
+        conn.row_factory = sqlite3.Row
+        ensure_task_runs_schema(conn)
+        rows = conn.execute("""
+            SELECT id, job_id, source, status, started_at, finished_at,
+                   duration_ms, items, errors, peak_rss, error
+            FROM task_runs
+            WHERE task_id=?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (task_id, limit)).fetchall()
+    conn.close()
+
+    runs = [dict(r) for r in reversed(rows)]
+    finished = [r for r in runs if r["duration_ms"] is not None]
+    durations = [r["duration_ms"] for r in finished]
+    per_item = [r["duration_ms"] / r["items"] for r in finished if r["items"]]
+
+    summary = {
+        "runs": len(runs),
+        "failed": sum(1 for r in runs if r["status"] == "error"),
+        "avg_duration_ms": int(sum(durations) / len(durations)) if durations else None,
+        "max_duration_ms": max(durations) if durations else None,
+        "avg_items": round(sum(r["items"] for r in finished) / len(finished), 1) if finished else None,
+        "max_peak_rss": max((r["peak_rss"] or 0 for r in finished), default=None),
+        # ms per item, newest half vs oldest half: > 1 means it is getting slower
+        "ms_per_item_trend": _trend(per_item),
+    }
+    return {"task_id": task_id, "summary": summary, "runs": runs}
@@ -1,7 +1,20 @@
-from datetime import datetime
-import sqlite3, os, requests, hashlib, json, time
+from datetime import datetime, timedelta
+import sqlite3, os, requests, hashlib, json, time, threading, functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from services.indexer import re_enrich_all_metadata, DB_FILE
-from services.utils import normalize_poster
+from services.utils import normalize_poster, TMDB_API_URL, TMDB_IMAGE_URL
+from services.compress import pack_json, unpack_json
+from services.events import BUS
+from services.job_queue import TASK_DISPATCH, enqueue_job
+from services.task_runs import run_instrumented, count_items, count_errors
+from services.tombstones import (
+    TOMBSTONE_RETENTION_DAYS, COMPACTION_MIN_FREE_PCT, tombstone_orphans, purge_tombstones, free_page_pct,
+)
+from services.metrics import DB_LOCK_RETRIES, CACHE_REQUESTS
+from services.fingerprint import ensure_fingerprint_schema, fingerprint_job
+from services.checksum import run_checksum_verification
+from services.probe import ensure_probe_schema, probe_job
 from modules.connector import load_connectors  
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -16,7 +29,6 @@ SONARR_KEY = os.getenv("SONARR_KEY", "your_sonarr_api_key")
 RADARR_URL = os.getenv("RADARR_URL", "http://192.168.1.48:7878")
 RADARR_KEY = os.getenv("RADARR_KEY", "your_radarr_api_key")
 FALLBACK_POSTER = "/static/posters/fallback.jpg"
-import queue
 
 
 def is_abs_url(url: str) -> bool:
@@ -27,13 +39,10 @@ def is_abs_url(url: str) -> bool:
     return parsed.scheme in ("http", "https")
 # --- Global Task State ---
 TASKS = {}
-TASK_EVENTS = queue.Queue()
 
 def push_task_event(event_type, data):
-    TASK_EVENTS.put({
-        "event": event_type,
-        "data": data
-    })
+    # Fan out to every /api/v3/tasks/stream client (see services/events.py)
+    BUS.publish("tasks", event_type, data)
 
 # Example: your existing task definitions
 TASK_DEFINITIONS = [
@@ -54,6 +63,20 @@ def safe_execute(cur, sql, params=(), retries=5, delay=2):
             return
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and attempt < retries - 1:
+                DB_LOCK_RETRIES.inc(op="execute")
+                print(f"[{datetime.now()}] ⚠️ DB locked, retrying in {delay}s...")
+                time.sleep(delay)
+            else:
+                raise
+
+def safe_executemany(cur, sql, rows, retries=5, delay=2):
+    for attempt in range(retries):
+        try:
+            cur.executemany(sql, rows)
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e).lower() and attempt < retries - 1:
+                DB_LOCK_RETRIES.inc(op="executemany")
                 print(f"[{datetime.now()}] ⚠️ DB locked, retrying in {delay}s...")
                 time.sleep(delay)
             else:
@@ -90,20 +113,20 @@ def download_and_cache_poster(source_url: str, filename: str) -> str:
 # ---- TMDB helpers -----------------------------------------------------------
 
 def tmdb_get(kind: str, tmdb_id: int):
-    url = f"https://api.themoviedb.org/3/{kind}/{tmdb_id}"
+    url = f"{TMDB_API_URL}/{kind}/{tmdb_id}"
     r = requests.get(url, params={"api_key": TMDB_API_KEY, "language": "en-US"}, timeout=10)
     r.raise_for_status()
     return r.json()
 
 def tmdb_find_by_imdb(imdb_id: str):
-    url = f"https://api.themoviedb.org/3/find/{imdb_id}"
+    url = f"{TMDB_API_URL}/find/{imdb_id}"
     r = requests.get(url, params={"api_key": TMDB_API_KEY, "language": "en-US", "external_source": "imdb_id"}, timeout=10)
     r.raise_for_status()
     return r.json()
 
 def build_tmdb_poster_url(poster_path: str | None) -> str | None:
     if poster_path:
-        return f"https://image.tmdb.org/t/p/w500{poster_path}"
+        return f"{TMDB_IMAGE_URL}/w500{poster_path}"
     return None
 
 def fetch_tmdb_poster_any(tmdb_id: int, media_type: str | None) -> str | None:
@@ -408,15 +431,20 @@ def run_poster_cache(force=True):
             title      = r["title"] or ""
 
             print(f"[{datetime.now()}] ▶ Processing metadata: {title} ({media_id})")
+            count_items()
 
             # Poster
             final_poster = FALLBACK_POSTER
             if is_abs_url(poster_url):
                 fname = f"poster_{media_id}.jpg"
                 print(f"[{datetime.now()}]   🌐 Downloading poster from {poster_url}")
+                CACHE_REQUESTS.inc(cache="poster", result="miss")
                 final_poster = download_and_cache_poster(poster_url, fname)
+                if final_poster == FALLBACK_POSTER:
+                    count_errors()
             elif is_cached_poster(poster_url):
                 print(f"[{datetime.now()}]   ⏭ Poster already cached at {poster_url}")
+                CACHE_REQUESTS.inc(cache="poster", result="hit")
                 final_poster = poster_url
             else:
                 print(f"[{datetime.now()}]   ⚠️ No valid poster, using fallback")
@@ -454,14 +482,19 @@ def run_poster_cache(force=True):
             title      = r["title"] or ""
 
             print(f"[{datetime.now()}] ▶ Processing connector_media: {title} (id={cmid})")
+            count_items()
 
             final_poster = FALLBACK_POSTER
             if is_abs_url(poster_url):
                 fname = f"poster_cm_{cmid}.jpg"
                 print(f"[{datetime.now()}]   🌐 Downloading poster from {poster_url}")
+                CACHE_REQUESTS.inc(cache="poster", result="miss")
                 final_poster = download_and_cache_poster(poster_url, fname)
+                if final_poster == FALLBACK_POSTER:
+                    count_errors()
             elif is_cached_poster(poster_url):
                 print(f"[{datetime.now()}]   ⏭ Poster already cached at {poster_url}")
+                CACHE_REQUESTS.inc(cache="poster", result="hit")
                 final_poster = poster_url
             else:
                 print(f"[{datetime.now()}]   ⚠️ No valid poster, using fallback")
@@ -477,12 +510,6 @@ def run_poster_cache(force=True):
 
     print(f"[{datetime.now()}] ✅ Poster cache refresh complete")
 
-    
-def push_task_event(event_type, data):
-    TASK_EVENTS.put({
-        "event": event_type,
-        "data": data
-    })
 
 def cleanup_tmp_files():
     print(f"[{datetime.now()}] 🧹 Cleaning temporary files...")
@@ -492,18 +519,36 @@ def refresh_metadata():
 
 def daily_metadata():
     print(f"[{datetime.now()}] 🎬 Re-enriching metadata…")
-    re_enrich_all_metadata()
+    stats = re_enrich_all_metadata()
+    count_items(stats["checked"])
+    count_errors(stats["failed"])
+
+
 
+def task_id_for(task):
+    # stable id from the task name (shared by the web app and worker.py)
+    return hashlib.sha1(task["name"].encode()).hexdigest()[:8]
 
 
 def register_task(task, scheduler, TASKS):
-    # generate a stable id from the task name
-    task_id = hashlib.sha1(task["name"].encode()).hexdigest()[:8]
+    task_id = task_id_for(task)
+
+    # Never let a slow run overlap the next one; collapse missed runs into one.
+    job_options = {"max_instances": 1, "coalesce": True, **task.get("job_options", {})}
+
+    if TASK_DISPATCH == "worker":
+        # The schedule only enqueues; worker.py does the actual work
+        func, args = enqueue_job, [task_id, task["name"], "schedule"]
+    else:
+        func, args = functools.partial(run_instrumented, task_id, task["name"], task["func"]), []
 
     job = scheduler.add_job(
-        task["func"],
+        func,
         task["trigger"],
+        args=args,
         id=task_id,
+        name=task["name"],
+        **job_options,
         **task["kwargs"]
     )
 
@@ -548,8 +593,140 @@ def ensure_connector_schema(conn):
             FOREIGN KEY (connector_id) REFERENCES connectors(id)
         )
     """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_connector_stats_checked ON connector_stats(connector_id, checked_at)")
+
+    # Latest snapshot per connector, kept current by trigger so the dashboard
+    # never has to scan the whole time series.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS connector_latest (
+            connector_id TEXT PRIMARY KEY,
+            stats_id INTEGER,
+            checked_at TEXT NOT NULL,
+            status TEXT,
+            version TEXT,
+            error TEXT,
+            queue TEXT,
+            diskspace TEXT,
+            FOREIGN KEY (connector_id) REFERENCES connectors(id)
+        )
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_connector_stats_latest
+        AFTER INSERT ON connector_stats
+        BEGIN
+            INSERT INTO connector_latest (connector_id, stats_id, checked_at, status, version, error, queue, diskspace)
+            VALUES (NEW.connector_id, NEW.id, NEW.checked_at, NEW.status, NEW.version, NEW.error, NEW.queue, NEW.diskspace)
+            ON CONFLICT(connector_id) DO UPDATE SET
+              stats_id=excluded.stats_id,
+              checked_at=excluded.checked_at,
+              status=excluded.status,
+              version=excluded.version,
+              error=excluded.error,
+              queue=excluded.queue,
+              diskspace=excluded.diskspace
+            WHERE excluded.checked_at >= connector_latest.checked_at;
+        END
+    """)
+    if not cur.execute("SELECT 1 FROM connector_latest LIMIT 1").fetchone():
+        cur.execute("""
+            INSERT OR IGNORE INTO connector_latest
+            (connector_id, stats_id, checked_at, status, version, error, queue, diskspace)
+            SELECT connector_id, id, checked_at, status, version, error, queue, diskspace
+            FROM connector_stats
+            WHERE id IN (SELECT MAX(id) FROM connector_stats GROUP BY connector_id)
+        """)
+
+    # Per-connector rollup served to the dashboard without touching
+    # connector_media or the JSON payloads (see refresh_connector_summary).
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS connector_summary (
+            connector_id TEXT PRIMARY KEY,
+            media_count INTEGER DEFAULT 0,
+            queue_count INTEGER DEFAULT 0,
+            disk_total INTEGER DEFAULT 0,
+            disk_free INTEGER DEFAULT 0,
+            updated_at TEXT,
+            FOREIGN KEY (connector_id) REFERENCES connectors(id)
+        )
+    """)
+    if not cur.execute("SELECT 1 FROM connector_summary LIMIT 1").fetchone():
+        for cid, queue, diskspace in cur.execute(
+            "SELECT connector_id, queue, diskspace FROM connector_latest"
+        ).fetchall():
+            queue_count, disk_total, disk_free = snapshot_metrics(queue, diskspace)
+            cur.execute("""
+                INSERT OR IGNORE INTO connector_summary
+                (connector_id, queue_count, disk_total, disk_free, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (cid, queue_count, disk_total, disk_free, datetime.utcnow().isoformat()))
+        if cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='connector_media'"
+        ).fetchone():
+            refresh_connector_summary(cur)
+
+    # Downsampled history. Sums (not averages) are stored so buckets can be merged.
+    for table in ("connector_stats_hourly", "connector_stats_daily"):
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                connector_id TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                samples INTEGER DEFAULT 0,
+                ok_samples INTEGER DEFAULT 0,
+                queue_sum INTEGER DEFAULT 0,
+                queue_max INTEGER DEFAULT 0,
+                disk_total_max INTEGER DEFAULT 0,
+                disk_free_sum INTEGER DEFAULT 0,
+                disk_free_min INTEGER,
+                last_version TEXT,
+                PRIMARY KEY (connector_id, bucket)
+            )
+        """)
     conn.commit()
 
+def refresh_connector_summary(cur, stats_results=None):
+    """
+    Update connector_summary.
+    - media_count for every connector, from one grouped COUNT over connector_media
+    - queue/disk totals for the connectors in stats_results
+      ({connector_id: stats dict as returned by fetch_stats}), if given
+    """
+    now = datetime.utcnow().isoformat()
+
+    counts = dict(cur.execute(
+        "SELECT connector_id, COUNT(*) FROM connector_media GROUP BY connector_id"
+    ).fetchall())
+    cids = [row[0] for row in cur.execute("SELECT id FROM connectors").fetchall()]
+    safe_executemany(cur, """
+        INSERT INTO connector_summary (connector_id, media_count, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(connector_id) DO UPDATE SET
+          media_count=excluded.media_count,
+          updated_at=excluded.updated_at
+    """, [(cid, counts.get(cid, 0), now) for cid in set(cids) | set(counts)])
+
+    if stats_results:
+        rows = []
+        for cid, stats in stats_results.items():
+            queue = stats.get("queue") or {}
+            records = queue.get("records") if isinstance(queue, dict) else None
+            volumes = [v for v in (stats.get("diskspace") or []) if isinstance(v, dict)]
+            rows.append((
+                cid,
+                len(records) if isinstance(records, list) else 0,
+                sum(v.get("totalSpace") or 0 for v in volumes),
+                sum(v.get("freeSpace") or 0 for v in volumes),
+                now,
+            ))
+        safe_executemany(cur, """
+            INSERT INTO connector_summary (connector_id, queue_count, disk_total, disk_free, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(connector_id) DO UPDATE SET
+              queue_count=excluded.queue_count,
+              disk_total=excluded.disk_total,
+              disk_free=excluded.disk_free,
+              updated_at=excluded.updated_at
+        """, rows)
+
 def ensure_media_schema(conn):
     cur = conn.cursor()
     cur.execute("""
@@ -569,6 +746,7 @@ def ensure_media_schema(conn):
             remote_id TEXT,
             title_slug TEXT,
             poster_url TEXT,
+            content_hash TEXT,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (connector_id) REFERENCES connectors(id),
             UNIQUE(connector_id, external_id) ON CONFLICT REPLACE
@@ -582,6 +760,7 @@ def ensure_media_schema(conn):
         "remote_id": "TEXT",
         "title_slug": "TEXT",
         "poster_url": "TEXT",
+        "content_hash": "TEXT",
         "created_at": "TEXT DEFAULT CURRENT_TIMESTAMP"
     }
 
@@ -596,6 +775,11 @@ def ensure_media_schema(conn):
     conn.commit()
 
 def fetch_media(app_type, base_url, api_key):
+    """
+    Fetch the full movie/series list from Radarr/Sonarr.
+    Returns a list, or None if the request failed (so callers don't mistake
+    an outage for an empty library and wipe connector_media).
+    """
     headers = {"X-Api-Key": api_key}
     url = None
     if app_type.lower() == "radarr":
@@ -604,20 +788,122 @@ def fetch_media(app_type, base_url, api_key):
         url = f"{base_url.rstrip('/')}/api/v3/series"
     else:
         print(f"[{datetime.now()}] ⚠️ Unknown app type {app_type}, skipping media fetch")
-        return []
+        return None
 
     try:
-        r = requests.get(url, headers=headers, timeout=10)
+        r = requests.get(url, headers=headers, timeout=30)
         r.raise_for_status()
         data = r.json()
         print(f"[{datetime.now()}] 📥 {app_type} returned {len(data)} media items")
         return data
     except Exception as e:
         print(f"[{datetime.now()}] ❌ Failed fetching media from {url}: {e}")
-        return []
+        return None
+
+# Fields of a Radarr/Sonarr item that matter to us. Anything else (e.g. ratings
+# drift, refresh timestamps) is ignored so it doesn't churn the DB every hour.
+# raw_json is only rewritten when one of these changes.
+SYNC_HASH_FIELDS = (
+    "id", "title", "titleSlug", "year", "tmdbId", "imdbId", "tvdbId",
+    "monitored", "added", "path", "status", "hasFile", "sizeOnDisk",
+    "statistics", "images",
+)
+
+def media_item_hash(m):
+    relevant = {k: m.get(k) for k in SYNC_HASH_FIELDS}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+def media_item_row(cid, app_type, m, content_hash):
+    return (
+        cid,
+        "movie" if app_type.lower() == "radarr" else "series",
+        m.get("id"),
+        m.get("title") or m.get("titleSlug"),
+        m.get("year") or None,
+        m.get("tmdbId") or None,
+        m.get("imdbId") or None,
+        m.get("tvdbId") or None,
+        int(m.get("monitored", False)),
+        m.get("added"),
+        pack_json(m),
+        m.get("id"),
+        m.get("titleSlug"),
+        content_hash,
+    )
 
-def run_connector_media_sync():
+def sync_connector_media(cur, cid, app_type, media_items, full=False):
+    """
+    Delta-sync one connector's items into connector_media.
+    Unchanged rows (same content_hash) are skipped, changed/new rows are
+    written with one executemany, stale rows removed with one DELETE.
+    Returns counts: added, changed, unchanged, removed.
+    """
+    cur.execute("SELECT external_id, content_hash FROM connector_media WHERE connector_id=?", (cid,))
+    db_hashes = {row[0]: row[1] for row in cur.fetchall()}  # external_id → content_hash
+
+    counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    upserts = []
+    seen_ids = set()
+
+    for m in media_items:
+        external_id = m.get("id")
+        if external_id is None or external_id in seen_ids:
+            continue
+        seen_ids.add(external_id)
+
+        content_hash = media_item_hash(m)
+        if external_id not in db_hashes:
+            counts["added"] += 1
+        elif full or db_hashes[external_id] != content_hash:
+            counts["changed"] += 1
+        else:
+            counts["unchanged"] += 1
+            continue
+
+        upserts.append(media_item_row(cid, app_type, m, content_hash))
+
+    if upserts:
+        safe_executemany(cur, """
+            INSERT INTO connector_media
+            (connector_id, media_type, external_id, title, year, tmdb_id, imdb_id, tvdb_id,
+             monitored, added, raw_json, remote_id, title_slug, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(connector_id, external_id) DO UPDATE SET
+              title=excluded.title,
+              year=excluded.year,
+              tmdb_id=excluded.tmdb_id,
+              imdb_id=excluded.imdb_id,
+              tvdb_id=excluded.tvdb_id,
+              monitored=excluded.monitored,
+              added=excluded.added,
+              raw_json=excluded.raw_json,
+              remote_id=excluded.remote_id,
+              title_slug=excluded.title_slug,
+              content_hash=excluded.content_hash
+        """, upserts)
+
+    # Remove media missing from Radarr/Sonarr (set-based, no per-row deletes)
+    stale = len(set(db_hashes) - seen_ids)
+    if stale:
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS sync_seen (external_id INTEGER PRIMARY KEY)")
+        cur.execute("DELETE FROM sync_seen")
+        safe_executemany(cur, "INSERT INTO sync_seen (external_id) VALUES (?)", [(i,) for i in seen_ids])
+        safe_execute(cur, """
+            DELETE FROM connector_media
+            WHERE connector_id=? AND external_id NOT IN (SELECT external_id FROM sync_seen)
+        """, (cid,))
+        counts["removed"] = cur.rowcount
+        cur.execute("DELETE FROM sync_seen")
+
+    return counts
+
+def run_connector_media_sync(full=False):
+    """
+    Sync connector_media from every configured Radarr/Sonarr.
+    By default runs in delta mode (hash compare); full=True rewrites every row.
+    """
     connectors = load_connectors()
+    summary = {}
     with get_db_connection() as conn:
         ensure_connector_schema(conn)
         ensure_media_schema(conn)
@@ -628,132 +914,89 @@ def run_connector_media_sync():
             api_key = cfg.get("api_key")
             cid = uid_for(app_type, base_url)
 
-            print(f"\n[{datetime.now()}] 🔗 Syncing {app_type.upper()} ({base_url})")
+            print(f"\n[{datetime.now()}] 🔗 Syncing {app_type.upper()} ({base_url}) [{'full' if full else 'delta'}]")
 
             # Fetch from Radarr/Sonarr
             media_items = fetch_media(app_type, base_url, api_key)
-            seen_ids = set()
-            print(f"[{datetime.now()}] 📥 {app_type} returned {len(media_items)} items:")
-            for m in media_items:
-                print(f"   • {m.get('title')} ({m.get('id')})")
-
-            # Fetch current DB rows (tuple unpack)
-            cur.execute("SELECT external_id, title FROM connector_media WHERE connector_id=?", (cid,))
-            db_rows = cur.fetchall()
-            db_ids = {row[0]: row[1] for row in db_rows}  # external_id → title
-            print(f"[{datetime.now()}] 💾 DB currently has {len(db_rows)} items for {app_type}:")
-            for ext_id, title in db_ids.items():
-                print(f"   • {title} ({ext_id})")
-
-            # Insert/update new media
-            for m in media_items:
-                external_id = m.get("id")
-                title = m.get("title") or m.get("titleSlug")
-                year = m.get("year") or None
-                tmdb_id = m.get("tmdbId") or None
-                imdb_id = m.get("imdbId") or None
-                tvdb_id = m.get("tvdbId") or None
-                monitored = int(m.get("monitored", False))
-                added = m.get("added")
-                remote_id = m.get("id")
-                title_slug = m.get("titleSlug")
-
-                seen_ids.add(external_id)
-
-                if external_id not in db_ids:
-                    print(f"   ➕ Adding new: {title} ({external_id})")
-
-                safe_execute(cur, """
-                    INSERT INTO connector_media
-                    (connector_id, media_type, external_id, title, year, tmdb_id, imdb_id, tvdb_id,
-                     monitored, added, raw_json, remote_id, title_slug)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(connector_id, external_id) DO UPDATE SET
-                      title=excluded.title,
-                      year=excluded.year,
-                      tmdb_id=excluded.tmdb_id,
-                      imdb_id=excluded.imdb_id,
-                      tvdb_id=excluded.tvdb_id,
-                      monitored=excluded.monitored,
-                      added=excluded.added,
-                      raw_json=excluded.raw_json,
-                      remote_id=excluded.remote_id,
-                      title_slug=excluded.title_slug
-                """, (
-                    cid,
-                    "movie" if app_type.lower() == "radarr" else "series",
-                    external_id,
-                    title,
-                    year,
-                    tmdb_id,
-                    imdb_id,
-                    tvdb_id,
-                    monitored,
-                    added,
-                    json.dumps(m),
-                    remote_id,
-                    title_slug
-                ))
-
-            # Remove media missing from Radarr/Sonarr
-            removed_ids = [ext_id for ext_id in db_ids if ext_id not in seen_ids]
-            if removed_ids:
-                print(f"[{datetime.now()}] ❌ Removing {len(removed_ids)} items no longer in {app_type}:")
-                for ext_id in removed_ids:
-                    print(f"   • {db_ids[ext_id]} ({ext_id})")
-
-                placeholders = ",".join("?" * len(removed_ids))
-                cur.execute(
-                    f"DELETE FROM connector_media WHERE connector_id=? AND external_id IN ({placeholders})",
-                    (cid, *removed_ids)
-                )
+            if media_items is None:
+                print(f"[{datetime.now()}] ⚠️ Skipping {app_type}, media list unavailable")
+                count_errors()
+                continue
 
-            # Deduplicate
-            print(f"[{datetime.now()}] 🔍 Checking for duplicate entries...")
-            cur.execute("""
-                SELECT connector_id, external_id, COUNT(*) as cnt
-                FROM connector_media
-                GROUP BY connector_id, external_id
-                HAVING cnt > 1
-            """)
-            duplicates = cur.fetchall()
-            for row in duplicates:
-                connector_id, external_id, count = row
-                print(f"   ⚠️ Found {count} duplicates for {connector_id}:{external_id}")
-                safe_execute(cur, """
-                    DELETE FROM connector_media
-                    WHERE id NOT IN (
-                        SELECT MAX(id) FROM connector_media
-                        WHERE connector_id=? AND external_id=?
-                    ) AND connector_id=? AND external_id=?
-                """, (connector_id, external_id, connector_id, external_id))
+            cur.execute("BEGIN")
+            try:
+                counts = sync_connector_media(cur, cid, app_type, media_items, full=full)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
-        conn.commit()
+            summary[app_type] = counts
+            count_items(len(media_items))
+            print(
+                f"[{datetime.now()}] 📊 {app_type}: {counts['added']} added, {counts['changed']} changed, "
+                f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+            )
+
+        # Deduplicate (legacy rows from before the UNIQUE constraint)
+        cur.execute("""
+            SELECT connector_id, external_id, COUNT(*) as cnt
+            FROM connector_media
+            GROUP BY connector_id, external_id
+            HAVING cnt > 1
+        """)
+        duplicates = cur.fetchall()
+        for row in duplicates:
+            connector_id, external_id, count = row
+            print(f"   ⚠️ Found {count} duplicates for {connector_id}:{external_id}")
+            safe_execute(cur, """
+                DELETE FROM connector_media
+                WHERE id NOT IN (
+                    SELECT MAX(id) FROM connector_media
+                    WHERE connector_id=? AND external_id=?
+                ) AND connector_id=? AND external_id=?
+            """, (connector_id, external_id, connector_id, external_id))
+
+        refresh_connector_summary(cur)
 
     print(f"[{datetime.now()}] ✅ Connector media sync complete (with cleanup)")
+    return summary
 
 
 def uid_for(app_type, base_url):
     return hashlib.sha1(f"{app_type}:{base_url}".encode()).hexdigest()[:12]
 
-def fetch_stats(app_type, base_url, api_key):
+# Per-connector time budget (seconds) for one stats poll, and how many
+# connectors are polled at once.
+CONNECTOR_STATS_BUDGET = int(os.getenv("CONNECTOR_STATS_BUDGET", "60"))
+CONNECTOR_STATS_WORKERS = int(os.getenv("CONNECTOR_STATS_WORKERS", "8"))
+_connector_stats_lock = threading.Lock()
+
+def fetch_stats(app_type, base_url, api_key, budget=CONNECTOR_STATS_BUDGET):
+    """
+    Poll system status, queue and diskspace for one connector.
+    All requests and retry sleeps share one deadline of `budget` seconds.
+    """
     headers = {"X-Api-Key": api_key}
     stats = {"status": "success", "version": None, "error": None, "queue": None, "diskspace": None}
+    deadline = time.monotonic() + budget
 
     def safe_get(path, timeout=5, retries=2):
         url = f"{base_url.rstrip('/')}{path}"
         for attempt in range(retries):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"   ⏱ Budget of {budget}s exhausted, skipping {url}")
+                return None
             try:
-                r = requests.get(url, headers=headers, timeout=timeout)
+                r = requests.get(url, headers=headers, timeout=min(timeout, remaining))
                 print(f"[{datetime.now()}] 🌐 GET {url} -> {r.status_code}")
-                body_preview = r.text[:200].replace("\n", " ")
-                print(f"   ↪ Response preview: {body_preview}")
                 r.raise_for_status()
                 return r.json()
             except Exception as e:
                 if attempt < retries - 1:
                     print(f"   ⚠️ Retry {attempt+1} for {url} after error: {e}")
-                    time.sleep(2)
+                    time.sleep(max(0, min(2, deadline - time.monotonic())))
                 else:
                     print(f"   ❌ Failed fetching {url}: {e}")
                     return None
@@ -763,6 +1006,9 @@ def fetch_stats(app_type, base_url, api_key):
         sysdata = safe_get("/api/v3/system/status")
         if sysdata:
             stats["version"] = sysdata.get("version")
+        else:
+            stats["status"] = "error"
+            stats["error"] = "System status unavailable"
 
         # Queue
         stats["queue"] = safe_get("/api/v3/queue")
@@ -775,57 +1021,212 @@ def fetch_stats(app_type, base_url, api_key):
         stats["error"] = str(e)
 
     return stats
-    
+
+def poll_connector(app_type, cfg):
+    base_url = cfg.get("base_url")
+    api_key = cfg.get("api_key")
+    cid = uid_for(app_type, base_url)
+
+    print(f"[{datetime.now()}] 🔗 Polling connector: {app_type.upper()} ({base_url}) → {cid}")
+    try:
+        stats = fetch_stats(app_type, base_url, api_key)
+    except Exception as e:
+        stats = {"status": "error", "version": None, "error": str(e), "queue": None, "diskspace": None}
+
+    return cid, app_type, base_url, api_key, stats
+
 def run_connector_stats():
-    print(f"\n[{datetime.now()}] 🚀 Starting connector stats run...")
-    connectors = load_connectors()
-    if not connectors:
-        print(f"[{datetime.now()}] ⚠️ No connectors found in connector.yaml")
+    # Manual runs (tasks API) bypass APScheduler's max_instances, so guard here too.
+    if not _connector_stats_lock.acquire(blocking=False):
+        print(f"[{datetime.now()}] ⏭ Connector stats run already in progress, skipping")
         return
 
-    with get_db_connection() as conn:
-        ensure_connector_schema(conn)
-        cur = conn.cursor()
+    try:
+        print(f"\n[{datetime.now()}] 🚀 Starting connector stats run...")
+        connectors = load_connectors()
+        if not connectors:
+            print(f"[{datetime.now()}] ⚠️ No connectors found in connector.yaml")
+            return
 
-        for app_type, cfg in connectors.items():
-            base_url = cfg.get("base_url")
-            api_key = cfg.get("api_key")
-            cid = uid_for(app_type, base_url)
+        # Poll every connector concurrently; each has its own time budget.
+        workers = max(1, min(len(connectors), CONNECTOR_STATS_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="connector-stats") as pool:
+            results = list(pool.map(lambda item: poll_connector(*item), connectors.items()))
 
-            print(f"\n[{datetime.now()}] 🔗 Processing connector: {app_type.upper()} ({base_url})")
-            print(f"   → Generated UID: {cid}")
-            print(f"   → Using API key: {api_key[:6]}...{api_key[-4:]}")
+        checked_at = datetime.utcnow().isoformat()
 
-            safe_execute(cur, """
-                INSERT INTO connectors (id, app_type, base_url, api_key)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                  base_url=excluded.base_url,
-                  api_key=excluded.api_key
-            """, (cid, app_type, base_url, api_key))
-            print(f"   ✔ Connector record ensured in DB.")
-
-            stats = fetch_stats(app_type, base_url, api_key)
-            print(f"   → Stats fetched: {json.dumps(stats, indent=2)[:500]}...")
-
-            snapshot = (
-                cid,
-                datetime.utcnow().isoformat(),
-                stats["status"],
-                stats["version"],
-                stats["error"],
-                json.dumps(stats["queue"]) if stats["queue"] else "[]",
-                json.dumps(stats["diskspace"]) if stats["diskspace"] else "[]"
-            )
+        # Write all snapshots in one transaction.
+        with get_db_connection() as conn:
+            ensure_connector_schema(conn)
+            ensure_media_schema(conn)
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                safe_executemany(cur, """
+                    INSERT INTO connectors (id, app_type, base_url, api_key)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                      base_url=excluded.base_url,
+                      api_key=excluded.api_key
+                """, [(cid, app_type, base_url, api_key) for cid, app_type, base_url, api_key, _ in results])
+
+                safe_executemany(cur, """
+                    INSERT INTO connector_stats (connector_id, checked_at, status, version, error, queue, diskspace)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        cid,
+                        checked_at,
+                        stats["status"],
+                        stats["version"],
+                        stats["error"],
+                        pack_json(stats["queue"] or []),
+                        pack_json(stats["diskspace"] or [])
+                    )
+                    for cid, _, _, _, stats in results
+                ])
+                refresh_connector_summary(cur, {cid: stats for cid, _, _, _, stats in results})
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
-            safe_execute(cur, """
-                INSERT INTO connector_stats (connector_id, checked_at, status, version, error, queue, diskspace)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, snapshot)
+        for cid, app_type, _, _, stats in results:
+            print(f"   ✔ {app_type.upper()} ({cid}): {stats['status']} v{stats['version']}"
+                  + (f" – {stats['error']}" if stats["error"] else ""))
+        count_items(len(results))
+        count_errors(sum(1 for *_, stats in results if stats["status"] != "success"))
 
-            print(f"   ✔ Inserted snapshot into DB for {app_type.upper()} ({cid})")
+        print(f"[{datetime.now()}] ✅ Connector stats run complete ({len(results)} connectors)\n")
+    finally:
+        _connector_stats_lock.release()
 
-    print(f"[{datetime.now()}] ✅ Connector stats run complete\n")
+# -------------------
+# Connector Stats Retention
+# -------------------
+
+# Raw 5-minute snapshots are kept this many days, hourly rollups this many
+# days; daily rollups are kept forever (one row per connector per day).
+CONNECTOR_STATS_RAW_DAYS = int(os.getenv("CONNECTOR_STATS_RAW_DAYS", "7"))
+CONNECTOR_STATS_HOURLY_DAYS = int(os.getenv("CONNECTOR_STATS_HOURLY_DAYS", "90"))
+
+def snapshot_metrics(queue, diskspace):
+    """Return (queue_count, disk_total, disk_free) from stored queue/diskspace payloads."""
+    q = unpack_json(queue, {})
+    d = unpack_json(diskspace, [])
+
+    records = q.get("records") if isinstance(q, dict) else None
+    queue_count = len(records) if isinstance(records, list) else 0
+    volumes = d if isinstance(d, list) else []
+    disk_total = sum(v.get("totalSpace") or 0 for v in volumes if isinstance(v, dict))
+    disk_free = sum(v.get("freeSpace") or 0 for v in volumes if isinstance(v, dict))
+    return queue_count, disk_total, disk_free
+
+def _upsert_rollups(cur, table, buckets):
+    safe_executemany(cur, f"""
+        INSERT INTO {table}
+        (connector_id, bucket, samples, ok_samples, queue_sum, queue_max,
+         disk_total_max, disk_free_sum, disk_free_min, last_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(connector_id, bucket) DO UPDATE SET
+          samples=samples + excluded.samples,
+          ok_samples=ok_samples + excluded.ok_samples,
+          queue_sum=queue_sum + excluded.queue_sum,
+          queue_max=MAX(queue_max, excluded.queue_max),
+          disk_total_max=MAX(disk_total_max, excluded.disk_total_max),
+          disk_free_sum=disk_free_sum + excluded.disk_free_sum,
+          disk_free_min=MIN(COALESCE(disk_free_min, excluded.disk_free_min), excluded.disk_free_min),
+          last_version=COALESCE(excluded.last_version, last_version)
+    """, [
+        (cid, bucket, b["samples"], b["ok_samples"], b["queue_sum"], b["queue_max"],
+         b["disk_total_max"], b["disk_free_sum"], b["disk_free_min"], b["last_version"])
+        for (cid, bucket), b in buckets.items()
+    ])
+
+def _merge_bucket(buckets, key, samples, ok_samples, queue_sum, queue_max,
+                  disk_total_max, disk_free_sum, disk_free_min, version):
+    b = buckets.setdefault(key, {
+        "samples": 0, "ok_samples": 0, "queue_sum": 0, "queue_max": 0,
+        "disk_total_max": 0, "disk_free_sum": 0, "disk_free_min": None, "last_version": None,
+    })
+    b["samples"] += samples
+    b["ok_samples"] += ok_samples
+    b["queue_sum"] += queue_sum
+    b["queue_max"] = max(b["queue_max"], queue_max)
+    b["disk_total_max"] = max(b["disk_total_max"], disk_total_max)
+    b["disk_free_sum"] += disk_free_sum
+    if disk_free_min is not None:
+        b["disk_free_min"] = disk_free_min if b["disk_free_min"] is None else min(b["disk_free_min"], disk_free_min)
+    if version:
+        b["last_version"] = version
+
+def run_connector_stats_retention(raw_days=None, hourly_days=None):
+    """
+    Roll raw connector_stats older than raw_days into hourly buckets, and
+    hourly buckets older than hourly_days into daily buckets, then delete
+    the rolled-up rows. Cutoffs are aligned to hour/day boundaries so a
+    bucket is only ever built from complete data.
+    """
+    raw_days = CONNECTOR_STATS_RAW_DAYS if raw_days is None else raw_days
+    hourly_days = CONNECTOR_STATS_HOURLY_DAYS if hourly_days is None else hourly_days
+
+    now = datetime.utcnow()
+    raw_cutoff = (now - timedelta(days=raw_days)).strftime("%Y-%m-%dT%H")
+    hourly_cutoff = (now - timedelta(days=hourly_days)).strftime("%Y-%m-%d")
+
+    print(f"[{datetime.now()}] 🗜 Connector stats retention: raw < {raw_cutoff}, hourly < {hourly_cutoff}")
+
+    with get_db_connection() as conn:
+        ensure_connector_schema(conn)
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            # --- raw -> hourly
+            hourly = {}
+            rows = cur.execute("""
+                SELECT connector_id, checked_at, status, version, queue, diskspace
+                FROM connector_stats
+                WHERE checked_at < ?
+                ORDER BY checked_at
+            """, (raw_cutoff,))
+            raw_count = 0
+            for cid, checked_at, status, version, queue, diskspace in rows:
+                raw_count += 1
+                queue_count, disk_total, disk_free = snapshot_metrics(queue, diskspace)
+                _merge_bucket(hourly, (cid, checked_at[:13]), 1, int(status == "success"),
+                              queue_count, queue_count, disk_total, disk_free, disk_free, version)
+
+            if hourly:
+                _upsert_rollups(cur, "connector_stats_hourly", hourly)
+            safe_execute(cur, "DELETE FROM connector_stats WHERE checked_at < ?", (raw_cutoff,))
+
+            # --- hourly -> daily
+            daily = {}
+            rows = cur.execute("""
+                SELECT connector_id, bucket, samples, ok_samples, queue_sum, queue_max,
+                       disk_total_max, disk_free_sum, disk_free_min, last_version
+                FROM connector_stats_hourly
+                WHERE bucket < ?
+                ORDER BY bucket
+            """, (hourly_cutoff,))
+            hourly_count = 0
+            for cid, bucket, *values in rows:
+                hourly_count += 1
+                _merge_bucket(daily, (cid, bucket[:10]), *values)
+
+            if daily:
+                _upsert_rollups(cur, "connector_stats_daily", daily)
+            safe_execute(cur, "DELETE FROM connector_stats_hourly WHERE bucket < ?", (hourly_cutoff,))
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    count_items(raw_count + hourly_count)
+    print(f"[{datetime.now()}] ✅ Rolled {raw_count} snapshots into {len(hourly)} hourly buckets, "
+          f"{hourly_count} hourly into {len(daily)} daily buckets")
+    return {"raw_rolled": raw_count, "hourly_rolled": hourly_count}
 
 def ensure_media_poster_schema(conn):
     cur = conn.cursor()
@@ -839,17 +1240,147 @@ def fetch_tmdb_poster(tmdb_id, media_type="movie"):
     if not TMDB_API_KEY or not tmdb_id:
         return None
     try:
-        url = f"https://api.themoviedb.org/3/{'tv' if media_type == 'series' else 'movie'}/{tmdb_id}"
+        url = f"{TMDB_API_URL}/{'tv' if media_type == 'series' else 'movie'}/{tmdb_id}"
         r = requests.get(url, params={"api_key": TMDB_API_KEY, "language": "en-US"}, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data.get("poster_path"):
-            return f"https://image.tmdb.org/t/p/w500{data['poster_path']}"
+            return f"{TMDB_IMAGE_URL}/w500{data['poster_path']}"
     except Exception as e:
         print(f"[{datetime.now()}] ⚠️ TMDB poster fetch failed for {tmdb_id}: {e}")
     return None
 
 
+# -------------------
+# File Fingerprints
+# -------------------
+
+FINGERPRINT_WORKERS = int(os.getenv("FINGERPRINT_WORKERS", str(min(4, os.cpu_count() or 1))))
+FINGERPRINT_BATCH = 500
+
+def run_file_fingerprints():
+    """
+    Fingerprint new or changed files (see services/fingerprint.py).
+    Files whose (size, mtime) match the stored fingerprint are skipped.
+    """
+    with get_db_connection() as conn:
+        ensure_fingerprint_schema(conn)
+        pending = conn.execute("""
+            SELECT f.id, d.path || '/' || f.filename FROM files f
+            JOIN directories d ON d.pk = f.dir_pk
+            WHERE f.deleted_at IS NULL
+              AND (f.fingerprint IS NULL
+                   OR f.fingerprint_size IS NOT f.size
+                   OR f.fingerprint_mtime IS NOT f.mtime)
+            ORDER BY f.drive_id, d.path, f.filename
+        """).fetchall()
+    conn.close()
+
+    print(f"[{datetime.now()}] 🧬 Fingerprinting {len(pending)} new/changed files with {FINGERPRINT_WORKERS} processes")
+    if not pending:
+        return
+
+    done = failed = 0
+    batch = []
+
+    def flush(cur):
+        cur.execute("BEGIN")
+        safe_executemany(cur, """
+            UPDATE files SET fingerprint=?, fingerprint_size=?, fingerprint_mtime=? WHERE id=?
+        """, batch)
+        cur.execute("COMMIT")
+        batch.clear()
+
+    # spawn: workers only import services.fingerprint, not the app (or its threads)
+    ctx = multiprocessing.get_context("spawn")
+    with get_db_connection() as conn, ProcessPoolExecutor(FINGERPRINT_WORKERS, mp_context=ctx) as pool:
+        cur = conn.cursor()
+        for file_id, fp, size, mtime, error in pool.map(fingerprint_job, pending, chunksize=64):
+            if error:
+                failed += 1
+                count_errors()
+                print(f"[{datetime.now()}] ⚠️ Fingerprint failed for {file_id}: {error}")
+                continue
+            batch.append((fp, size, mtime, file_id))
+            done += 1
+            count_items()
+            if len(batch) >= FINGERPRINT_BATCH:
+                flush(cur)
+        if batch:
+            flush(cur)
+    conn.close()
+
+    print(f"[{datetime.now()}] ✅ Fingerprints: {done} updated, {failed} failed")
+
+
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PROBE_BATCH = 500
+PROBE_COLUMNS = (
+    "file_id", "size", "mtime", "container", "duration", "width", "height", "resolution", "video_codec",
+    "hdr", "bitrate", "audio_codec", "audio_channels", "audio_tracks", "subtitle_tracks", "error", "probed_at",
+)
+
+def run_media_probe():
+    """
+    Read container headers of new or changed files (see services/probe.py).
+    Files whose (size, mtime) match the stored probe are skipped.
+    """
+    with get_db_connection() as conn:
+        ensure_probe_schema(conn)
+        conn.execute("DELETE FROM file_probes WHERE file_id NOT IN (SELECT id FROM files)")
+        pending = conn.execute("""
+            SELECT f.id, d.path || '/' || f.filename FROM files f
+            JOIN directories d ON d.pk = f.dir_pk
+            LEFT JOIN file_probes p ON p.file_id = f.id
+            WHERE f.deleted_at IS NULL
+              AND (p.file_id IS NULL
+                   OR p.size IS NOT f.size
+                   OR p.mtime IS NOT f.mtime)
+            ORDER BY f.drive_id, d.path, f.filename
+        """).fetchall()
+    conn.close()
+
+    print(f"[{datetime.now()}] 🎞 Probing {len(pending)} new/changed files with {PROBE_WORKERS} processes")
+    if not pending:
+        return
+
+    done = failed = 0
+    batch = []
+    sql = f"""
+        INSERT OR REPLACE INTO file_probes ({", ".join(PROBE_COLUMNS)})
+        VALUES ({", ".join("?" * len(PROBE_COLUMNS))})
+    """
+
+    def flush(cur):
+        cur.execute("BEGIN")
+        safe_executemany(cur, sql, batch)
+        cur.execute("COMMIT")
+        batch.clear()
+
+    # spawn: workers only import services.probe, not the app (or its threads)
+    ctx = multiprocessing.get_context("spawn")
+    with get_db_connection() as conn, ProcessPoolExecutor(PROBE_WORKERS, mp_context=ctx) as pool:
+        cur = conn.cursor()
+        for row in pool.map(probe_job, pending, chunksize=64):
+            if row["error"]:
+                failed += 1
+                count_errors()
+                print(f"[{datetime.now()}] ⚠️ Probe failed for {row['file_id']}: {row['error']}")
+                if row.get("size") is None:
+                    continue  # vanished since the scan
+            else:
+                done += 1
+                count_items()
+            batch.append(tuple(row.get(col) for col in PROBE_COLUMNS))
+            if len(batch) >= PROBE_BATCH:
+                flush(cur)
+        if batch:
+            flush(cur)
+    conn.close()
+
+    print(f"[{datetime.now()}] ✅ Probes: {done} updated, {failed} failed")
+
+
 # -------------------
 # Drive Deduplication
 # -------------------
@@ -898,6 +1429,7 @@ def deduplicate_drives():
 
             if delete_ids:
                 print(f"   ⚠️ Keeping ID {keep_id}, deleting {delete_ids}")
+                count_items(len(delete_ids))
                 cur.execute(
                     f"DELETE FROM drives WHERE id IN ({','.join(['?']*len(delete_ids))})",
                     delete_ids
@@ -906,9 +1438,46 @@ def deduplicate_drives():
                 print("   ✔ Only one entry kept, nothing deleted.")
 
         conn.commit()
+        if duplicates:
+            # content only the deleted rows covered would otherwise stay live forever
+            orphans = tombstone_orphans(conn)
+            if orphans:
+                print(f"[{datetime.now()}] 🪦 {orphans} files no longer under any drive tombstoned")
 
     print(f"[{datetime.now()}] ✅ Drive deduplication complete")
     print("=" * 60)
+# -------------------
+# Compaction
+# -------------------
+
+def run_compaction():
+    """
+    Purge tombstones older than TOMBSTONE_RETENTION_DAYS (services/tombstones.py)
+    and VACUUM once at least COMPACTION_MIN_FREE_PCT of the file is free pages.
+    """
+    print(f"[{datetime.now()}] 🧹 Compacting database (tombstones older than {TOMBSTONE_RETENTION_DAYS} days)")
+    conn = get_db_connection()
+    try:
+        orphans = tombstone_orphans(conn)
+        if orphans:
+            print(f"[{datetime.now()}] 🪦 {orphans} files no longer under any drive tombstoned")
+        purged = purge_tombstones(conn)
+        count_items(sum(purged.values()))
+        print(f"[{datetime.now()}] 🗑️ Purged " + ", ".join(f"{n} {table}" for table, n in purged.items()))
+
+        free = free_page_pct(conn)
+        if free >= COMPACTION_MIN_FREE_PCT:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            before = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+            conn.execute("VACUUM")
+            after = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+            print(f"[{datetime.now()}] ✅ VACUUM: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+        else:
+            print(f"[{datetime.now()}] ✅ {free:.1f}% free pages, VACUUM skipped")
+    finally:
+        conn.close()
+
+
 # -------------------
 # Task Registry
 # -------------------
@@ -940,7 +1509,15 @@ TASK_DEFINITIONS = [
         "name": "Connector Stats Collection",
         "func": run_connector_stats,
         "trigger": "interval",
-        "kwargs": {"minutes": 5}
+        "kwargs": {"minutes": 5},
+        "job_options": {"misfire_grace_time": 60}
+    },
+    {
+        "id": "connector_stats_retention",
+        "name": "Connector Stats Retention",
+        "func": run_connector_stats_retention,
+        "trigger": "cron",
+        "kwargs": {"hour": 3, "minute": 30}
     },
     {
         "id": "connector_media_sync",
@@ -949,6 +1526,34 @@ TASK_DEFINITIONS = [
         "trigger": "interval",
         "kwargs": {"hours": 1}
     },
+    {
+        "id": "file_fingerprints",
+        "name": "File Fingerprints",
+        "func": run_file_fingerprints,
+        "trigger": "cron",
+        "kwargs": {"hour": 2, "minute": 0}
+    },
+    {
+        "id": "media_probe",
+        "name": "Media Probe",
+        "func": run_media_probe,
+        "trigger": "cron",
+        "kwargs": {"hour": 2, "minute": 30}
+    },
+    {
+        "id": "checksum_verification",
+        "name": "Checksum Verification",
+        "func": run_checksum_verification,
+        "trigger": "cron",
+        "kwargs": {"hour": 3, "minute": 0}
+    },
+    {
+        "id": "db_compaction",
+        "name": "Database Compaction",
+        "func": run_compaction,
+        "trigger": "cron",
+        "kwargs": {"day_of_week": "sun", "hour": 5, "minute": 0}
+    },
     {
         "id": "drive_dedup",
         "name": "Drive Deduplication",
@@ -0,0 +1,229 @@
+# services/tombstones.py
+"""
+Soft deletes for content that disappeared from a drive.
+
+scan_drive reconciles every directory it walks against the files indexed
+in it. Files that are gone get a `deleted_at` tombstone instead of being
+removed, and the tombstone cascades to episodes, seasons and media that
+have no live file left. If a file comes back, insert_file clears the
+tombstones again and ids and metadata are kept. Readers skip tombstoned
+rows.
+
+A drive that isn't mounted is flagged offline (drives.online = 0) and not
+walked, so an unplugged disk is never mistaken for deleted content. Rows
+under paths that no configured drive covers any more (drive removed from
+the config, duplicate drive rows) are tombstoned as orphans.
+
+The "Database Compaction" task purges tombstones older than
+TOMBSTONE_RETENTION_DAYS and VACUUMs. This module has no app imports, so
+the indexer can use it directly.
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "14"))
+COMPACTION_MIN_FREE_PCT = float(os.getenv("COMPACTION_MIN_FREE_PCT", "5"))
+
+TOMBSTONE_TABLES = ("media", "seasons", "episodes", "files")
+
+
+def ensure_tombstone_schema(conn):
+    for table in TOMBSTONE_TABLES:
+        cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "deleted_at" not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN deleted_at TEXT")
+        # partial: only tombstones are indexed, so it stays tiny
+        conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_deleted ON {table}(deleted_at) "
+                     "WHERE deleted_at IS NOT NULL")
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(drives)")}
+    if "online" not in cols:
+        conn.execute("ALTER TABLE drives ADD COLUMN online INTEGER DEFAULT 1")
+    if "offline_since" not in cols:
+        conn.execute("ALTER TABLE drives ADD COLUMN offline_since TEXT")
+    conn.commit()
+
+
+def now_stamp():
+    return datetime.now().isoformat()
+
+
+# --- Drives --- #
+
+def drive_available(path):
+    """A drive counts as mounted if its path is a mount point or a non-empty directory."""
+    try:
+        if not os.path.isdir(path):
+            return False
+        if os.path.ismount(path):
+            return True
+        with os.scandir(path) as entries:
+            return any(True for _ in entries)  # an unmounted mount point is an empty dir
+    except OSError:
+        return False
+
+
+def set_drive_online(conn, path, online):
+    """Record drive availability. Returns True if the state changed."""
+    cur = conn.execute("""
+        UPDATE drives
+        SET online = ?, offline_since = CASE WHEN ? THEN NULL ELSE COALESCE(offline_since, ?) END
+        WHERE path = ? AND COALESCE(online, 1) IS NOT ?
+    """, (int(online), int(online), now_stamp(), path, int(online)))
+    conn.commit()
+    return cur.rowcount > 0
+
+
+# --- Tombstones --- #
+
+def _tombstone_files(conn, pks, stamp):
+    conn.executemany("UPDATE files SET deleted_at=? WHERE pk=?", [(stamp, pk) for pk in pks])
+    return len(pks)
+
+
+def reconcile_directory(conn, path, names, stamp):
+    """Tombstone files indexed in directory path that are no longer among names."""
+    row = conn.execute("SELECT pk FROM directories WHERE path=?", (os.path.normpath(path),)).fetchone()
+    if row is None:
+        return 0
+    names = set(names)
+    gone = [pk for pk, filename in conn.execute(
+        "SELECT pk, filename FROM files WHERE dir_pk=? AND deleted_at IS NULL", (row[0],)
+    ) if filename not in names]
+    return _tombstone_files(conn, gone, stamp)
+
+
+def reconcile_subtree(conn, root, visited, stamp):
+    """
+    Tombstone live files in directories under root that the walk didn't visit
+    and that no longer exist (removed or renamed folders). Directories that
+    still exist but were skipped, e.g. by a resumed scan, are left alone.
+    """
+    root = os.path.normpath(root)
+    prefix = root.rstrip("/") + "/"
+    dirs = conn.execute("""
+        SELECT d.pk, d.path FROM directories d
+        WHERE (d.path = ? OR (d.path >= ? AND d.path < ?))
+          AND EXISTS (SELECT 1 FROM files f WHERE f.dir_pk = d.pk AND f.deleted_at IS NULL)
+    """, (root, prefix, prefix[:-1] + "0")).fetchall()
+    gone = [pk for pk, path in dirs if path not in visited and not os.path.isdir(path)]
+    count = 0
+    for dir_pk in gone:
+        pks = [pk for (pk,) in conn.execute(
+            "SELECT pk FROM files WHERE dir_pk=? AND deleted_at IS NULL", (dir_pk,))]
+        count += _tombstone_files(conn, pks, stamp)
+    return count
+
+
+def tombstone_orphans(conn, stamp=None):
+    """Tombstone live files that no drive path covers any more, then cascade."""
+    stamp = stamp or now_stamp()
+    roots = [os.path.normpath(p) for (p,) in conn.execute("SELECT path FROM drives WHERE path IS NOT NULL AND path <> ''")]
+
+    def covered(path):
+        return any(path == r or path.startswith(r.rstrip("/") + "/") for r in roots)
+
+    dirs = conn.execute("""
+        SELECT DISTINCT f.dir_pk, d.path FROM files f
+        JOIN directories d ON d.pk = f.dir_pk
+        WHERE f.deleted_at IS NULL
+    """).fetchall()
+    count = 0
+    for dir_pk, path in dirs:
+        if not covered(path):
+            count += conn.execute("UPDATE files SET deleted_at=? WHERE dir_pk=? AND deleted_at IS NULL",
+                                  (stamp, dir_pk)).rowcount
+    cascade_tombstones(conn, stamp)
+    conn.commit()
+    return count
+
+
+def cascade_tombstones(conn, stamp):
+    """Tombstone episodes, seasons and media whose last live file was tombstoned."""
+    changes = {}
+    for table, column in (("episodes", "episode_pk"), ("seasons", "season_pk"), ("media", "media_pk")):
+        changes[table] = conn.execute(f"""
+            UPDATE {table} SET deleted_at = ?
+            WHERE deleted_at IS NULL
+              AND pk IN (SELECT {column} FROM files WHERE deleted_at IS NOT NULL)
+              AND pk NOT IN (SELECT {column} FROM files WHERE deleted_at IS NULL AND {column} IS NOT NULL)
+        """, (stamp, )).rowcount
+    # extra episodes of multi-episode files have no file of their own: they follow their season
+    changes["episodes"] += conn.execute("""
+        UPDATE episodes SET deleted_at = ?
+        WHERE deleted_at IS NULL
+          AND season_pk IN (SELECT pk FROM seasons WHERE deleted_at IS NOT NULL)
+    """, (stamp,)).rowcount
+    return changes
+
+
+def revive(conn, table, ids):
+    """Clear tombstones on rows (by SHA1 id) that have content again."""
+    conn.executemany(f"UPDATE {table} SET deleted_at = NULL WHERE id = ? AND deleted_at IS NOT NULL",
+                     [(i,) for i in ids])
+
+
+# --- Compaction --- #
+
+def purge_tombstones(conn, retention_days=TOMBSTONE_RETENTION_DAYS):
+    """Delete tombstones older than the retention window, children first. Returns counts per table."""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    purged = {}
+    conn.execute("BEGIN")
+    try:
+        purged["files"] = conn.execute("DELETE FROM files WHERE deleted_at < ?", (cutoff,)).rowcount
+        purged["episodes"] = conn.execute("""
+            DELETE FROM episodes WHERE deleted_at < ?
+              AND pk NOT IN (SELECT episode_pk FROM files WHERE episode_pk IS NOT NULL)
+        """, (cutoff,)).rowcount
+        purged["seasons"] = conn.execute("""
+            DELETE FROM seasons WHERE deleted_at < ?
+              AND pk NOT IN (SELECT season_pk FROM files WHERE season_pk IS NOT NULL)
+              AND pk NOT IN (SELECT season_pk FROM episodes WHERE season_pk IS NOT NULL)
+        """, (cutoff,)).rowcount
+        purged_media = [media_id for (media_id,) in conn.execute("""
+            SELECT id FROM media WHERE deleted_at < ?
+              AND pk NOT IN (SELECT media_pk FROM files WHERE media_pk IS NOT NULL)
+              AND pk NOT IN (SELECT media_pk FROM seasons WHERE media_pk IS NOT NULL)
+        """, (cutoff,))]
+        conn.executemany("DELETE FROM metadata WHERE media_id = ?", [(m,) for m in purged_media])
+        conn.executemany("DELETE FROM media WHERE id = ?", [(m,) for m in purged_media])
+        purged["media"] = len(purged_media)
+
+        # per-file side tables (created by their tasks, so maybe not there yet)
+        for table in ("file_probes", "file_checksums"):
+            try:
+                conn.execute(f"DELETE FROM {table} WHERE file_id NOT IN (SELECT id FROM files)")
+            except sqlite3.OperationalError:
+                pass
+
+        # directories nothing points at any more, leaves first
+        purged["directories"] = 0
+        while True:
+            removed = conn.execute("""
+                DELETE FROM directories
+                WHERE pk NOT IN (SELECT dir_pk FROM files WHERE dir_pk IS NOT NULL)
+                  AND pk NOT IN (SELECT folder_pk FROM media WHERE folder_pk IS NOT NULL)
+                  AND pk NOT IN (SELECT folder_pk FROM seasons WHERE folder_pk IS NOT NULL)
+                  AND pk NOT IN (SELECT parent_pk FROM directories WHERE parent_pk IS NOT NULL)
+            """).rowcount
+            if not removed:
+                break
+            purged["directories"] += removed
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return purged
+
+
+def free_page_pct(conn):
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return free / pages * 100 if pages else 0.0
+
+
+def tombstone_counts(conn):
+    """Live tombstones per table (for stats)."""
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE deleted_at IS NOT NULL").fetchone()[0]
+            for table in TOMBSTONE_TABLES}
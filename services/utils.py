@@ -1,5 +1,9 @@
 import os, requests
 
+# Overridable so a local stand-in (benchmarks/, load tests) can take TMDB traffic
+TMDB_API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3").rstrip("/")
+TMDB_IMAGE_URL = os.getenv("TMDB_IMAGE_URL", "https://image.tmdb.org/t/p").rstrip("/")
+
 POSTER_DIR = os.path.join(os.path.dirname(__file__), "static", "posters")
 os.makedirs(POSTER_DIR, exist_ok=True)
 
@@ -12,12 +16,12 @@ def normalize_poster(media_id, poster_url, tmdb_id=None, media_type="movie", con
 
     if tmdb_id and tmdb_api_key:
         try:
-            url = f"https://api.themoviedb.org/3/{'tv' if media_type=='tv' else 'movie'}/{tmdb_id}"
+            url = f"{TMDB_API_URL}/{'tv' if media_type=='tv' else 'movie'}/{tmdb_id}"
             r = requests.get(url, params={"api_key": tmdb_api_key}, timeout=10)
             r.raise_for_status()
             data = r.json()
             if data.get("poster_path"):
-                tmdb_poster_url = f"https://image.tmdb.org/t/p/w500{data['poster_path']}"
+                tmdb_poster_url = f"{TMDB_IMAGE_URL}/w500{data['poster_path']}"
                 img = requests.get(tmdb_poster_url, timeout=10)
                 if img.status_code == 200:
                     with open(local_abs, "wb") as f:
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Background worker for the jobs in TASK_DEFINITIONS.
+
+The web app (main.py) only schedules and enqueues runs into the job_queue
+table; this process claims them and does the heavy lifting (poster cache,
+enrichment, connector sync, ...) outside the API process.
+
+Usage:
+  python worker.py
+
+Env:
+  WORKER_CONCURRENCY  jobs run in parallel (default 2, one run per task)
+  WORKER_POLL         seconds between queue polls when idle (default 1)
+"""
+import os
+import time
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dotenv import load_dotenv
+
+here = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(here, ".env"))
+
+from services.indexer import DB_FILE, create_schema
+from services.tasks import TASK_DEFINITIONS, task_id_for, ensure_connector_schema
+from services.scan_jobs import ensure_scan_schema
+from services.fingerprint import ensure_fingerprint_schema
+from services.checksum import ensure_checksum_schema
+from services.probe import ensure_probe_schema
+from services.task_runs import ensure_task_runs_schema, run_instrumented
+from services.metrics import Gauge, install_http_metrics, start_snapshot_thread
+from services.job_queue import (
+    JOB_HEARTBEAT_SECONDS, JOB_PRUNE_SECONDS, JOB_RETENTION_DAYS, ensure_job_queue_schema, get_queue_connection,
+    claim_next_job, heartbeat_job, finish_job, recover_stale_jobs, prune_finished_jobs,
+)
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL = float(os.getenv("WORKER_POLL", "1"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+TASKS_BY_ID = {task_id_for(t): t for t in TASK_DEFINITIONS}
+
+stop = threading.Event()
+
+
+def run_job(job):
+    task = TASKS_BY_ID.get(job["task_id"])
+    conn = get_queue_connection()
+    done = threading.Event()
+
+    def heartbeat():
+        hb = get_queue_connection()
+        while not done.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                heartbeat_job(hb, job["id"])
+            except Exception as e:
+                print(f"[{datetime.now()}] ⚠️ Heartbeat failed for job {job['id']}: {e}")
+        hb.close()
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    print(f"[{datetime.now()}] ▶ Job {job['id']}: {job['name']} ({job['source']})")
+    started = time.monotonic()
+    try:
+        if task is None:
+            raise KeyError(f"Unknown task {job['task_id']}")
+        run_instrumented(job["task_id"], job["name"], task["func"], job_id=job["id"], source=job["source"])
+        finish_job(conn, job["id"], "done")
+        print(f"[{datetime.now()}] ✅ Job {job['id']} done in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        finish_job(conn, job["id"], "error", str(e))
+        print(f"[{datetime.now()}] ❌ Job {job['id']} failed: {e}")
+    finally:
+        done.set()
+        conn.close()
+
+
+def main():
+    conn = get_queue_connection()
+    create_schema(conn)
+    ensure_connector_schema(conn)
+    ensure_scan_schema(conn)
+    ensure_fingerprint_schema(conn)
+    ensure_checksum_schema(conn)
+    ensure_probe_schema(conn)
+    ensure_job_queue_schema(conn)
+    ensure_task_runs_schema(conn)
+    conn.close()
+
+    running = {}  # task_id -> future
+
+    # Worker metrics are merged into the web app's /metrics via metrics_snapshots
+    install_http_metrics()
+    Gauge("catalogerr_worker_running_jobs", "Jobs currently running in the worker",
+          fn=lambda: {(): len(running)})
+    start_snapshot_thread(DB_FILE, "worker")
+
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    print(f"[{datetime.now()}] 👷 Worker {WORKER_ID} started ({WORKER_CONCURRENCY} slots, {len(TASKS_BY_ID)} tasks)")
+
+    conn = get_queue_connection()
+    last_recover = last_prune = 0
+
+    with ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY) as pool:
+        while not stop.is_set():
+            for task_id, fut in list(running.items()):
+                if fut.done():
+                    del running[task_id]
+
+            if time.monotonic() - last_recover > JOB_HEARTBEAT_SECONDS:
+                lost = recover_stale_jobs(conn)
+                if lost:
+                    print(f"[{datetime.now()}] ⚠️ Marked {lost} stale job(s) as lost")
+                last_recover = time.monotonic()
+
+            if time.monotonic() - last_prune > JOB_PRUNE_SECONDS:
+                pruned = prune_finished_jobs(conn)
+                if pruned:
+                    print(f"[{datetime.now()}] 🧹 Pruned {pruned} finished job(s) older than {JOB_RETENTION_DAYS} days")
+                last_prune = time.monotonic()
+
+            job = None
+            if len(running) < WORKER_CONCURRENCY:
+                job = claim_next_job(conn, WORKER_ID, exclude_tasks=tuple(running))
+            if job:
+                running[job["task_id"]] = pool.submit(run_job, job)
+                continue
+            stop.wait(WORKER_POLL)
+
+        print(f"[{datetime.now()}] 🛑 Worker stopping, waiting for {len(running)} running job(s)...")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()